@@ -5,6 +5,7 @@ import {
   STREAM_SCENE_ANALYSIS,
   STREAM_GRAPH_GENERATION,
   STREAM_PROGRESS_UPDATES,
+  SCENE_INDEX_VERSION_KEY,
   GROUP_CHUNK_WORKERS,
   GROUP_ANALYSIS_WORKERS,
   GROUP_GRAPH_WORKERS,
@@ -33,6 +34,7 @@ export {
   STREAM_SCENE_ANALYSIS,
   STREAM_GRAPH_GENERATION,
   STREAM_PROGRESS_UPDATES,
+  SCENE_INDEX_VERSION_KEY,
   GROUP_CHUNK_WORKERS,
   GROUP_ANALYSIS_WORKERS,
   GROUP_GRAPH_WORKERS,
@@ -19,6 +19,9 @@ export const STREAM_SCENE_ANALYSIS = 'stream_scene_analysis';
 export const STREAM_GRAPH_GENERATION = 'stream_graph_generation';
 export const STREAM_PROGRESS_UPDATES = 'stream_progress_updates'; // For publishing progress
 
+// Incremented after every write to the Weaviate Scene class; search caches in worker-py compare it
+export const SCENE_INDEX_VERSION_KEY = process.env.SCENE_INDEX_VERSION_KEY || 'scene_index:version';
+
 // Consumer group names (constants)
 export const GROUP_CHUNK_WORKERS = 'group_chunk_workers';
 export const GROUP_ANALYSIS_WORKERS = 'group_analysis_workers';
@@ -13,6 +13,7 @@ import {
   STREAM_PDF_CHUNKS,
   STREAM_SCENE_ANALYSIS,
   STREAM_PROGRESS_UPDATES,
+  SCENE_INDEX_VERSION_KEY,
   GROUP_CHUNK_WORKERS,
   GROUP_ANALYSIS_WORKERS,
   getJobsCollection,
@@ -354,6 +355,12 @@ async function processSceneAnalysis(messageId: string, messageData: Record<strin
                 sceneLogger.error({ errors: errorMessages, objectId: item.id_ }, 'Error adding object to Weaviate batch');
             }
         });
+        // Tell worker-py search caches that the Scene index changed (they also watch the object count)
+        try {
+            await redisClient.incr(SCENE_INDEX_VERSION_KEY);
+        } catch (versionError) {
+            sceneLogger.warn({ versionError }, 'Failed to bump the Scene index version');
+        }
 
         // 7. Update Scene Status in MongoDB to INDEXED
         const scenes = getScenesCollection();
@@ -0,0 +1,142 @@
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+
+# --- Answer cache for /search ---
+# Level 1: exact match on the normalized question text.
+# Level 2: cosine similarity between the question embedding and the embeddings
+# of cached questions, accepted above `similarity_threshold`.
+# Entries expire after `ttl` seconds; beyond `max_entries` the least recently
+# used one is evicted. Everything is dropped when the index version changes
+# (checked at most every `version_check_interval` seconds).
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+
+def normalize_query(query: str) -> str:
+    text = unicodedata.normalize('NFKC', query).casefold()
+    text = _PUNCTUATION.sub(' ', text)
+    return _SPACES.sub(' ', text).strip()
+
+class _Entry:
+    __slots__ = ('answer', 'vector', 'expires_at')
+
+    def __init__(self, answer: Any, vector: Optional[np.ndarray], expires_at: float):
+        self.answer = answer
+        self.vector = vector
+        self.expires_at = expires_at
+
+class AnswerCache:
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600, similarity_threshold: float = 0.95,
+                 index_version: Callable[[], Any] = None, version_check_interval: float = 30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.index_version = index_version
+        self.version_check_interval = version_check_interval
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Stacked unit vectors of the cached questions, rebuilt lazily after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        self._version = None
+        self._version_checked_at = 0.0
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    # --- Lookup ---
+
+    def get_exact(self, query: str) -> Optional[Any]:
+        self._check_version()
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return None
+            self.stats["exact_hits"] += 1
+            return entry.answer
+
+    def get_similar(self, vector) -> Optional[Tuple[Any, float]]:
+        """Best cached answer for a question embedding, with its similarity, or None (counted as a miss)."""
+        unit = self._unit(vector)
+        with self._lock:
+            if self._entries:
+                if self._matrix is None:
+                    self._matrix_keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+                    self._matrix = np.stack([self._entries[key].vector for key in self._matrix_keys]) if self._matrix_keys else np.empty((0, unit.size))
+                if len(self._matrix_keys):
+                    scores = self._matrix @ unit
+                    # Expired entries can still be in the matrix; try candidates best first
+                    for index in np.argsort(scores)[::-1]:
+                        if scores[index] < self.similarity_threshold:
+                            break
+                        entry = self._live_entry(self._matrix_keys[index])
+                        if entry is not None:
+                            self.stats["semantic_hits"] += 1
+                            return entry.answer, float(scores[index])
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query: str, answer: Any, vector=None):
+        key = normalize_query(query)
+        with self._lock:
+            self._entries[key] = _Entry(answer, None if vector is None else self._unit(vector), time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._matrix = None
+
+    # --- Invalidation ---
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.stats["invalidations"] += 1
+
+    def _check_version(self):
+        if self.index_version is None or time.monotonic() - self._version_checked_at < self.version_check_interval:
+            return
+        self._version_checked_at = time.monotonic()
+        try:
+            version = self.index_version()
+        except Exception:
+            return  # Keep serving cached answers; the next check retries
+        if self._version is not None and version != self._version:
+            self.invalidate()
+        self._version = version
+
+    # --- Helpers ---
+
+    def _live_entry(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            self._matrix = None
+            self.stats["evictions"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["exact_hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
@@ -1,13 +1,190 @@
-from fastapi import FastAPI, Query
-from langchain.chains import RetrievalQA
+import os
+import json
+import asyncio
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from langchain.callbacks import AsyncIteratorCallbackHandler
+from langchain.chains.question_answering import load_qa_chain
 from langchain.chat_models import ChatOpenAI
-from langchain.vectorstores import Weaviate
 from langchain.embeddings import OpenAIEmbeddings
+from langchain.schema import Document
+from redis import Redis
+
+from answer_cache import AnswerCache
+from retrieval import HybridRetriever
+from weaviate_factory import get_client_factory
+
+# --- Configuration ---
+os.environ.setdefault('WEAVIATE_URL', 'http://weaviate:8080') # Read by the shared client factory on first connect
+SCENE_CLASS = os.getenv('WEAVIATE_SCENE_CLASS', 'Scene')
+SCENE_TEXT_KEY = os.getenv('WEAVIATE_SCENE_TEXT_KEY', 'sceneText')
+SEARCH_TOP_K = int(os.getenv('SEARCH_TOP_K', '4')) # Upper bound on scenes sent to the LLM
+SEARCH_CANDIDATES = int(os.getenv('SEARCH_CANDIDATES', '20')) # Per retriever (vector and BM25) before fusion
+SEARCH_RERANK_CUTOFF = float(os.getenv('SEARCH_RERANK_CUTOFF', '0.35')) # Drop candidates scoring below this fraction of the best
+SEARCH_BM25_REFRESH_INTERVAL = float(os.getenv('SEARCH_BM25_REFRESH_INTERVAL', '60')) # Seconds between Scene index checks
+SEARCH_MAX_CONCURRENT_LLM = int(os.getenv('SEARCH_MAX_CONCURRENT_LLM', '8')) # LLM completions in flight per process
+SEARCH_SOURCE_SNIPPET_CHARS = int(os.getenv('SEARCH_SOURCE_SNIPPET_CHARS', '200'))
+
+# --- Answer Cache Configuration ---
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '1000'))
+SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL', '3600')) # Seconds
+SEARCH_CACHE_SIMILARITY = float(os.getenv('SEARCH_CACHE_SIMILARITY', '0.95')) # Cosine similarity for near-duplicate questions
+SEARCH_CACHE_INDEX_CHECK_INTERVAL = float(os.getenv('SEARCH_CACHE_INDEX_CHECK_INTERVAL', '30')) # Seconds between Scene index checks
+
+# --- Scene Index Version Configuration ---
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
+SCENE_INDEX_VERSION_KEY = os.getenv('SCENE_INDEX_VERSION_KEY', 'scene_index:version') # Incremented by the indexer (worker-js) after every Scene write
 
 app = FastAPI()
-vec = Weaviate("http://weaviate:8080", "Scene", OpenAIEmbeddings())
-qa  = RetrievalQA.from_chain_type(llm=ChatOpenAI(), retriever=vec.as_retriever())
+weaviate_factory = get_client_factory() # Connects lazily, on the first request that needs Weaviate
+redis_client = Redis.from_url(REDIS_URL, decode_responses=True, socket_timeout=2)
+embeddings = OpenAIEmbeddings()
+SCENE_ATTRIBUTES = ["sceneId", "jobId", "analysisTitle", "characters", "locations"]
+qa_chain = load_qa_chain(ChatOpenAI(streaming=True), chain_type="stuff")
+llm_slots: asyncio.Semaphore = None # Created on first use, inside the server's event loop (Python 3.9 binds it at creation)
+
+def scenes():
+    return weaviate_factory.get().collections.get(SCENE_CLASS)
+
+def scene_document(obj) -> Document:
+    properties = dict(obj.properties)
+    return Document(page_content=properties.pop(SCENE_TEXT_KEY, None) or "", metadata=properties)
+
+def scene_index_version():
+    # The marker changes on every write, including in-place updates and deletes that keep the
+    # object count; the count still catches writes from an indexer that does not bump the marker
+    return redis_client.get(SCENE_INDEX_VERSION_KEY), scenes().aggregate.over_all(total_count=True).total_count
+
+def vector_search(vector, k: int) -> list:
+    result = scenes().query.near_vector(near_vector=vector, limit=k, return_properties=[SCENE_TEXT_KEY, *SCENE_ATTRIBUTES])
+    return [scene_document(obj) for obj in result.objects]
+
+def load_scene_corpus() -> list:
+    """All Scene objects as Documents (the client pages through them with the cursor API)."""
+    return [scene_document(obj) for obj in scenes().iterator(return_properties=[SCENE_TEXT_KEY, *SCENE_ATTRIBUTES])]
+
+def scene_key(doc):
+    # The indexer may store a scene more than once; fusion treats the copies as one scene
+    return (doc.metadata.get("jobId"), doc.metadata.get("sceneId")) if doc.metadata.get("sceneId") else doc.page_content
+
+def scene_search_text(doc) -> str:
+    # Names, locations and the title are what exact-term questions usually hit
+    meta = doc.metadata
+    extra = [meta.get("analysisTitle") or "", *(meta.get("characters") or []), *(meta.get("locations") or [])]
+    return " ".join([doc.page_content, *map(str, extra)])
+
+retriever = HybridRetriever(
+    vector_search=vector_search,
+    load_corpus=load_scene_corpus,
+    key=scene_key,
+    text=scene_search_text,
+    index_version=scene_index_version,
+    candidates=SEARCH_CANDIDATES,
+    max_context=SEARCH_TOP_K,
+    relative_cutoff=SEARCH_RERANK_CUTOFF,
+    version_check_interval=SEARCH_BM25_REFRESH_INTERVAL,
+)
+
+answer_cache = AnswerCache(
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    ttl=SEARCH_CACHE_TTL,
+    similarity_threshold=SEARCH_CACHE_SIMILARITY,
+    index_version=scene_index_version,
+    version_check_interval=SEARCH_CACHE_INDEX_CHECK_INTERVAL,
+)
+
+# --- Search pipeline ---
+# Yields ("sources", [...]), ("token", text)... and finally ("done", {...}).
+# Cached answers are yielded as a single token.
+
+def source_summary(doc) -> dict:
+    return {
+        "sceneId": doc.metadata.get("sceneId"),
+        "jobId": doc.metadata.get("jobId"),
+        "snippet": doc.page_content[:SEARCH_SOURCE_SNIPPET_CHARS],
+    }
+
+async def answer_events(q: str):
+    # The cache may check the index version over the network, keep it off the event loop
+    answer = await asyncio.to_thread(answer_cache.get_exact, q)
+    if answer is not None:
+        yield "token", answer
+        yield "done", {"cached": "exact"}
+        return
+    # The question embedding serves both the semantic cache lookup and retrieval
+    vector = await embeddings.aembed_query(q)
+    cached = answer_cache.get_similar(vector)
+    if cached is not None:
+        yield "token", cached[0]
+        yield "done", {"cached": "semantic", "similarity": cached[1]}
+        return
+
+    # Vector + BM25 candidates, fused and trimmed to the smallest sufficient context
+    docs = await asyncio.to_thread(retriever.retrieve, q, vector)
+    yield "sources", [source_summary(doc) for doc in docs]
+
+    global llm_slots
+    if llm_slots is None:
+        llm_slots = asyncio.Semaphore(SEARCH_MAX_CONCURRENT_LLM)
+    async with llm_slots:
+        handler = AsyncIteratorCallbackHandler()
+        completion = asyncio.create_task(
+            qa_chain.arun(input_documents=docs, question=q, callbacks=[handler])
+        )
+        # Ends the token iterator even if the chain fails before the LLM reports an error
+        completion.add_done_callback(lambda _: handler.done.set())
+        try:
+            async for token in handler.aiter():
+                yield "token", token
+            answer = await completion
+        finally:
+            # Client went away (or the stream failed): stop paying for the completion
+            if not completion.done():
+                completion.cancel()
+    answer_cache.put(q, answer, vector)
+    yield "done", {"cached": None}
+
+def sse(event: str, data) -> str:
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    # Multi-line data needs one data: field per line
+    return f"event: {event}\n" + "".join(f"data: {line}\n" for line in payload.split("\n")) + "\n"
+
+@app.on_event("startup")
+async def build_lexical_index():
+    # Built off the event loop; /search is vector-only until it is ready
+    asyncio.get_running_loop().run_in_executor(None, retriever.refresh)
 
 @app.get("/search")
-def search(q: str = Query(...)):
-    return qa.run(q) 
\ No newline at end of file
+async def search(request: Request, q: str = Query(...), stream: bool = Query(False)):
+    if not (stream or "text/event-stream" in request.headers.get("accept", "")):
+        tokens = [data async for event, data in answer_events(q) if event == "token"]
+        return "".join(tokens)
+
+    async def event_stream():
+        events = answer_events(q)
+        try:
+            async for event, data in events:
+                if await request.is_disconnected():
+                    break
+                yield sse(event, data)
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/readyz")
+def readyz():
+    # Cached for WEAVIATE_READY_TTL, so frequent probes do not hit Weaviate each time
+    ready = weaviate_factory.is_ready()
+    return JSONResponse({"ready": ready, "checks": {"weaviate": ready}}, status_code=200 if ready else 503)
+
+@app.get("/search/cache")
+def search_cache_stats():
+    return answer_cache.snapshot()
+
+@app.post("/search/cache/invalidate")
+def search_cache_invalidate():
+    answer_cache.invalidate()
+    return answer_cache.snapshot()
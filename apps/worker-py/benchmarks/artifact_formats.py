@@ -0,0 +1,73 @@
+"""
+Compares graph artifact formats (size and serialization/parsing time).
+
+Usage (from apps/worker-py):
+    python benchmarks/artifact_formats.py --nodes 2000 --edges 50000
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+import zipfile
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from artifacts import ARTIFACT_WRITERS
+
+def random_graph(nodes: int, edges: int, seed: int) -> nx.Graph:
+    rng = random.Random(seed)
+    G = nx.Graph()
+    names = [f'CHARACTER_{i}' for i in range(nodes)]
+    for name in names:
+        G.add_node(name, label=name, size=rng.randint(1, 50))
+    while G.number_of_edges() < edges:
+        char1, char2 = rng.sample(names, 2)
+        G.add_edge(char1, char2, weight=rng.randint(1, 20))
+    return G
+
+def read_back(fmt: str, files):
+    """Parses the artifact again, as a downstream consumer would."""
+    if fmt == 'gexf':
+        return nx.read_gexf(io.BytesIO(files[0][1]))
+    if fmt == 'graphml':
+        return nx.read_graphml(io.BytesIO(files[0][1]))
+    if fmt == 'npz':
+        with np.load(io.BytesIO(files[0][1])) as data:
+            return {key: data[key] for key in data.files}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=1000)
+    parser.add_argument('--edges', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    graph = random_graph(args.nodes, args.edges, args.seed)
+    print(f"Graph: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
+    print(f"{'format':<10}{'raw bytes':>14}{'zipped bytes':>14}{'write ms':>12}{'read ms':>12}")
+
+    for fmt, writer in ARTIFACT_WRITERS.items():
+        write_times, read_times = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            files = writer(graph)
+            write_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            read_back(fmt, files)
+            read_times.append(time.perf_counter() - start)
+
+        raw_size = sum(len(content) for _, content, _ in files)
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for file_name, content, compressed in files:
+                zipf.writestr(file_name, content, compress_type=zipfile.ZIP_STORED if compressed else zipfile.ZIP_DEFLATED)
+        print(f"{fmt:<10}{raw_size:>14}{len(zip_buffer.getvalue()):>14}{min(write_times) * 1000:>12.1f}{min(read_times) * 1000:>12.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""
+Benchmark of the whole process_graph_job pipeline on synthetic screenplays.
+
+Generates scenes with a given count, cast size, characters per scene and skew of
+the name distribution (Zipf), then measures the time and peak memory of every job
+stage (fetch, delta, build, analytics, serialize, zip, upload...) against
+in-memory Mongo/Redis/MinIO stand-ins.
+
+Usage (from apps/worker-py):
+    python benchmarks/graph_pipeline.py --scenes 5000 --cast 300 --per-scene 4 --skew 1.1
+    python benchmarks/graph_pipeline.py --changed 50             # incremental job
+    python benchmarks/graph_pipeline.py --json results.json      # save the results
+    python benchmarks/graph_pipeline.py --baseline results.json  # exit code 1 on a regression
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')  # Keep per-job INFO logs out of the report
+
+import main
+import metrics
+from stand_ins import InMemoryMinio, InMemoryMongo, InMemoryRedis
+
+JOB_ID = 'benchmark-job'
+
+# --- Synthetic screenplay ---
+
+def synthetic_scenes(scenes: int, cast: int, per_scene: float, skew: float, seed: int) -> list:
+    """Scene documents whose character names follow a Zipf(skew) popularity curve."""
+    rng = random.Random(seed)
+    names = [f'CHARACTER_{i}' for i in range(cast)]
+    cum_weights, total = [], 0.0
+    for rank in range(cast):
+        total += 1.0 / (rank + 1) ** skew
+        cum_weights.append(total)
+
+    documents = []
+    for i in range(scenes):
+        size = max(1, min(cast, round(rng.gauss(per_scene, per_scene / 3))))
+        characters = set()
+        for _ in range(20):
+            characters.update(rng.choices(names, cum_weights=cum_weights, k=size - len(characters)))
+            if len(characters) >= size:
+                break
+        documents.append({
+            "jobId": JOB_ID,
+            "sceneId": f'scene-{i}',
+            "status": "INDEXED",
+            "analysisResult": {"characters": sorted(characters)},
+        })
+    return documents
+
+# --- Stage recording ---
+
+class RecordingLaps(metrics.StageLaps):
+    """StageLaps that also keeps every lap (and its traced memory peak) for the report."""
+    records = defaultdict(list)
+    peaks = defaultdict(list)
+
+    def lap(self, stage: str) -> float:
+        elapsed = super().lap(stage)
+        RecordingLaps.records[stage].append(elapsed)
+        if tracemalloc.is_tracing():
+            RecordingLaps.peaks[stage].append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        return elapsed
+
+def reset_clients(scene_docs: list):
+    main.redis_client = InMemoryRedis()
+    main.mongo_client = InMemoryMongo()
+    main.minio_client = InMemoryMinio()
+    main.progress_reporter = None
+    main.artifact_index = None
+    main.retry_policy = None
+    db = main.mongo_client[main.DB_NAME]
+    db[main.JOBS_COLLECTION_NAME].insert_many([{"jobId": JOB_ID, "status": "ANALYZING"}])
+    db[main.SCENES_COLLECTION_NAME].insert_many(scene_docs)
+
+def run_job(message_data: dict, run: int):
+    main.process_graph_job(f'{run}-0', message_data)
+    job = main.mongo_client[main.DB_NAME][main.JOBS_COLLECTION_NAME].find_one({"jobId": JOB_ID})
+    if job.get('status') != 'COMPLETED':
+        raise RuntimeError(f"Benchmark job did not complete: {job}")
+
+def mutate_scenes(scene_docs: list, changed: int, cast: int, rng: random.Random) -> list:
+    """Replaces the cast of `changed` random scenes, as a re-index would. Returns their ids."""
+    ids = []
+    for doc in rng.sample(scene_docs, min(changed, len(scene_docs))):
+        doc["analysisResult"] = {"characters": sorted(set(rng.sample([f'CHARACTER_{i}' for i in range(cast)], min(cast, 3))))}
+        ids.append(doc["sceneId"])
+    return ids
+
+def run_pipeline(args, scene_docs: list, run: int):
+    """One measured job: a full rebuild, or an incremental job over `args.changed` scenes."""
+    reset_clients(scene_docs)
+    message = {"jobId": JOB_ID, "formats": args.formats}
+    if args.changed:
+        run_job(message, -run - 1)  # Prime the graph state, not measured
+        RecordingLaps.records.clear()
+        RecordingLaps.peaks.clear()
+        changed_ids = mutate_scenes(main.mongo_client[main.DB_NAME][main.SCENES_COLLECTION_NAME].docs, args.changed, args.cast, random.Random(args.seed + run))
+        message = {**message, "changedSceneIds": json.dumps(changed_ids)}
+    run_job(message, run)
+
+def measure(args, scene_docs: list) -> dict:
+    main.GRAPH_MEMOIZATION_ENABLED = args.memoization
+    main.GRAPH_ANALYTICS_ENABLED = not args.no_analytics
+    metrics.StageLaps = RecordingLaps
+
+    timings = defaultdict(list)
+    for run in range(args.repeat):
+        RecordingLaps.records.clear()
+        run_pipeline(args, scene_docs, run)
+        for stage, laps in RecordingLaps.records.items():
+            timings[stage].append(sum(laps))
+        start = time.perf_counter()
+        main.build_relationship_graph(scene_docs, JOB_ID)
+        timings['reference_build'].append(time.perf_counter() - start)
+
+    peaks = {}
+    if not args.no_memory:
+        # Separate traced run: tracemalloc slows allocation-heavy stages noticeably
+        RecordingLaps.records.clear()
+        RecordingLaps.peaks.clear()
+        tracemalloc.start()
+        try:
+            run_pipeline(args, scene_docs, args.repeat)
+            peaks = {stage: max(values) for stage, values in RecordingLaps.peaks.items()}
+            tracemalloc.reset_peak()
+            main.build_relationship_graph(scene_docs, JOB_ID)
+            peaks['reference_build'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        stage: {
+            "median_ms": statistics.median(values) * 1000,
+            "min_ms": min(values) * 1000,
+            "peak_mb": peaks[stage] / (1024 * 1024) if stage in peaks else None,
+        }
+        for stage, values in timings.items()
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for stage, current in results.items():
+        previous = baseline.get(stage)
+        if not previous:
+            continue
+        # The fastest run is the least noisy; short stages also need an absolute change
+        if current["min_ms"] > max(previous["min_ms"] * (1 + tolerance), previous["min_ms"] + 5.0):
+            regressions.append(f"{stage}: {previous['min_ms']:.1f} -> {current['min_ms']:.1f} ms")
+        if current.get("peak_mb") and previous.get("peak_mb") and current["peak_mb"] > previous["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{stage}: {previous['peak_mb']:.1f} -> {current['peak_mb']:.1f} MB")
+    return regressions
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenes', type=int, default=2000)
+    parser.add_argument('--cast', type=int, default=200, help='Number of distinct characters')
+    parser.add_argument('--per-scene', type=float, default=4.0, help='Mean number of characters per scene')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent of character popularity (0 = uniform)')
+    parser.add_argument('--formats', default='gexf', help='Artifact formats, as in GRAPH_ARTIFACT_FORMATS')
+    parser.add_argument('--changed', type=int, default=0, help='Measure an incremental job changing this many scenes')
+    parser.add_argument('--memoization', action='store_true', help='Enable result memoization (off by default)')
+    parser.add_argument('--no-analytics', action='store_true')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the memory-tracing run')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='Write the results to a JSON file')
+    parser.add_argument('--baseline', help='Compare with an earlier JSON results file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed increase over the baseline (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    scene_docs = synthetic_scenes(args.scenes, args.cast, args.per_scene, args.skew, args.seed)
+    mentions = sum(len(doc["analysisResult"]["characters"]) for doc in scene_docs)
+    print(f"Scenes: {len(scene_docs)}, cast: {args.cast}, character mentions: {mentions}, formats: {args.formats}"
+          + (f", incremental ({args.changed} changed)" if args.changed else ""))
+
+    results = measure(args, scene_docs)
+    print(f"{'stage':<18}{'median ms':>12}{'min ms':>12}{'peak MB':>10}")
+    for stage, row in results.items():
+        peak = f"{row['peak_mb']:>10.1f}" if row['peak_mb'] is not None else f"{'-':>10}"
+        print(f"{stage:<18}{row['median_ms']:>12.1f}{row['min_ms']:>12.1f}{peak}")
+
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump({"args": vars(args), "stages": results}, out, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        workload = ('scenes', 'cast', 'per_scene', 'skew', 'formats', 'changed', 'memoization', 'no_analytics', 'seed')
+        differing = [key for key in workload if baseline["args"].get(key) != getattr(args, key)]
+        if differing:
+            print(f"Warning: baseline was recorded with a different workload ({', '.join(differing)}).")
+        regressions = compare(results, baseline["stages"], args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
@@ -0,0 +1,193 @@
+"""
+In-memory Mongo, Redis and MinIO stand-ins for the benchmarks.
+
+They implement only the operations process_graph_job uses, so the benchmark
+measures the worker's code rather than the network or external services.
+"""
+import copy
+import time
+from collections import defaultdict
+
+from minio.error import S3Error
+
+# --- Mongo ---
+
+class _Result:
+    def __init__(self, matched: int):
+        self.matched_count = matched
+        self.modified_count = matched
+
+class _Cursor(list):
+    def sort(self, key, direction=1):
+        return _Cursor(sorted(self, key=lambda doc: doc.get(key, 0), reverse=direction < 0))
+
+    def limit(self, count):
+        return _Cursor(self[:count])
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, expected in query.items():
+        value = doc.get(key)
+        if isinstance(expected, dict):
+            if '$in' in expected and value not in expected['$in']:
+                return False
+            if '$lt' in expected and not (value is not None and value < expected['$lt']):
+                return False
+        elif value != expected:
+            return False
+    return True
+
+def _project(doc: dict, projection) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    result = {'_id': doc.get('_id')}
+    for path in projection:
+        head, _, rest = path.partition('.')
+        if head not in doc:
+            continue
+        if rest and isinstance(doc[head], dict):
+            result.setdefault(head, {}).update(_project(doc[head], [rest]))
+            result[head].pop('_id', None)
+        else:
+            result[head] = copy.deepcopy(doc[head])
+    return result
+
+class InMemoryCollection:
+    def __init__(self):
+        self.docs = []
+
+    def find(self, query=None, projection=None):
+        return _Cursor(_project(doc, projection) for doc in self.docs if _matches(doc, query or {}))
+
+    def find_one(self, query=None, projection=None):
+        for doc in self.docs:
+            if _matches(doc, query or {}):
+                return _project(doc, projection)
+        return None
+
+    def count_documents(self, query):
+        return sum(1 for doc in self.docs if _matches(doc, query))
+
+    def insert_many(self, docs):
+        self.docs.extend(copy.deepcopy(docs))
+
+    def update_one(self, query, update, upsert=False):
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update.get('$set', {}))
+                for key, amount in update.get('$inc', {}).items():
+                    doc[key] = doc.get(key, 0) + amount
+                return _Result(1)
+        if upsert:
+            self.docs.append({**query, **update.get('$set', {})})
+        return _Result(0)
+
+    def replace_one(self, query, document, upsert=False):
+        for i, doc in enumerate(self.docs):
+            if _matches(doc, query):
+                self.docs[i] = copy.deepcopy(document)
+                return _Result(1)
+        if upsert:
+            self.docs.append(copy.deepcopy(document))
+        return _Result(0)
+
+    def bulk_write(self, requests, ordered=True):
+        # UpdateOne keeps its filter and update in private attributes
+        return _Result(sum(self.update_one(op._filter, op._doc).matched_count for op in requests))
+
+    def delete_one(self, query):
+        for i, doc in enumerate(self.docs):
+            if _matches(doc, query):
+                del self.docs[i]
+                return _Result(1)
+        return _Result(0)
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+class InMemoryMongo(defaultdict):
+    """client[db][collection], like MongoClient."""
+
+    def __init__(self):
+        super().__init__(lambda: defaultdict(InMemoryCollection))
+
+    def close(self):
+        pass
+
+# --- Redis ---
+
+class InMemoryRedis:
+    def __init__(self):
+        self.streams = defaultdict(list)
+        self.sorted_sets = defaultdict(dict)
+        self.published = 0
+        self._seq = 0
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    def publish(self, channel, message):
+        self.published += 1
+        return 0
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        self._seq += 1
+        entry_id = f'{int(time.time() * 1000)}-{self._seq}'
+        stream = self.streams[name]
+        stream.append((entry_id, dict(fields)))
+        if maxlen is not None and len(stream) > maxlen:
+            del stream[:len(stream) - maxlen]
+        return entry_id
+
+    def xack(self, name, group, *ids):
+        return len(ids)
+
+    def xlen(self, name):
+        return len(self.streams.get(name, ()))
+
+    def expire(self, name, seconds):
+        return True
+
+    def zadd(self, name, mapping):
+        self.sorted_sets[name].update(mapping)
+        return len(mapping)
+
+    def zcard(self, name):
+        return len(self.sorted_sets.get(name, ()))
+
+    def ping(self):
+        return True
+
+class _Pipeline:
+    def __init__(self, client: InMemoryRedis):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        return lambda *args, **kwargs: self.calls.append((method, args, kwargs))
+
+    def execute(self):
+        results = [method(*args, **kwargs) for method, args, kwargs in self.calls]
+        self.calls = []
+        return results
+
+# --- MinIO ---
+
+class InMemoryMinio:
+    def __init__(self):
+        self.objects = {}
+
+    def bucket_exists(self, bucket):
+        return True
+
+    def put_object(self, bucket, key, data, length, content_type=None, **kwargs):
+        self.objects[(bucket, key)] = data.read(length)
+
+    def copy_object(self, bucket, key, source, **kwargs):
+        source_key = (source.bucket_name, source.object_name)
+        if source_key not in self.objects:
+            raise S3Error('NoSuchKey', 'Object does not exist', source.object_name, None, None, None)
+        self.objects[(bucket, key)] = self.objects[source_key]
+
+    def remove_object(self, bucket, key):
+        self.objects.pop((bucket, key), None)
@@ -1,19 +1,119 @@
-from langchain.document_loaders import JSONLoader
-from langchain.output_parsers import JsonOutputParser
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import Weaviate
-import networkx as nx, json, zipfile, os
-
-docs = JSONLoader("analysis.json").load()
-g = nx.Graph()
-for d in docs:
-    g.add_node(d["scene_id"])
-    for pair in d["relationships"]:
-        if pair["strength"] >= .3:
-            g.add_edge(pair["character_a"], pair["character_b"],
-                       weight=pair["strength"])
-nx.write_gexf(g, "network.gexf")
-
-with zipfile.ZipFile("film.zip","w") as z:
-    for f in ["analysis.json","locations.json","network.gexf"]:
-        z.write(f) 
\ No newline at end of file
+"""
+Budowanie sieci relacji postaci z analysis.json i pakowanie wyników do archiwum.
+
+Plik analizy (tablica JSON lub JSON Lines z obiektami scen: scene_id,
+relationships[{character_a, character_b, strength}]) jest czytany strumieniowo,
+scena po scenie, więc nie musi mieścić się w pamięci. Relacje są filtrowane
+w trakcie czytania, a archiwum jest zapisywane strumieniowo.
+
+Uruchomienie (z katalogu apps/worker-py):
+    python graph.py analysis.json --threshold 0.3 --archive film.zip --include locations.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import zipfile
+from typing import Iterator, List, Tuple
+
+import networkx as nx
+
+READ_BLOCK = 1 << 20
+
+_WHITESPACE = re.compile(r'\s*')
+_SEPARATORS = re.compile(r'[\s,]*')
+_DELIMITERS = ' \t\r\n,]'
+
+def iter_json_array(path: str, block_size: int = READ_BLOCK) -> Iterator[dict]:
+    """Yields the elements of a top-level JSON array (or the lines of a JSON Lines file) one by one."""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+
+        def refill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(block_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        refill()
+        pos = _WHITESPACE.match(buffer).end()
+        in_array = buffer.startswith('[', pos)
+        if in_array:
+            pos += 1
+        skip = _SEPARATORS if in_array else _WHITESPACE
+        while True:
+            pos = skip.match(buffer, pos).end()
+            if pos == len(buffer):
+                if eof:
+                    return
+                refill()
+                continue
+            if in_array and buffer[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                refill()
+                continue
+            # A number is complete only once a delimiter follows it ("6." may continue as "6.78e3")
+            if not eof and isinstance(item, (int, float)) and (end == len(buffer) or buffer[end] not in _DELIMITERS):
+                refill()
+                continue
+            yield item
+            pos = end
+            if not eof and len(buffer) - pos < block_size // 2:
+                refill()
+
+def filter_relationships(scene: dict, threshold: float) -> Iterator[Tuple[str, str, float]]:
+    """(character_a, character_b, strength) edges of a scene at or above the threshold."""
+    for pair in scene.get("relationships") or ():
+        if pair["strength"] >= threshold:
+            yield pair["character_a"], pair["character_b"], pair["strength"]
+
+def build_graph(path: str, threshold: float = 0.3) -> nx.Graph:
+    # Filtering is far cheaper than parsing, so it runs inline: shipping scenes
+    # to a process pool costs more in pickling than the filtering itself.
+    g = nx.Graph()
+    # Scenes are read in input order, so a pair seen in several scenes keeps its last strength
+    for scene in iter_json_array(path):
+        g.add_node(scene["scene_id"])
+        g.add_weighted_edges_from(filter_relationships(scene, threshold))
+    return g
+
+def write_gexf(g: nx.Graph, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in nx.generate_gexf(g):
+            f.write(line + '\n')
+
+def write_archive(archive_path: str, files: List[str]):
+    # ZipFile.write compresses each file block by block, without loading it whole
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as z:
+        for path in files:
+            z.write(path, os.path.basename(path))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('analysis', nargs='?', default='analysis.json', help='Plik analizy (tablica JSON lub JSON Lines)')
+    parser.add_argument('--threshold', type=float, default=0.3, help='Minimalna siła relacji (domyślnie 0.3)')
+    parser.add_argument('--gexf', default='network.gexf', help='Ścieżka wyjściowa grafu GEXF')
+    parser.add_argument('--archive', default='film.zip', help='Ścieżka archiwum ZIP ("" = bez archiwum)')
+    parser.add_argument('--include', action='append', default=None, help='Dodatkowe pliki w archiwum (domyślnie locations.json, jeśli istnieje)')
+    args = parser.parse_args(argv)
+
+    g = build_graph(args.analysis, args.threshold)
+    write_gexf(g, args.gexf)
+    print(f"Graf: {g.number_of_nodes()} węzłów, {g.number_of_edges()} krawędzi -> {args.gexf}")
+
+    if args.archive:
+        includes = args.include if args.include is not None else [p for p in ['locations.json'] if os.path.exists(p)]
+        write_archive(args.archive, [args.analysis, *includes, args.gexf])
+        print(f"Archiwum: {args.archive}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import re
+import math
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Hybrid retrieval for /search ---
+# Vector search misses exact character names and slugline terms (INT./EXT.,
+# locations), which a lexical index finds trivially. Both result lists are merged
+# with reciprocal rank fusion, then a cheap local reranker orders the candidates
+# and keeps the smallest prefix that still covers the question's informative terms.
+
+_TOKEN = re.compile(r'\w+')
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.casefold())
+
+class BM25Index:
+    """Okapi BM25 over an in-memory corpus; postings are numpy arrays per term."""
+
+    def __init__(self, documents: List[Any], texts: Iterable[str], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        lengths = []
+        for index, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for token in tokens:
+                postings[token][index] = postings[token].get(index, 0) + 1
+        self.doc_lengths = np.asarray(lengths, dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if lengths else 0.0
+        count = len(lengths)
+        self.postings = {}
+        self.idf = {}
+        for term, docs in postings.items():
+            self.postings[term] = (np.fromiter(docs.keys(), dtype=np.int64, count=len(docs)),
+                                   np.fromiter(docs.values(), dtype=np.float32, count=len(docs)))
+            self.idf[term] = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        if not self.documents:
+            return []
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            indices, tfs = self.postings[term]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[indices] / (self.avg_length or 1.0))
+            scores[indices] += self.idf[term] * tfs * (self.k1 + 1) / (tfs + norm)
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(index), float(scores[index])) for index in top]
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> Dict[str, float]:
+    fused: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            fused[key] += 1.0 / (k + rank + 1)
+    return fused
+
+class HybridRetriever:
+    """
+    vector_search(vector, k) -> documents and load_corpus() -> documents are
+    supplied by the caller; key(document) identifies a scene across both lists
+    and text(document) is what the lexical index sees. The BM25 index is rebuilt
+    in the background when index_version() changes; until the first build
+    finishes, retrieval is vector-only.
+    """
+
+    def __init__(self, vector_search: Callable[[Any, int], List[Any]], load_corpus: Callable[[], List[Any]],
+                 key: Callable[[Any], Any], text: Callable[[Any], str], index_version: Callable[[], Any] = None,
+                 candidates: int = 20, max_context: int = 4, relative_cutoff: float = 0.35,
+                 min_term_idf: float = 1.0, version_check_interval: float = 60):
+        self.vector_search = vector_search
+        self.load_corpus = load_corpus
+        self.key = key
+        self.text = text
+        self.index_version = index_version
+        self.candidates = candidates
+        self.max_context = max_context
+        self.relative_cutoff = relative_cutoff
+        self.min_term_idf = min_term_idf
+        self.version_check_interval = version_check_interval
+        self.index: Optional[BM25Index] = None
+        self._version = None
+        self._checked_at = 0.0
+        self._building = threading.Lock()
+
+    # --- Index maintenance ---
+
+    def refresh(self, force: bool = False):
+        """Rebuilds the lexical index if the scene index changed. Safe to call from any thread."""
+        if not self._building.acquire(blocking=False):
+            return
+        try:
+            version = self.index_version() if self.index_version else None
+            if not force and self.index is not None and version == self._version:
+                return
+            started = time.perf_counter()
+            documents = self.load_corpus()
+            self.index = BM25Index(documents, (self.text(doc) for doc in documents))
+            self._version = version
+            logger.info(f"Built BM25 index over {len(documents)} scenes in {time.perf_counter() - started:.2f}s.")
+        except Exception as e:
+            logger.error(f"Failed to build BM25 index: {str(e)}")
+        finally:
+            self._building.release()
+
+    def _refresh_in_background(self):
+        if time.monotonic() - self._checked_at < self.version_check_interval:
+            return
+        self._checked_at = time.monotonic()
+        threading.Thread(target=self.refresh, name='bm25-refresh', daemon=True).start()
+
+    # --- Retrieval ---
+
+    def retrieve(self, query: str, vector) -> List[Any]:
+        self._refresh_in_background()
+        by_key: Dict[Any, Any] = {}
+        rankings = []
+
+        vector_ranking = []
+        for doc in self.vector_search(vector, self.candidates):
+            by_key.setdefault(self.key(doc), doc)
+            vector_ranking.append(self.key(doc))
+        rankings.append(vector_ranking)
+
+        index = self.index
+        if index is not None:
+            lexical_ranking = []
+            for position, _ in index.search(query, self.candidates):
+                doc = index.documents[position]
+                by_key.setdefault(self.key(doc), doc)
+                lexical_ranking.append(self.key(doc))
+            rankings.append(lexical_ranking)
+
+        fused = reciprocal_rank_fusion(rankings)
+        return self.rerank(query, [by_key[key] for key in sorted(fused, key=fused.get, reverse=True)], fused)
+
+    def rerank(self, query: str, documents: List[Any], fused: Dict[Any, float]) -> List[Any]:
+        """
+        Scores candidates by fused rank and by how much of the question's
+        informative (IDF-weighted) vocabulary they contain, then keeps the best
+        ones until those terms are covered, the score drops below relative_cutoff
+        of the best, or max_context documents are selected.
+        """
+        if not documents:
+            return []
+        index = self.index
+        idf = index.idf if index is not None else {}
+        terms = {term: idf.get(term, self.min_term_idf) for term in set(tokenize(query))}
+        terms = {term: weight for term, weight in terms.items() if weight >= self.min_term_idf}
+        total_weight = sum(terms.values()) or 1.0
+        best_fused = max(fused.values())
+
+        scored = []
+        for doc in documents:
+            doc_terms = set(tokenize(self.text(doc))) & terms.keys()
+            coverage = sum(terms[term] for term in doc_terms) / total_weight
+            score = 0.5 * fused[self.key(doc)] / best_fused + 0.5 * coverage
+            scored.append((score, doc_terms, doc))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        selected, covered = [], set()
+        top_score = scored[0][0]
+        for score, doc_terms, doc in scored:
+            if len(selected) >= self.max_context:
+                break
+            if selected and (score < top_score * self.relative_cutoff or (terms and covered >= terms.keys())):
+                break
+            selected.append(doc)
+            covered |= doc_terms
+        return selected
@@ -0,0 +1,133 @@
+import os
+import logging
+import resource
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# --- Process memory ---
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # No procfs (e.g. macOS during development): fall back to the peak RSS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+def container_memory_limit() -> Optional[int]:
+    """Memory limit of the enclosing cgroup (v2, then v1), or None when unlimited."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as limit_file:
+                raw = limit_file.read().strip()
+        except OSError:
+            continue
+        if raw.isdigit() and int(raw) < (1 << 60):  # v1 reports "no limit" as a huge number
+            return int(raw)
+    return None
+
+# --- Per-job cost model ---
+# Peak memory of a graph job is dominated by the graph itself (one edge per
+# co-occurring character pair) and the serialized artifact buffers, which grow
+# with it. Estimates are scaled by a factor learned from jobs that ran alone.
+
+JOB_BASE_COST = 16 * MB
+COST_PER_SCENE = 2 * 1024
+COST_PER_MENTION = 1024
+COST_PER_PAIR = 3 * 1024
+
+def estimate_job_cost(character_lists: Iterable[List[str]]) -> int:
+    scenes = mentions = pairs = 0
+    for characters in character_lists:
+        k = len(characters)
+        scenes += 1
+        mentions += k
+        pairs += k * (k - 1) // 2
+    return JOB_BASE_COST + scenes * COST_PER_SCENE + mentions * COST_PER_MENTION + pairs * COST_PER_PAIR
+
+# --- Admission control ---
+
+class MemoryGovernor:
+    """
+    Decides how many stream messages the worker may claim. Every in-flight job
+    holds a reservation: the running average job cost when claimed, replaced by
+    its own estimate once its scenes are known. New work is claimed only while
+    RSS plus outstanding reservations stay under the ceiling, and not at all
+    above the high watermark. With nothing in flight one job is always
+    admitted, so an over-budget baseline cannot stall the worker.
+    """
+
+    def __init__(self, ceiling: int, max_concurrency: int = 4, high_watermark: float = 0.9, default_cost: int = 64 * MB):
+        self.ceiling = ceiling
+        self.max_concurrency = max(1, max_concurrency)
+        self.high_watermark = high_watermark
+        self.typical_cost = float(default_cost)
+        self.scale = 1.0
+        self._reserved: Dict[str, int] = {}
+        self._estimated: Dict[str, int] = {}
+        self._baseline: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        metrics.MEMORY_CEILING_BYTES.set(ceiling)
+
+    def in_flight(self) -> int:
+        return len(self._reserved)
+
+    def available_slots(self) -> int:
+        rss = current_rss()
+        with self._lock:
+            in_flight = len(self._reserved)
+            # Reservations cover memory the jobs have not allocated yet; part of it is already in RSS
+            outstanding = sum(self._reserved.values())
+            if in_flight == 0:
+                slots = 1
+            elif rss >= self.ceiling * self.high_watermark:
+                slots = 0
+            else:
+                headroom = self.ceiling - rss - outstanding
+                slots = max(0, min(self.max_concurrency - in_flight, int(headroom // max(self.typical_cost, 1))))
+        metrics.MEMORY_RSS_BYTES.set(rss)
+        metrics.MEMORY_RESERVED_BYTES.set(outstanding)
+        metrics.CLAIM_SLOTS.set(slots)
+        return slots
+
+    def claim(self, message_id: str):
+        with self._lock:
+            self._reserved[message_id] = int(self.typical_cost)
+            self._baseline[message_id] = current_rss()
+
+    def estimate(self, message_id: str, character_lists: Iterable[List[str]]) -> int:
+        """Replaces the claim-time reservation with this job's own cost estimate."""
+        estimate = estimate_job_cost(character_lists)
+        with self._lock:
+            if message_id in self._reserved:
+                self._estimated[message_id] = estimate
+                self._reserved[message_id] = int(estimate * self.scale)
+            return int(estimate * self.scale)
+
+    def sample(self, message_id: str):
+        """Called at a job's memory peak; calibrates the cost model from jobs running alone."""
+        rss = current_rss()
+        with self._lock:
+            if len(self._reserved) != 1 or message_id not in self._estimated:
+                return
+            observed = rss - self._baseline.get(message_id, rss)
+            if observed > 0:
+                ratio = observed / self._estimated[message_id]
+                self.scale = min(4.0, max(0.25, 0.8 * self.scale + 0.2 * ratio))
+
+    def release(self, message_id: str):
+        with self._lock:
+            reserved = self._reserved.pop(message_id, None)
+            self._baseline.pop(message_id, None)
+            if self._estimated.pop(message_id, None) is not None and reserved:
+                self.typical_cost = 0.8 * self.typical_cost + 0.2 * reserved
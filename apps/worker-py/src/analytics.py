@@ -0,0 +1,195 @@
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Dict, List
+
+import networkx as nx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# --- Graph analytics stage ---
+# Runs after the relationship graph is built: weighted degree, PageRank, sampled
+# betweenness and communities. Every metric works on flat edge arrays or adjacency
+# lists and respects a time budget, so large casts degrade to approximations
+# instead of stalling the job.
+
+class EdgeArrays:
+    """Undirected graph as integer edge columns over node indexes."""
+
+    def __init__(self, graph: nx.Graph):
+        self.nodes = list(graph.nodes)
+        index = {node: i for i, node in enumerate(self.nodes)}
+        edges = [(index[a], index[b], float(w)) for a, b, w in graph.edges(data='weight', default=1) if a != b]
+        self.n = len(self.nodes)
+        source = np.array([e[0] for e in edges], dtype=np.int64)
+        target = np.array([e[1] for e in edges], dtype=np.int64)
+        weight = np.array([e[2] for e in edges], dtype=np.float64)
+        # Both directions, so every aggregation is a single bincount
+        self.source = np.concatenate([source, target])
+        self.target = np.concatenate([target, source])
+        self.weight = np.concatenate([weight, weight])
+
+    def weighted_degree(self) -> np.ndarray:
+        return np.bincount(self.source, weights=self.weight, minlength=self.n)
+
+def pagerank(edges: EdgeArrays, alpha: float = 0.85, tol: float = 1.0e-8, max_iter: int = 100, time_budget: float = None) -> Dict:
+    n = edges.n
+    if n == 0:
+        return {"scores": np.zeros(0), "iterations": 0, "converged": True}
+    out_weight = edges.weighted_degree()
+    dangling = out_weight == 0
+    share = np.divide(edges.weight, out_weight[edges.source], out=np.zeros_like(edges.weight), where=out_weight[edges.source] > 0)
+    x = np.full(n, 1.0 / n)
+    deadline = time.monotonic() + time_budget if time_budget else None
+    converged = False
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        spread = np.bincount(edges.target, weights=x[edges.source] * share, minlength=n)
+        x_new = alpha * (spread + x[dangling].sum() / n) + (1.0 - alpha) / n
+        err = np.abs(x_new - x).sum()
+        x = x_new
+        if err < n * tol:
+            converged = True
+            break
+        if deadline and time.monotonic() > deadline:
+            break
+    return {"scores": x / x.sum(), "iterations": iterations, "converged": converged}
+
+def _adjacency(edges: EdgeArrays) -> List[List[tuple]]:
+    # Co-occurrence weight is a strength, so shortest paths use 1/weight as distance
+    adjacency = [[] for _ in range(edges.n)]
+    for s, t, w in zip(edges.source.tolist(), edges.target.tolist(), edges.weight.tolist()):
+        adjacency[s].append((t, 1.0 / w if w > 0 else float('inf')))
+    return adjacency
+
+def approximate_betweenness(edges: EdgeArrays, samples: int, time_budget: float = None, seed: int = 0) -> Dict:
+    """Brandes' algorithm from a random sample of source nodes, rescaled to the full node count."""
+    n = edges.n
+    betweenness = np.zeros(n)
+    if n < 3:
+        return {"scores": betweenness, "samples": 0, "exact": True}
+    adjacency = _adjacency(edges)
+    sources = list(range(n))
+    random.Random(seed).shuffle(sources)
+    sources = sources[:min(samples, n)]
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    used = 0
+    for s in sources:
+        if deadline and used and time.monotonic() > deadline:
+            break
+        used += 1
+        order = []
+        preds = [[] for _ in range(n)]
+        sigma = np.zeros(n)
+        sigma[s] = 1.0
+        dist = {}
+        seen = {s: 0.0}
+        counter = itertools.count()
+        heap = [(0.0, next(counter), s, s)]
+        while heap:
+            d, _, pred, v = heapq.heappop(heap)
+            if v in dist:
+                continue
+            if v != s:
+                sigma[v] += sigma[pred]
+            order.append(v)
+            dist[v] = d
+            for w, length in adjacency[v]:
+                vw = d + length
+                if w not in dist and (w not in seen or vw < seen[w]):
+                    seen[w] = vw
+                    heapq.heappush(heap, (vw, next(counter), v, w))
+                    sigma[w] = 0.0
+                    preds[w] = [v]
+                elif vw == seen[w]:
+                    sigma[w] += sigma[v]
+                    preds[w].append(v)
+        delta = np.zeros(n)
+        for w in reversed(order):
+            for v in preds[w]:
+                delta[v] += sigma[v] / sigma[w] * (1.0 + delta[w])
+            if w != s:
+                betweenness[w] += delta[w]
+
+    # Undirected paths are counted from both ends; normalize like networkx (normalized=True)
+    scale = n / used if used else 0.0
+    betweenness *= scale / ((n - 1) * (n - 2))
+    return {"scores": betweenness, "samples": used, "exact": used == n}
+
+def detect_communities(graph: nx.Graph, max_louvain_edges: int, seed: int = 0, time_budget: float = None, max_levels: int = None) -> Dict:
+    """
+    Louvain up to max_louvain_edges, label propagation above. Louvain stops after
+    the level that exceeds `time_budget` or after `max_levels` levels; every level
+    only merges communities, so the last finished one is a valid partition.
+    """
+    if graph.number_of_nodes() == 0:
+        return {"communities": [], "method": None, "levels": 0}
+    levels = 0
+    if graph.number_of_edges() <= max_louvain_edges:
+        deadline = time.monotonic() + time_budget if time_budget else None
+        communities = [{node} for node in graph.nodes]
+        for communities in nx.community.louvain_partitions(graph, weight='weight', seed=seed):
+            levels += 1
+            if (max_levels and levels >= max_levels) or (deadline and time.monotonic() > deadline):
+                break
+        method = 'louvain'
+    else:
+        communities = list(nx.community.asyn_lpa_communities(graph, weight='weight', seed=seed))
+        method = 'label_propagation'
+    communities = sorted((sorted(c) for c in communities), key=len, reverse=True)
+    return {"communities": communities, "method": method, "levels": levels}
+
+def _top(nodes: list, scores: np.ndarray, limit: int) -> List[dict]:
+    ranked = np.argsort(-scores, kind='stable')[:limit]
+    return [{"id": str(nodes[i]), "score": float(scores[i])} for i in ranked]
+
+def analyze_graph(graph: nx.Graph, time_budget: float, betweenness_samples: int, max_louvain_edges: int, job_id_for_logging: str = None) -> dict:
+    """
+    Computes node metrics, writes them as node attributes on `graph` and returns
+    the summary that goes into metrics.json.
+    """
+    timings = {}
+    start = time.perf_counter()
+    edges = EdgeArrays(graph)
+    degree = edges.weighted_degree()
+    timings['weighted_degree'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pr = pagerank(edges, time_budget=time_budget)
+    timings['pagerank'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bc = approximate_betweenness(edges, betweenness_samples, time_budget=time_budget)
+    timings['betweenness'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    communities = detect_communities(graph, max_louvain_edges, time_budget=time_budget)
+    timings['communities'] = time.perf_counter() - start
+
+    community_of = {node: idx for idx, members in enumerate(communities["communities"]) for node in members}
+    for i, node in enumerate(edges.nodes):
+        attrs = graph.nodes[node]
+        attrs['weighted_degree'] = float(degree[i])
+        attrs['pagerank'] = float(pr["scores"][i])
+        attrs['betweenness'] = float(bc["scores"][i])
+        attrs['community'] = int(community_of.get(node, -1))
+
+    logger.info(
+        f"Graph analytics done in {sum(timings.values()):.2f}s "
+        f"(pagerank iterations={pr['iterations']}, betweenness samples={bc['samples']}, communities={len(communities['communities'])}).",
+        extra={"job_id": job_id_for_logging}
+    )
+    return {
+        "nodes": graph.number_of_nodes(),
+        "edges": graph.number_of_edges(),
+        "density": nx.density(graph),
+        "pagerank": {"iterations": pr["iterations"], "converged": pr["converged"], "top": _top(edges.nodes, pr["scores"], 20)},
+        "betweenness": {"samples": bc["samples"], "exact": bc["exact"], "top": _top(edges.nodes, bc["scores"], 20)},
+        "weighted_degree": {"top": _top(edges.nodes, degree, 20)},
+        "communities": {"method": communities["method"], "levels": communities["levels"], "count": len(communities["communities"]), "members": communities["communities"]},
+        "timings": timings,
+    }
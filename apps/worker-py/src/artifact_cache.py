@@ -0,0 +1,95 @@
+import json
+import time
+import hashlib
+import logging
+from typing import Iterable, List, Optional
+
+from minio.commonconfig import CopySource
+from minio.error import S3Error
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+# --- Result memoization ---
+# The archive of a graph job depends only on the character lists of its scenes
+# (not on scene ids or order) and on the export settings. Identical inputs map to
+# one canonical object under artifacts/{fingerprint}.zip, which is server-side
+# copied to results/{jobId}/ instead of rebuilding, re-zipping and re-uploading.
+
+def scene_fingerprint(character_lists: Iterable[List[str]], settings: dict) -> str:
+    # Pair weights and appearances do not depend on the order of characters within
+    # a scene, nor on the order of scenes, so both are sorted before hashing.
+    scenes = sorted(sorted(characters) for characters in character_lists)
+    content = json.dumps({"scenes": scenes, "settings": settings}, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+class ArtifactIndex:
+    """Fingerprint -> canonical artifact index in Mongo, with LRU (max_entries) and TTL eviction."""
+
+    def __init__(self, collection, minio_client, bucket: str, max_entries: int = 1000, ttl: int = 30 * 86400, prefix: str = 'artifacts'):
+        self.collection = collection
+        self.minio_client = minio_client
+        self.bucket = bucket
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def object_key(self, fingerprint: str) -> str:
+        return f"{self.prefix}/{fingerprint}.zip"
+
+    def ensure_indexes(self):
+        self.collection.create_index([("fingerprint", ASCENDING)], unique=True)
+        self.collection.create_index([("lastUsedAt", DESCENDING)])
+
+    def reuse(self, fingerprint: str, dest_key: str, job_id_for_logging: str = None) -> bool:
+        """Copies the canonical artifact to dest_key. Returns False on a miss."""
+        entry = self.collection.find_one({"fingerprint": fingerprint})
+        if not entry:
+            return False
+        if time.time() - entry.get("createdAt", 0) > self.ttl:
+            self._remove(entry)
+            return False
+        try:
+            self.minio_client.copy_object(self.bucket, dest_key, CopySource(self.bucket, entry["objectKey"]))
+        except S3Error as e:
+            if e.code not in ('NoSuchKey', 'NoSuchObject'):
+                raise
+            logger.warning("Indexed artifact missing in MinIO, dropping index entry.", extra={"job_id": job_id_for_logging, "fingerprint": fingerprint})
+            self.collection.delete_one({"fingerprint": fingerprint})
+            return False
+        self.collection.update_one({"fingerprint": fingerprint}, {"$set": {"lastUsedAt": time.time()}, "$inc": {"hits": 1}})
+        logger.info("Reused memoized graph artifact.", extra={"job_id": job_id_for_logging, "fingerprint": fingerprint})
+        return True
+
+    def store(self, fingerprint: str, source_key: str, size: int, job_id_for_logging: str = None):
+        """Registers the artifact just uploaded to source_key under its fingerprint."""
+        object_key = self.object_key(fingerprint)
+        self.minio_client.copy_object(self.bucket, object_key, CopySource(self.bucket, source_key))
+        now = time.time()
+        self.collection.update_one(
+            {"fingerprint": fingerprint},
+            {"$set": {"objectKey": object_key, "size": size, "createdAt": now, "lastUsedAt": now, "hits": 0}},
+            upsert=True
+        )
+        self.evict(job_id_for_logging)
+
+    def evict(self, job_id_for_logging: str = None) -> int:
+        expired = list(self.collection.find({"createdAt": {"$lt": time.time() - self.ttl}}))
+        overflow = max(0, self.collection.count_documents({}) - len(expired) - self.max_entries)
+        if overflow:
+            expired_keys = {entry["fingerprint"] for entry in expired}
+            oldest = self.collection.find({}).sort("lastUsedAt", ASCENDING).limit(overflow + len(expired))
+            expired.extend(entry for entry in oldest if entry["fingerprint"] not in expired_keys)
+            expired = expired[:len(expired_keys) + overflow]
+        for entry in expired:
+            self._remove(entry)
+        if expired:
+            logger.info(f"Evicted {len(expired)} memoized graph artifacts.", extra={"job_id": job_id_for_logging})
+        return len(expired)
+
+    def _remove(self, entry: dict):
+        try:
+            self.minio_client.remove_object(self.bucket, entry["objectKey"])
+        except S3Error as e:
+            logger.warning(f"Failed to remove memoized artifact {entry['objectKey']}: {e}")
+        self.collection.delete_one({"fingerprint": entry["fingerprint"]})
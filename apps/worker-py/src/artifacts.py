@@ -0,0 +1,81 @@
+import io
+import json
+import logging
+from typing import Callable, Dict, List, Tuple
+
+import networkx as nx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FORMATS = ['gexf']
+NODE_METRIC_COLUMNS = {'weighted_degree': 'float32', 'pagerank': 'float64', 'betweenness': 'float64', 'community': 'int32'}
+
+# --- Artifact writers ---
+# Each writer turns the graph into (file name in the archive, bytes, already compressed?).
+# numpy is a regular dependency of the worker (the analytics stage needs it too).
+
+def write_gexf(graph: nx.Graph) -> List[Tuple[str, bytes, bool]]:
+    buffer = io.BytesIO()
+    nx.write_gexf(graph, buffer, encoding='utf-8', version='1.2draft')
+    return [('network.gexf', buffer.getvalue(), False)]
+
+def write_graphml(graph: nx.Graph) -> List[Tuple[str, bytes, bool]]:
+    buffer = io.BytesIO()
+    nx.write_graphml(graph, buffer, encoding='utf-8')
+    return [('network.graphml', buffer.getvalue(), False)]
+
+def write_npz(graph: nx.Graph) -> List[Tuple[str, bytes, bool]]:
+    """Edge list as integer/float columns plus a node dictionary (index -> label, size)."""
+    nodes = list(graph.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    edge_count = graph.number_of_edges()
+    source = np.empty(edge_count, dtype=np.int32)
+    target = np.empty(edge_count, dtype=np.int32)
+    weight = np.empty(edge_count, dtype=np.float32)
+    for i, (char1, char2, w) in enumerate(graph.edges(data='weight', default=1)):
+        source[i] = index[char1]
+        target[i] = index[char2]
+        weight[i] = w
+    columns = {
+        'source': source,
+        'target': target,
+        'weight': weight,
+        'node_size': np.array([graph.nodes[node].get('size', 0) for node in nodes], dtype=np.int32),
+    }
+    # Scores written by the analytics stage, when it ran
+    for attr, dtype in NODE_METRIC_COLUMNS.items():
+        if nodes and attr in graph.nodes[nodes[0]]:
+            columns[f'node_{attr}'] = np.array([graph.nodes[node].get(attr, 0) for node in nodes], dtype=dtype)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **columns)
+    node_dictionary = json.dumps({"nodes": [str(node) for node in nodes]}, ensure_ascii=False).encode('utf-8')
+    return [('network.npz', buffer.getvalue(), True), ('nodes.json', node_dictionary, False)]
+
+ARTIFACT_WRITERS: Dict[str, Callable[[nx.Graph], List[Tuple[str, bytes, bool]]]] = {
+    'gexf': write_gexf,
+    'graphml': write_graphml,
+    'npz': write_npz,
+}
+
+def parse_formats(raw, job_id_for_logging: str = None) -> List[str]:
+    """Parses a comma-separated format list, dropping unknown entries. Falls back to GEXF."""
+    if not raw:
+        return list(DEFAULT_FORMATS)
+    formats = []
+    for fmt in str(raw).split(','):
+        fmt = fmt.strip().lower()
+        if not fmt or fmt in formats:
+            continue
+        if fmt not in ARTIFACT_WRITERS:
+            logger.warning(f"Unknown graph artifact format '{fmt}' ignored.", extra={"job_id": job_id_for_logging})
+            continue
+        formats.append(fmt)
+    return formats or list(DEFAULT_FORMATS)
+
+def render_artifacts(graph: nx.Graph, formats: List[str]) -> List[Tuple[str, bytes, bool]]:
+    files = []
+    for fmt in formats:
+        files.extend(ARTIFACT_WRITERS[fmt](graph))
+    return files
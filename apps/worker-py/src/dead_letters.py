@@ -0,0 +1,65 @@
+"""
+Inspects and replays the graph job dead-letter stream (jobs that exhausted their
+retries or failed permanently).
+
+    python src/dead_letters.py list [--limit 20]
+    python src/dead_letters.py replay [--job-id ID] [--limit N] [--keep] [--dry-run]
+"""
+import os
+import sys
+import json
+import argparse
+
+from redis import Redis
+from dotenv import load_dotenv
+
+from retry import RetryPolicy
+
+# --- Configuration ---
+# Same variables and defaults as main.py, read here so the tool does not start any worker machinery
+load_dotenv()
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
+STREAM_GRAPH_GENERATION = os.getenv('REDIS_STREAM_GRAPH_GENERATION', 'stream_graph_generation')
+STREAM_GRAPH_GENERATION_DLQ = os.getenv('REDIS_STREAM_GRAPH_GENERATION_DLQ', f'{STREAM_GRAPH_GENERATION}:dead')
+DLQ_MAXLEN = int(os.getenv('REDIS_DLQ_MAXLEN', '10000'))
+
+def list_dead_letters(redis_client, limit: int, stream: str = STREAM_GRAPH_GENERATION_DLQ):
+    for entry_id, fields in redis_client.xrange(stream, count=limit):
+        history = RetryPolicy.error_history(fields)
+        last_error = history[-1] if history else {}
+        print(json.dumps({
+            "id": entry_id,
+            "jobId": fields.get('jobId'),
+            "attempts": len(history),
+            "lastErrorType": last_error.get('type'),
+            "lastError": last_error.get('error'),
+            "deadLetteredAt": fields.get('deadLetteredAt'),
+        }, ensure_ascii=False))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    list_parser = commands.add_parser('list', help='Print messages from the dead-letter stream')
+    list_parser.add_argument('--limit', type=int, default=20)
+    replay_parser = commands.add_parser('replay', help='Move messages back into the job stream')
+    replay_parser.add_argument('--job-id', help='Only messages of this job')
+    replay_parser.add_argument('--limit', type=int, default=None, help='Maximum number of messages')
+    replay_parser.add_argument('--keep', action='store_true', help='Keep the messages in the dead-letter stream')
+    replay_parser.add_argument('--dry-run', action='store_true', help='Only count the matching messages')
+    args = parser.parse_args(argv)
+
+    redis_client = Redis.from_url(REDIS_URL, decode_responses=True)
+    if args.command == 'list':
+        print(f"{STREAM_GRAPH_GENERATION_DLQ}: {redis_client.xlen(STREAM_GRAPH_GENERATION_DLQ)} messages")
+        list_dead_letters(redis_client, args.limit)
+        return 0
+
+    policy = RetryPolicy(redis_client, STREAM_GRAPH_GENERATION, dead_letter_stream=STREAM_GRAPH_GENERATION_DLQ, dead_letter_maxlen=DLQ_MAXLEN)
+    replayed = policy.replay_dead_letters(job_id=args.job_id, limit=args.limit, delete=not args.keep, dry_run=args.dry_run)
+    verb = 'Matching' if args.dry_run else 'Re-enqueued'
+    print(f"{verb} messages: {replayed} ({STREAM_GRAPH_GENERATION_DLQ} -> {STREAM_GRAPH_GENERATION})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
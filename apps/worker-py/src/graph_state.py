@@ -0,0 +1,169 @@
+import time
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_SEPARATOR = '#dup'
+
+# --- Per-scene contributions ---
+# A scene contributes +1 appearance per valid character entry and +1 weight per
+# unordered character pair, exactly as build_relationship_graph counts them.
+# Keeping these per scene lets a re-index job subtract the old contribution and
+# add the new one instead of rebuilding the whole graph.
+
+def scene_key(scene: dict) -> Optional[str]:
+    """Stable identifier of a scene document across re-index jobs."""
+    if scene.get('sceneId') is not None:
+        return str(scene['sceneId'])
+    if scene.get('_id') is not None:
+        return str(scene['_id'])
+    return None
+
+def scene_characters(scene: dict, job_id_for_logging: str = None) -> Optional[List[str]]:
+    """Returns the normalized character list of a scene, or None if the scene contributes nothing."""
+    analysis = scene.get('analysisResult')
+    if not analysis or not isinstance(analysis, dict):
+        logger.warning("Missing or invalid analysisResult for scene", extra={"job_id": job_id_for_logging, "scene_identifier": scene_key(scene)})
+        return None
+    characters = analysis.get('characters')
+    if not characters or not isinstance(characters, list):
+        return None
+    valid = [c.strip() for c in characters if isinstance(c, str) and c.strip()]
+    return valid or None
+
+def _edge_key(char1: str, char2: str) -> Tuple[str, str]:
+    return (char1, char2) if char1 <= char2 else (char2, char1)
+
+def contribution(characters: List[str]) -> Tuple[Counter, Counter]:
+    appearances = Counter(characters)
+    edges = Counter()
+    for i in range(len(characters)):
+        for j in range(i + 1, len(characters)):
+            edges[_edge_key(characters[i], characters[j])] += 1
+    return appearances, edges
+
+# --- Persisted graph state ---
+
+class GraphState:
+    """Aggregated co-occurrence weights plus the per-scene contributions they were built from."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.scenes: Dict[str, List[str]] = {}
+        self.appearances: Counter = Counter()
+        self.edges: Counter = Counter()
+        self.final_url: Optional[str] = None
+        self.formats: List[str] = []
+        # Analytics settings the exported archive was computed with
+        self.analytics: list = []
+        # False until the state has been saved; a delta can only be applied to a saved state
+        self.persisted = False
+
+    def _add(self, characters: List[str]):
+        appearances, edges = contribution(characters)
+        self.appearances.update(appearances)
+        self.edges.update(edges)
+
+    def _subtract(self, characters: List[str]):
+        appearances, edges = contribution(characters)
+        for char, count in appearances.items():
+            self.appearances[char] -= count
+            if self.appearances[char] <= 0:
+                del self.appearances[char]
+        for pair, weight in edges.items():
+            self.edges[pair] -= weight
+            if self.edges[pair] <= 0:
+                del self.edges[pair]
+
+    def set_scene(self, key: str, characters: Optional[List[str]]) -> bool:
+        """Replaces the contribution of one scene. Returns True if the graph changed."""
+        old = self.scenes.get(key)
+        if old == characters:
+            return False
+        if old is not None:
+            self._subtract(old)
+            del self.scenes[key]
+        if characters is not None:
+            self._add(characters)
+            self.scenes[key] = characters
+        return True
+
+    def apply_scenes(self, scenes_data: Iterable[dict], scope: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Applies fetched scene documents to the state.
+
+        `scope` lists the scene keys that were (re)fetched; keys in scope without a
+        matching INDEXED document are removed. With no scope every known key is in scope,
+        i.e. scenes_data is treated as the complete scene set. Returns the changed keys.
+        """
+        fetched: Dict[str, Optional[List[str]]] = {}
+        for scene_idx, scene in enumerate(scenes_data):
+            base = scene_key(scene) or f'scene_index_{scene_idx}'
+            # Duplicate sceneIds are each counted by a full rebuild, so they get their own slot
+            key, duplicate = base, 1
+            while key in fetched:
+                duplicate += 1
+                key = f'{base}{DUPLICATE_SEPARATOR}{duplicate}'
+            if scene.get('status', 'INDEXED') != 'INDEXED':
+                fetched[key] = None
+                continue
+            fetched[key] = scene_characters(scene, self.job_id)
+
+        keys = set(fetched)
+        if scope is None:
+            keys.update(self.scenes)
+        else:
+            scope = set(scope)
+            keys.update(key for key in self.scenes if key.split(DUPLICATE_SEPARATOR, 1)[0] in scope)
+        changed = [key for key in sorted(keys) if self.set_scene(key, fetched.get(key))]
+        if changed:
+            self.final_url = None
+        logger.info(f"Applied scene delta: {len(changed)} of {len(keys)} scenes changed.", extra={"job_id": self.job_id})
+        return changed
+
+    def to_graph(self) -> nx.Graph:
+        G = nx.Graph()
+        for char, appearances in self.appearances.items():
+            G.add_node(char, label=char, size=appearances)
+        for (char1, char2), weight in self.edges.items():
+            G.add_edge(char1, char2, weight=weight)
+        return G
+
+    # --- Mongo (de)serialization ---
+    # Scene ids and character names may contain '.' or '$', so nothing user-provided is used as a key.
+
+    def to_document(self) -> dict:
+        return {
+            "jobId": self.job_id,
+            "scenes": [{"sceneKey": key, "characters": chars} for key, chars in self.scenes.items()],
+            "appearances": [[char, count] for char, count in self.appearances.items()],
+            "edges": [[char1, char2, weight] for (char1, char2), weight in self.edges.items()],
+            "finalResultUrl": self.final_url,
+            "formats": self.formats,
+            "analytics": self.analytics,
+            "updatedAt": time.time(),
+        }
+
+    @classmethod
+    def from_document(cls, job_id: str, doc: Optional[dict]) -> 'GraphState':
+        state = cls(job_id)
+        if not doc:
+            return state
+        state.persisted = True
+        state.scenes = {entry["sceneKey"]: list(entry["characters"]) for entry in doc.get("scenes", [])}
+        state.appearances = Counter({char: count for char, count in doc.get("appearances", [])})
+        state.edges = Counter({_edge_key(char1, char2): weight for char1, char2, weight in doc.get("edges", [])})
+        state.final_url = doc.get("finalResultUrl")
+        state.formats = list(doc.get("formats", []))
+        state.analytics = list(doc.get("analytics", []))
+        return state
+
+def load_graph_state(collection, job_id: str) -> GraphState:
+    return GraphState.from_document(job_id, collection.find_one({"jobId": job_id}))
+
+def save_graph_state(collection, state: GraphState):
+    collection.replace_one({"jobId": state.job_id}, state.to_document(), upsert=True)
@@ -13,6 +13,18 @@ from dotenv import load_dotenv
 from pythonjsonlogger import jsonlogger
 import zipfile
 import io
+import socket
+import threading
+from graph_state import load_graph_state, save_graph_state
+from artifacts import parse_formats, render_artifacts
+from analytics import analyze_graph
+from progress import ProgressReporter
+from artifact_cache import ArtifactIndex, scene_fingerprint
+from supervisor import Supervisor, aggregate_child_metrics
+from retry import RetryPolicy
+from admission import MemoryGovernor, container_memory_limit
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures, FIRST_COMPLETED
+import metrics
 
 # --- Configuration & Logging ---
 load_dotenv()
@@ -25,6 +37,9 @@ formatter = jsonlogger.JsonFormatter('%(asctime)s %(levelname)s %(name)s %(modul
 logHandler.setFormatter(formatter)
 logger.addHandler(logHandler)
 logger.propagate = False # Prevent duplicate logging if root logger is configured
+# Helper modules (graph_state, ...) log through the root logger with the same JSON format
+logging.getLogger().addHandler(logHandler)
+logging.getLogger().setLevel(log_level)
 
 # --- Redis Configuration ---
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
@@ -32,14 +47,66 @@ REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
 STREAM_GRAPH_GENERATION = os.getenv('REDIS_STREAM_GRAPH_GENERATION', 'stream_graph_generation')
 GROUP_GRAPH_WORKERS = os.getenv('REDIS_GROUP_GRAPH_WORKERS', 'group_graph_workers')
 STREAM_PROGRESS_UPDATES = os.getenv('REDIS_STREAM_PROGRESS_UPDATES', 'stream_progress_updates') # For publishing progress
-# Consumer ID
-CONSUMER_ID = f'worker-py-{os.getpid()}'
+# Progress is coalesced per job: at most one update per interval unless the status changes.
+# Every published update is also kept in a capped per-job stream ({STREAM_PROGRESS_UPDATES}:{jobId}) for late subscribers.
+PROGRESS_MIN_INTERVAL = float(os.getenv('PROGRESS_MIN_INTERVAL', '0.5')) # Seconds
+PROGRESS_STREAM_MAXLEN = int(os.getenv('PROGRESS_STREAM_MAXLEN', '50'))
+PROGRESS_STREAM_TTL = int(os.getenv('PROGRESS_STREAM_TTL', '86400')) # Seconds
+
+# --- Retry Configuration ---
+# Transient failures (network, timeouts, throttling) are re-enqueued with exponential
+# backoff; permanent failures and exhausted retries go to the dead-letter stream.
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BACKOFF_BASE = float(os.getenv('JOB_RETRY_BACKOFF_BASE', '2')) # Seconds, doubled per attempt
+JOB_RETRY_BACKOFF_MAX = float(os.getenv('JOB_RETRY_BACKOFF_MAX', '300')) # Seconds
+STREAM_GRAPH_GENERATION_DLQ = os.getenv('REDIS_STREAM_GRAPH_GENERATION_DLQ', f'{STREAM_GRAPH_GENERATION}:dead')
+DLQ_MAXLEN = int(os.getenv('REDIS_DLQ_MAXLEN', '10000'))
+
+# Consumer ID. In supervisor mode each child is '{CONSUMER_ID}-{slot}', stable across restarts of that slot.
+CONSUMER_ID = os.getenv('CONSUMER_ID') or f'worker-py-{os.getpid()}'
+
+# --- Process Configuration ---
+# WORKER_PROCESSES > 1 starts a prefork supervisor with that many consumer processes
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', '1'))
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '60')) # Seconds to finish in-flight jobs on SIGTERM
+
+# --- Concurrency & Memory Configuration ---
+# Jobs run on a thread pool; how many messages are claimed depends on free memory.
+# The ceiling defaults to 80% of the container limit, split across consumer processes.
+WORKER_MAX_CONCURRENCY = int(os.getenv('WORKER_MAX_CONCURRENCY', '4'))
+WORKER_MEMORY_CEILING_MB = int(os.getenv('WORKER_MEMORY_CEILING_MB', '0')) # 0 = derive from the container limit
+WORKER_MEMORY_HIGH_WATERMARK = float(os.getenv('WORKER_MEMORY_HIGH_WATERMARK', '0.9')) # Fraction of the ceiling; stop claiming above it
 
 # --- MongoDB Configuration ---
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017')
 DB_NAME = os.getenv('MONGO_DB_NAME', 'ai-cinehub')
 JOBS_COLLECTION_NAME = os.getenv('MONGO_JOBS_COLLECTION', 'jobs')
 SCENES_COLLECTION_NAME = os.getenv('MONGO_SCENES_COLLECTION', 'scenes')
+GRAPH_STATES_COLLECTION_NAME = os.getenv('MONGO_GRAPH_STATES_COLLECTION', 'graph_states')
+GRAPH_ARTIFACTS_COLLECTION_NAME = os.getenv('MONGO_GRAPH_ARTIFACTS_COLLECTION', 'graph_artifacts')
+
+# --- Graph Artifact Configuration ---
+# Comma-separated list of gexf, graphml, npz; a job can override it with a `formats` message field
+GRAPH_ARTIFACT_FORMATS = os.getenv('GRAPH_ARTIFACT_FORMATS', 'gexf')
+
+# --- Graph Analytics Configuration ---
+GRAPH_ANALYTICS_ENABLED = os.getenv('GRAPH_ANALYTICS_ENABLED', 'True').lower() == 'true'
+GRAPH_ANALYTICS_TIME_BUDGET = float(os.getenv('GRAPH_ANALYTICS_TIME_BUDGET', '10')) # Seconds per iterative metric
+GRAPH_BETWEENNESS_SAMPLES = int(os.getenv('GRAPH_BETWEENNESS_SAMPLES', '256')) # Source nodes sampled for betweenness
+GRAPH_LOUVAIN_MAX_EDGES = int(os.getenv('GRAPH_LOUVAIN_MAX_EDGES', '200000')) # Above this, label propagation is used
+# Every setting that can change the exported metrics; part of the archive fingerprint and the graph state
+GRAPH_ANALYTICS_SETTINGS = [GRAPH_ANALYTICS_ENABLED, GRAPH_ANALYTICS_TIME_BUDGET, GRAPH_BETWEENNESS_SAMPLES, GRAPH_LOUVAIN_MAX_EDGES]
+
+# --- Result Memoization Configuration ---
+# Archives are memoized by a fingerprint of the scenes' character lists and reused across jobs
+GRAPH_MEMOIZATION_ENABLED = os.getenv('GRAPH_MEMOIZATION_ENABLED', 'True').lower() == 'true'
+GRAPH_MEMO_MAX_ENTRIES = int(os.getenv('GRAPH_MEMO_MAX_ENTRIES', '1000'))
+GRAPH_MEMO_TTL = int(os.getenv('GRAPH_MEMO_TTL', str(30 * 86400))) # Seconds
+
+# --- Metrics Configuration ---
+# Embedded HTTP endpoint: /metrics (Prometheus), /healthz (liveness), /readyz (Redis, Mongo, MinIO)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9102'))
 
 # --- MinIO Configuration ---
 MINIO_ENDPOINT = os.getenv('MINIO_ENDPOINT', 'localhost:9000')
@@ -52,28 +119,97 @@ MINIO_USE_SSL = os.getenv('MINIO_USE_SSL', 'False').lower() == 'true'
 redis_client: Redis = None
 mongo_client: MongoClient = None
 minio_client: Minio = None
+progress_reporter: ProgressReporter = None
+artifact_index: ArtifactIndex = None
+retry_policy: RetryPolicy = None
+memory_governor: MemoryGovernor = None
+# Guards the lazily created helpers above; job threads may be the first to ask for them
+_helpers_lock = threading.Lock()
 is_shutting_down = False
 
 # --- Helper Functions ---
 
-def publish_progress(job_id: str, status: str, progress: int, message: str, final_url: str = None):
-    if not redis_client:
-        logger.error("Redis client not initialized for publishing progress", extra={"job_id": job_id})
-        return
-    channel = f'progress:{job_id}'
-    payload = {
-        "jobId": job_id,
-        "status": status,
-        "progress": progress,
-        "message": message,
-    }
-    if final_url:
-        payload['finalResultUrl'] = final_url
-    try:
-        redis_client.publish(channel, json.dumps(payload))
-        logger.debug("Published progress update", extra={"job_id": job_id, "status": status, "progress": progress})
-    except Exception as e:
-        logger.error("Failed to publish progress update", extra={"job_id": job_id, "channel": channel, "error": str(e)})
+def get_progress_reporter() -> ProgressReporter:
+    global progress_reporter
+    if progress_reporter is None:
+        with _helpers_lock:
+            if progress_reporter is None:
+                progress_reporter = ProgressReporter(
+                    redis_client,
+                    mongo_client[DB_NAME][JOBS_COLLECTION_NAME],
+                    STREAM_PROGRESS_UPDATES,
+                    min_interval=PROGRESS_MIN_INTERVAL,
+                    stream_maxlen=PROGRESS_STREAM_MAXLEN,
+                    stream_ttl=PROGRESS_STREAM_TTL,
+                )
+    return progress_reporter
+
+def get_artifact_index() -> ArtifactIndex:
+    global artifact_index
+    if artifact_index is None:
+        with _helpers_lock:
+            if artifact_index is None:
+                artifact_index = ArtifactIndex(
+                    mongo_client[DB_NAME][GRAPH_ARTIFACTS_COLLECTION_NAME],
+                    minio_client,
+                    MINIO_BUCKET,
+                    max_entries=GRAPH_MEMO_MAX_ENTRIES,
+                    ttl=GRAPH_MEMO_TTL,
+                )
+    return artifact_index
+
+def get_retry_policy() -> RetryPolicy:
+    global retry_policy
+    if retry_policy is None:
+        with _helpers_lock:
+            if retry_policy is None:
+                retry_policy = RetryPolicy(
+                    redis_client,
+                    STREAM_GRAPH_GENERATION,
+                    max_attempts=JOB_MAX_ATTEMPTS,
+                    backoff_base=JOB_RETRY_BACKOFF_BASE,
+                    backoff_max=JOB_RETRY_BACKOFF_MAX,
+                    dead_letter_stream=STREAM_GRAPH_GENERATION_DLQ,
+                    dead_letter_maxlen=DLQ_MAXLEN,
+                )
+    return retry_policy
+
+def get_memory_governor() -> MemoryGovernor:
+    global memory_governor
+    if memory_governor is None:
+        with _helpers_lock:
+            if memory_governor is None:
+                if WORKER_MEMORY_CEILING_MB > 0:
+                    ceiling = WORKER_MEMORY_CEILING_MB * 1024 * 1024
+                else:
+                    limit = container_memory_limit()
+                    ceiling = int(limit * 0.8 / max(1, WORKER_PROCESSES)) if limit else 1024 * 1024 * 1024
+                memory_governor = MemoryGovernor(ceiling, max_concurrency=WORKER_MAX_CONCURRENCY, high_watermark=WORKER_MEMORY_HIGH_WATERMARK)
+                logger.info(f"Memory ceiling {ceiling // (1024 * 1024)} MB, up to {WORKER_MAX_CONCURRENCY} concurrent jobs.")
+    return memory_governor
+
+def object_url(object_key: str) -> str:
+    # Construct the final URL (assuming MinIO is accessible)
+    # This might need adjustment based on actual deployment (e.g., using presigned GET URL from API)
+    final_url_scheme = 'https' if MINIO_USE_SSL else 'http'
+    return f"{final_url_scheme}://{MINIO_ENDPOINT}/{MINIO_BUCKET}/{object_key}" # Basic URL
+
+def publish_progress(job_id: str, status: str, progress: int, message: str, final_url: str = None, fields: dict = None, final: bool = False):
+    """Reports job progress; status changes (plus final_url/fields) are also written to the job document."""
+    get_progress_reporter().report(job_id, status, progress, message, final_url=final_url, fields=fields, final=final)
+
+def parse_scene_ids(raw) -> list:
+    """Parses the optional `changedSceneIds` message field (JSON list or comma-separated string)."""
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = raw.split(',')
+    if isinstance(raw, str):
+        raw = [raw]
+    return [str(scene_id).strip() for scene_id in raw if str(scene_id).strip()]
 
 def build_relationship_graph(scenes_data: list, job_id_for_logging: str) -> nx.Graph:
     """Builds a NetworkX graph from scene analysis results."""
@@ -130,13 +266,26 @@ def build_relationship_graph(scenes_data: list, job_id_for_logging: str) -> nx.G
 # --- Main Job Processing Logic ---
 
 def process_graph_job(message_id: str, message_data: dict):
+    """Processes one graph job, recording its outcome and duration in the worker metrics."""
+    stages = metrics.StageLaps()
+    metrics.JOBS_IN_FLIGHT.inc()
+    outcome = 'failed'
+    try:
+        outcome = _process_graph_job(message_id, message_data, stages)
+    finally:
+        metrics.JOBS_IN_FLIGHT.dec()
+        metrics.JOBS_TOTAL.inc(outcome)
+        metrics.JOB_DURATION_SECONDS.observe(stages.total(), outcome)
+
+def _process_graph_job(message_id: str, message_data: dict, stages: metrics.StageLaps) -> str:
+    """Returns the job outcome: completed, unchanged, memoized, retrying, failed or invalid."""
     job_id = message_data.get('jobId')
     if not job_id:
         logger.error("Invalid message received, missing jobId", extra={"message_id": message_id, "data": message_data})
         # Acknowledge to prevent reprocessing
         if redis_client:
              redis_client.xack(STREAM_GRAPH_GENERATION, GROUP_GRAPH_WORKERS, message_id)
-        return
+        return 'invalid'
 
     # Create a logger adapter for this job_id
     job_extra = {'job_id': job_id}
@@ -145,49 +294,109 @@ def process_graph_job(message_id: str, message_data: dict):
     logger.info("Processing graph generation job...", extra=job_extra)
 
     try:
-        # 1. Update status and publish progress
-        jobs_coll = mongo_client[DB_NAME][JOBS_COLLECTION_NAME]
+        # 1. Update status and publish progress (one pipelined write for Redis and Mongo)
         scenes_coll = mongo_client[DB_NAME][SCENES_COLLECTION_NAME]
-        
-        update_result = jobs_coll.update_one({"jobId": job_id}, {"$set": {"status": "GENERATING_GRAPH", "updatedAt": time.time()}})
-        if update_result.matched_count == 0:
-            logger.warning("JobId not found in DB for status update to GENERATING_GRAPH. Proceeding, but this is unusual.", extra=job_extra)
         publish_progress(job_id, 'GENERATING_GRAPH', 10, "Pobieranie danych scen...")
 
-        # 2. Fetch all analyzed scenes for the job
-        scenes_cursor = scenes_coll.find({"jobId": job_id, "status": "INDEXED"})
+        # 2. Fetch the analyzed scenes for the job. Only the character lists are needed;
+        # a re-index job naming its changed scenes fetches just those (in any status),
+        # provided there is a saved graph state to apply them to.
+        states_coll = mongo_client[DB_NAME][GRAPH_STATES_COLLECTION_NAME]
+        graph_state = load_graph_state(states_coll, job_id)
+        changed_scene_ids = parse_scene_ids(message_data.get('changedSceneIds'))
+        if changed_scene_ids and not graph_state.persisted:
+            logger.info("No saved graph state, rebuilding from all scenes instead of the changed ones.", extra=job_extra)
+            changed_scene_ids = []
+        artifact_formats = parse_formats(message_data.get('formats') or GRAPH_ARTIFACT_FORMATS, job_id)
+        projection = {"sceneId": 1, "status": 1, "analysisResult.characters": 1}
+        if changed_scene_ids:
+            scenes_cursor = scenes_coll.find({"jobId": job_id, "sceneId": {"$in": changed_scene_ids}}, projection)
+        else:
+            scenes_cursor = scenes_coll.find({"jobId": job_id, "status": "INDEXED"}, projection)
         scenes_data = list(scenes_cursor)
-        if not scenes_data:
-            logger.error("No scenes with status 'INDEXED' found for graph generation.", extra=job_extra)
-            raise ValueError("No scenes with status 'INDEXED' found for graph generation")
         logger.info(f"Fetched {len(scenes_data)} scenes from MongoDB.", extra=job_extra)
+        stages.lap('fetch')
         publish_progress(job_id, 'GENERATING_GRAPH', 30, "Budowanie grafu relacji...")
 
-        # 3. Build the graph
-        graph = build_relationship_graph(scenes_data, job_id)
-        publish_progress(job_id, 'GENERATING_GRAPH', 60, "Generowanie pliku GEXF...")
-
-        # 4. Generate GEXF content in memory
-        gexf_buffer = io.BytesIO()
-        nx.write_gexf(graph, gexf_buffer, encoding='utf-8', version='1.2draft')
-        gexf_buffer.seek(0) # Reset buffer position to the beginning
-        gexf_content = gexf_buffer.read()
-        logger.info(f"Generated GEXF content ({len(gexf_content)} bytes).", extra=job_extra)
+        # 3. Apply the scene delta to the persisted graph state and build the graph from it
+        if not changed_scene_ids and not scenes_data:
+            logger.error("No scenes with status 'INDEXED' found for graph generation.", extra=job_extra)
+            raise ValueError("No scenes with status 'INDEXED' found for graph generation")
+        # Scenes without characters contribute nothing, so the graph may be empty, as in a full rebuild
+        changed_scenes = graph_state.apply_scenes(scenes_data, scope=changed_scene_ids or None)
+        job_cost = get_memory_governor().estimate(message_id, graph_state.scenes.values())
+        logger.debug(f"Estimated job memory: {job_cost // (1024 * 1024)} MB", extra=job_extra)
+        stages.lap('delta')
+
+        if (not changed_scenes and graph_state.final_url and graph_state.formats == artifact_formats
+                and graph_state.analytics == GRAPH_ANALYTICS_SETTINGS):
+            # Nothing changed since the last export, the uploaded archive is still current
+            final_url = graph_state.final_url
+            publish_progress(job_id, 'COMPLETED', 100, "Analiza zakończona.", final_url=final_url)
+            logger.info("Graph unchanged, reusing previous results.", extra=job_extra)
+            redis_client.xack(STREAM_GRAPH_GENERATION, GROUP_GRAPH_WORKERS, message_id)
+            logger.info(f"Acknowledged message {message_id}", extra=job_extra)
+            return 'unchanged'
+
+        # Same scene inputs and export settings as an earlier job: copy its archive server-side
+        zip_object_key = f"results/{job_id}/analysis_results.zip"
+        fingerprint = None
+        if GRAPH_MEMOIZATION_ENABLED:
+            fingerprint = scene_fingerprint(graph_state.scenes.values(), {
+                "formats": artifact_formats,
+                "analytics": GRAPH_ANALYTICS_SETTINGS,
+            })
+            reused = get_artifact_index().reuse(fingerprint, zip_object_key, job_id)
+            stages.lap('memo_lookup')
+            if reused:
+                final_url = object_url(zip_object_key)
+                graph_state.final_url = final_url
+                graph_state.formats = artifact_formats
+                graph_state.analytics = GRAPH_ANALYTICS_SETTINGS
+                save_graph_state(states_coll, graph_state)
+                publish_progress(job_id, 'COMPLETED', 100, "Analiza zakończona.", final_url=final_url)
+                logger.info("Job completed from memoized results.", extra=job_extra)
+                redis_client.xack(STREAM_GRAPH_GENERATION, GROUP_GRAPH_WORKERS, message_id)
+                logger.info(f"Acknowledged message {message_id}", extra=job_extra)
+                return 'memoized'
+
+        graph = graph_state.to_graph()
+        logger.info(f"Built graph with {graph.number_of_nodes()} nodes and {graph.number_of_edges()} edges ({len(changed_scenes)} scenes changed).", extra=job_extra)
+        stages.lap('build')
+
+        # 4. Compute graph metrics; scores become node attributes of the exported artifacts
+        graph_metrics = None
+        if GRAPH_ANALYTICS_ENABLED:
+            publish_progress(job_id, 'GENERATING_GRAPH', 50, "Obliczanie metryk grafu...")
+            graph_metrics = analyze_graph(graph, GRAPH_ANALYTICS_TIME_BUDGET, GRAPH_BETWEENNESS_SAMPLES, GRAPH_LOUVAIN_MAX_EDGES, job_id)
+            stages.lap('analytics')
+        publish_progress(job_id, 'GENERATING_GRAPH', 60, f"Generowanie plików grafu ({', '.join(artifact_formats)})...")
+
+        # 5. Generate the requested graph artifacts in memory
+        artifact_files = render_artifacts(graph, artifact_formats)
+        if graph_metrics is not None:
+            artifact_files.append(('metrics.json', json.dumps(graph_metrics, ensure_ascii=False).encode('utf-8'), False))
+        for file_name, content, _ in artifact_files:
+            logger.info(f"Generated {file_name} ({len(content)} bytes).", extra=job_extra)
+        stages.lap('serialize')
         publish_progress(job_id, 'GENERATING_GRAPH', 80, "Tworzenie archiwum ZIP...")
 
-        # 5. Create ZIP archive in memory
+        # 6. Create ZIP archive in memory
         zip_buffer = io.BytesIO()
         with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.writestr('network.gexf', gexf_content)
+            for file_name, content, compressed in artifact_files:
+                # Already-compressed artifacts (npz) are stored as-is instead of deflated twice
+                zipf.writestr(file_name, content, compress_type=zipfile.ZIP_STORED if compressed else zipfile.ZIP_DEFLATED)
             # Optionally add the full JSON analysis data
             # zipf.writestr('analysis.json', json.dumps(scenes_data, default=str)) # Use default=str for non-serializable data like ObjectId
         zip_buffer.seek(0)
         zip_content = zip_buffer.read()
         zip_size = len(zip_content)
         logger.info(f"Created ZIP archive ({zip_size} bytes).", extra=job_extra)
+        stages.lap('zip')
+        get_memory_governor().sample(message_id) # Graph, artifacts and archive are all alive here
 
-        # 6. Upload ZIP to MinIO
-        zip_object_key = f"results/{job_id}/analysis_results.zip"
+        # 7. Upload ZIP to MinIO
         minio_client.put_object(
             MINIO_BUCKET,
             zip_object_key,
@@ -195,47 +404,67 @@ def process_graph_job(message_id: str, message_data: dict):
             zip_size,
             content_type='application/zip'
         )
-        # Construct the final URL (assuming MinIO is accessible)
-        # This might need adjustment based on actual deployment (e.g., using presigned GET URL from API)
-        final_url_scheme = 'https' if MINIO_USE_SSL else 'http'
-        final_url = f"{final_url_scheme}://{MINIO_ENDPOINT}/{MINIO_BUCKET}/{zip_object_key}" # Basic URL
+        final_url = object_url(zip_object_key)
         logger.info(f"Uploaded results ZIP to MinIO: {final_url}", extra=job_extra)
-
-        # 7. Update final job status in MongoDB
-        jobs_coll.update_one(
-            {"jobId": job_id},
-            {"$set": {"status": "COMPLETED", "finalResultUrl": final_url, "updatedAt": time.time()}}
-        )
+        stages.lap('upload')
+        if fingerprint:
+            try:
+                get_artifact_index().store(fingerprint, zip_object_key, zip_size, job_id)
+            except Exception as memo_err:
+                # Memoization is an optimization only; the job result is already uploaded
+                logger.warning(f"Failed to memoize graph artifact: {str(memo_err)}", extra=job_extra)
+
+        # Persist the graph state only once its export exists, so a failed job is fully redone
+        graph_state.final_url = final_url
+        graph_state.formats = artifact_formats
+        graph_state.analytics = GRAPH_ANALYTICS_SETTINGS
+        save_graph_state(states_coll, graph_state)
+
+        # 8. Update final job status in MongoDB and publish it
         publish_progress(job_id, 'COMPLETED', 100, "Analiza zakończona.", final_url=final_url)
         logger.info("Job completed successfully.", extra=job_extra)
 
-        # 8. Acknowledge message
+        # 9. Acknowledge message
         redis_client.xack(STREAM_GRAPH_GENERATION, GROUP_GRAPH_WORKERS, message_id)
         logger.info(f"Acknowledged message {message_id}", extra=job_extra)
+        return 'completed'
 
-    except ValueError as ve:
-        logger.error(f"ValueError during job processing: {str(ve)}", extra=job_extra)
-        # Update job to FAILED, then re-raise or handle as a specific failure type
-        try:
-            jobs_coll = mongo_client[DB_NAME][JOBS_COLLECTION_NAME]
-            jobs_coll.update_one({"jobId": job_id}, {"$set": {"status": "FAILED", "errorMessage": f"Graph generation failed: {str(ve)}", "updatedAt": time.time()}})
-            publish_progress(job_id, 'FAILED', 0, f"Błąd generowania grafu: {str(ve)}")
-            if redis_client: # Ensure client exists before acking
-                redis_client.xack(STREAM_GRAPH_GENERATION, GROUP_GRAPH_WORKERS, message_id)
-            logger.warn(f"Acknowledged failed message {message_id} due to ValueError.", extra=job_extra)
-        except Exception as ack_err:
-            logger.error(f"Failed to update status/ack failed job after ValueError: {str(ack_err)}", extra=job_extra)
     except Exception as e:
-        logger.error(f"Failed to process graph generation job: {str(e)}", exc_info=True, extra=job_extra) # exc_info=True for stack trace
-        try:
-            jobs_coll = mongo_client[DB_NAME][JOBS_COLLECTION_NAME]
-            jobs_coll.update_one({"jobId": job_id}, {"$set": {"status": "FAILED", "errorMessage": f"Graph generation failed: {str(e)}", "updatedAt": time.time()}})
-            publish_progress(job_id, 'FAILED', 0, f"Błąd generowania grafu: {str(e)}")
-            if redis_client: # Ensure client exists before acking
-                 redis_client.xack(STREAM_GRAPH_GENERATION, GROUP_GRAPH_WORKERS, message_id)
-            logger.warn(f"Acknowledged failed message {message_id}", extra=job_extra)
-        except Exception as ack_err:
-            logger.error(f"Failed to update status/ack failed job: {str(ack_err)}", exc_info=True, extra=job_extra)
+        return handle_job_failure(message_id, message_data, job_id, e)
+
+def handle_job_failure(message_id: str, message_data: dict, job_id: str, error: Exception) -> str:
+    """
+    Retries transient failures with backoff and dead-letters the rest. The message is
+    acknowledged only after its retry or dead letter has been recorded, so a Redis
+    outage here leaves it pending for redelivery instead of losing it. Once it is
+    acknowledged, the progress update is best-effort: a redelivery would record the
+    retry or dead letter twice.
+    """
+    job_extra = {'job_id': job_id}
+    attempt = RetryPolicy.attempt(message_data)
+    if isinstance(error, ValueError):
+        logger.error(f"ValueError during job processing: {str(error)}", extra=job_extra)
+    else:
+        logger.error(f"Failed to process graph generation job (attempt {attempt}): {str(error)}", exc_info=True, extra=job_extra) # exc_info=True for stack trace
+    try:
+        action, delay = get_retry_policy().handle_failure(message_data, error)
+        redis_client.xack(STREAM_GRAPH_GENERATION, GROUP_GRAPH_WORKERS, message_id)
+    except Exception as ack_err:
+        logger.error(f"Failed to retry/dead-letter failed job, leaving message pending: {str(ack_err)}", exc_info=True, extra=job_extra)
+        return 'failed'
+
+    if action == 'retry':
+        logger.warning(f"Scheduled retry {attempt + 1}/{JOB_MAX_ATTEMPTS} of message {message_id} in {delay:.1f}s.", extra=job_extra)
+    else:
+        logger.warning(f"Moved failed message {message_id} to dead-letter stream {STREAM_GRAPH_GENERATION_DLQ}.", extra=job_extra)
+    try:
+        if action == 'retry':
+            publish_progress(job_id, 'GENERATING_GRAPH', 0, f"Błąd przejściowy, ponowienie za {delay:.0f} s (próba {attempt + 1}/{JOB_MAX_ATTEMPTS})...", final=True)
+        else:
+            publish_progress(job_id, 'FAILED', 0, f"Błąd generowania grafu: {str(error)}", fields={"errorMessage": f"Graph generation failed: {str(error)}"})
+    except Exception as progress_err:
+        logger.error(f"Failed to publish failure progress: {str(progress_err)}", exc_info=True, extra=job_extra)
+    return 'retrying' if action == 'retry' else 'failed'
 
 # --- Initialization and Worker Loop ---
 
@@ -293,34 +522,81 @@ def initialize_clients():
         else:
             logger.info(f"MinIO bucket '{MINIO_BUCKET}' already exists.")
 
+        # Memoized artifact index (needs both Mongo and MinIO)
+        if GRAPH_MEMOIZATION_ENABLED:
+            get_artifact_index().ensure_indexes()
+
         logger.info("All clients initialized successfully.")
         return True
     except Exception as e:
         logger.critical(f"Failed to initialize clients during startup: {str(e)}", exc_info=True)
         return False
 
+def run_claimed_job(message_id: str, message_data: dict):
+    try:
+        process_graph_job(message_id, message_data)
+    except Exception as e:
+        # process_graph_job handles job errors itself; this only guards the pool thread
+        logger.error(f"Unhandled error processing message {message_id}: {str(e)}", exc_info=True)
+        metrics.WORKER_LOOP_ERRORS.inc()
+    finally:
+        get_memory_governor().release(message_id)
+
 def worker_loop():
     logger.info(f"Worker started. Consumer ID: {CONSUMER_ID}. Waiting for jobs in stream {STREAM_GRAPH_GENERATION}...")
+    governor = get_memory_governor()
+    executor = ThreadPoolExecutor(max_workers=WORKER_MAX_CONCURRENCY, thread_name_prefix='graph-job')
+    in_flight = set()
+    # Start with messages delivered to this consumer name but never acknowledged
+    # (a previous process in the same slot crashed or was killed mid-job), then switch to new ones.
+    read_id = '0'
+    backpressure_logged = False
     while not is_shutting_down:
         try:
-            # Read from stream, block for 5 seconds
+            in_flight = {future for future in in_flight if not future.done()}
+
+            # Move delayed retries that are due back into the stream
+            get_retry_policy().promote_due()
+
+            # Claim only as many messages as memory and the pool allow
+            slots = governor.available_slots()
+            if slots == 0:
+                if not backpressure_logged:
+                    logger.warning(f"Memory near ceiling, pausing claims ({governor.in_flight()} jobs in flight).")
+                    backpressure_logged = True
+                wait_futures(in_flight, timeout=1, return_when=FIRST_COMPLETED)
+                continue
+            backpressure_logged = False
+
+            # Read from stream; block briefly while jobs run so finished slots are refilled quickly
             response = redis_client.xreadgroup(
                 groupname=GROUP_GRAPH_WORKERS, 
                 consumername=CONSUMER_ID,
-                streams={STREAM_GRAPH_GENERATION: '>'}, # Read new messages for this consumer
-                count=1,
-                block=5000 # 5 seconds
+                streams={STREAM_GRAPH_GENERATION: read_id}, # '>' reads new messages for this consumer
+                count=slots,
+                block=1000 if in_flight else 5000
             )
 
+            if read_id != '>' and (not response or not response[0][1]):
+                logger.info("No pending messages left for this consumer, reading new messages.")
+                read_id = '>'
+                continue
+
             if response:
                 # response format: [[stream_name, [[message_id, {key: val, ...}]]]]
                 stream_name, messages = response[0]
-                message_id, message_data_raw = messages[0] # message_data is dict of bytes
-                # Assuming message_data needs to be decoded if not already by redis-py
-                # decode_responses=True in Redis.from_url should handle this.
-                message_data = message_data_raw # If decode_responses=True, it's already a dict of strings
-                logger.info("Received new message", extra={"message_id": message_id, "stream": stream_name})
-                process_graph_job(message_id, message_data)
+                for message_id, message_data_raw in messages: # message_data is dict of bytes
+                    if read_id != '>':
+                        read_id = message_id # Continue after this entry even if it stays pending
+                    if not message_data_raw:
+                        # Entry was trimmed from the stream while pending; nothing left to process
+                        redis_client.xack(STREAM_GRAPH_GENERATION, GROUP_GRAPH_WORKERS, message_id)
+                        continue
+                    # decode_responses=True in Redis.from_url already gives a dict of strings
+                    message_data = message_data_raw
+                    logger.info("Received new message", extra={"message_id": message_id, "stream": stream_name})
+                    governor.claim(message_id)
+                    in_flight.add(executor.submit(run_claimed_job, message_id, message_data))
             else:
                 # Timeout, no new messages
                 logger.debug("No new messages, looping...")
@@ -328,11 +604,32 @@ def worker_loop():
 
         except Exception as e:
             logger.error(f"Error in worker loop: {str(e)}", exc_info=True)
+            metrics.WORKER_LOOP_ERRORS.inc()
             # Avoid busy-looping on persistent errors
             time.sleep(5)
 
+    if in_flight:
+        logger.info(f"Waiting for {len(in_flight)} in-flight jobs to finish...")
+    executor.shutdown(wait=True)
     logger.info("Exiting worker loop.")
 
+def start_metrics_endpoint():
+    readiness_checks = {
+        "redis": lambda: redis_client.ping(),
+        "mongo": lambda: mongo_client.admin.command('ping').get('ok') == 1,
+        "minio": lambda: minio_client.bucket_exists(MINIO_BUCKET),
+    }
+    try:
+        metrics.start_metrics_server(
+            METRICS_PORT,
+            readiness_checks,
+            extra_lines=lambda: metrics.consumer_lag_lines(redis_client, STREAM_GRAPH_GENERATION, GROUP_GRAPH_WORKERS)
+                + metrics.retry_queue_lines(redis_client, get_retry_policy().delayed_key, STREAM_GRAPH_GENERATION_DLQ),
+        )
+    except OSError as e:
+        # Metrics are diagnostic only; the worker keeps processing jobs without them
+        logger.error(f"Failed to start metrics endpoint on port {METRICS_PORT}: {str(e)}")
+
 def shutdown_handler(signum, frame):
     global is_shutting_down
     if not is_shutting_down:
@@ -341,14 +638,22 @@ def shutdown_handler(signum, frame):
     else:
         logger.warning("Shutdown already in progress.")
 
-if __name__ == "__main__":
+def run_worker(slot: int = None) -> int:
+    """Runs one consumer until shutdown. `slot` is set when started by the supervisor."""
+    global CONSUMER_ID, METRICS_PORT
+    if slot is not None:
+        CONSUMER_ID = f"{os.getenv('CONSUMER_ID') or f'worker-py-{socket.gethostname()}'}-{slot}"
+        METRICS_PORT = METRICS_PORT + 1 + slot # The supervisor serves METRICS_PORT itself
+
     clients_initialized_successfully = initialize_clients() # Store result
     if not clients_initialized_successfully:
         logger.critical("Client initialization failed. Exiting worker-py now as per defined logic.") # More specific exit log
-        sys.exit(1) # Ensure exit
+        return 1
 
     signal.signal(signal.SIGINT, shutdown_handler)
     signal.signal(signal.SIGTERM, shutdown_handler)
+    if METRICS_ENABLED:
+        start_metrics_endpoint()
     logger.info("Worker-py started. Waiting for jobs...")
     logger.info("Attempting to start worker_loop...")
     worker_loop()
@@ -357,6 +662,11 @@ if __name__ == "__main__":
 
     # Cleanup after loop exits
     logger.info("Cleaning up resources...")
+    if progress_reporter:
+        try:
+            progress_reporter.close()
+        except Exception as e:
+            logger.error(f"Error flushing pending progress updates: {str(e)}")
     if redis_client:
         try:
             redis_client.close()
@@ -371,4 +681,29 @@ if __name__ == "__main__":
             logger.error(f"Error closing MongoDB connection: {str(e)}")
 
     logger.info("Worker shutdown complete.")
-    sys.exit(0) 
\ No newline at end of file
+    return 0
+
+def run_supervisor() -> int:
+    logger.info(f"Starting prefork supervisor with {WORKER_PROCESSES} consumer processes.")
+    supervisor = Supervisor(run_worker, WORKER_PROCESSES, drain_timeout=SHUTDOWN_DRAIN_TIMEOUT)
+    child_ports = {slot: METRICS_PORT + 1 + slot for slot in range(WORKER_PROCESSES)}
+
+    def start_supervisor_metrics():
+        # Called by the supervisor after forking its children, so they do not inherit the HTTP thread
+        try:
+            return metrics.start_metrics_server(
+                METRICS_PORT,
+                {"consumers": lambda: len(supervisor.alive()) == WORKER_PROCESSES},
+                extra_lines=lambda: aggregate_child_metrics(child_ports),
+                registry=[supervisor.restarts],
+            )
+        except OSError as e:
+            logger.error(f"Failed to start metrics endpoint on port {METRICS_PORT}: {str(e)}")
+            return None
+
+    return supervisor.run(after_start=start_supervisor_metrics if METRICS_ENABLED else None)
+
+if __name__ == "__main__":
+    if WORKER_PROCESSES > 1:
+        sys.exit(run_supervisor())
+    sys.exit(run_worker())
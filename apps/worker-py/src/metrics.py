@@ -0,0 +1,209 @@
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- Minimal Prometheus exposition ---
+# Counters, gauges and histograms rendered in the Prometheus text format. Kept
+# dependency-free so the worker image needs no extra packages.
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _escape(value) -> str:
+    # Escaping of label values required by the Prometheus text format
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('%s="%s"' % (name, _escape(value)) for name, value in pairs) + '}'
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.label_names, labels)} {value}')
+        return lines
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # labels -> [per-bucket counts, sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, ("le", str(bound)))} {bucket_count}')
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, ("le", "+Inf"))} {count}')
+                lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {total}')
+                lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {count}')
+        return lines
+
+# --- Worker metrics ---
+
+JOB_STAGE_SECONDS = Histogram('worker_py_job_stage_seconds', 'Duration of graph job stages.', ('stage',))
+JOB_DURATION_SECONDS = Histogram('worker_py_job_duration_seconds', 'Duration of whole graph jobs.', ('outcome',))
+JOBS_TOTAL = Counter('worker_py_jobs_total', 'Graph jobs processed, by outcome.', ('outcome',))
+JOBS_IN_FLIGHT = Gauge('worker_py_jobs_in_flight', 'Graph jobs currently being processed.')
+WORKER_LOOP_ERRORS = Counter('worker_py_loop_errors_total', 'Errors raised in the worker loop itself.')
+MEMORY_RSS_BYTES = Gauge('worker_py_memory_rss_bytes', 'Resident memory of the consumer process.')
+MEMORY_RESERVED_BYTES = Gauge('worker_py_memory_reserved_bytes', 'Estimated memory still to be allocated by in-flight jobs.')
+MEMORY_CEILING_BYTES = Gauge('worker_py_memory_ceiling_bytes', 'Memory ceiling used for admission control.')
+CLAIM_SLOTS = Gauge('worker_py_claim_slots', 'Messages the consumer may claim on its next read (0 = backpressure).')
+REGISTRY = [JOB_STAGE_SECONDS, JOB_DURATION_SECONDS, JOBS_TOTAL, JOBS_IN_FLIGHT, WORKER_LOOP_ERRORS,
+            MEMORY_RSS_BYTES, MEMORY_RESERVED_BYTES, MEMORY_CEILING_BYTES, CLAIM_SLOTS]
+
+class StageLaps:
+    """Records consecutive job stages: each lap() observes the time since the previous one."""
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> float:
+        now = time.perf_counter()
+        elapsed = now - self._last
+        JOB_STAGE_SECONDS.observe(elapsed, stage)
+        self._last = now
+        return elapsed
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+def consumer_lag_lines(redis_client, stream: str, group: str) -> List[str]:
+    """Consumer-group lag and pending counts, read from XINFO GROUPS / XPENDING at scrape time."""
+    lines = [
+        '# HELP worker_py_stream_lag Entries in the stream not yet delivered to the consumer group.',
+        '# TYPE worker_py_stream_lag gauge',
+        '# HELP worker_py_stream_pending Entries delivered but not yet acknowledged.',
+        '# TYPE worker_py_stream_pending gauge',
+        '# HELP worker_py_stream_pending_oldest_idle_seconds Idle time of the oldest unacknowledged entry.',
+        '# TYPE worker_py_stream_pending_oldest_idle_seconds gauge',
+    ]
+    labels = _labels(('stream', 'group'), (stream, group))
+    for info in redis_client.xinfo_groups(stream):
+        if info.get('name') != group:
+            continue
+        # 'lag' is reported by Redis >= 7.0; older servers leave it out
+        if info.get('lag') is not None:
+            lines.append(f'worker_py_stream_lag{labels} {info["lag"]}')
+        lines.append(f'worker_py_stream_pending{labels} {info.get("pending", 0)}')
+    oldest = redis_client.xpending_range(stream, group, min='-', max='+', count=1)
+    idle = oldest[0]['time_since_delivered'] / 1000.0 if oldest else 0.0
+    lines.append(f'worker_py_stream_pending_oldest_idle_seconds{labels} {idle}')
+    return lines
+
+def retry_queue_lines(redis_client, delayed_key: str, dead_letter_stream: str) -> List[str]:
+    """Sizes of the delayed-retry set and the dead-letter stream."""
+    return [
+        '# HELP worker_py_retries_scheduled Failed jobs waiting for a delayed retry.',
+        '# TYPE worker_py_retries_scheduled gauge',
+        f'worker_py_retries_scheduled {redis_client.zcard(delayed_key)}',
+        '# HELP worker_py_dead_letters Messages in the dead-letter stream.',
+        '# TYPE worker_py_dead_letters gauge',
+        f'worker_py_dead_letters{_labels(("stream",), (dead_letter_stream,))} {redis_client.xlen(dead_letter_stream)}',
+    ]
+
+def render_metrics(extra_lines: Callable[[], List[str]] = None, registry: list = None) -> str:
+    lines = []
+    for metric in REGISTRY if registry is None else registry:
+        lines.extend(metric.render())
+    if extra_lines:
+        try:
+            lines.extend(extra_lines())
+        except Exception as e:
+            logger.warning(f"Failed to collect scrape-time metrics: {str(e)}")
+    return '\n'.join(lines) + '\n'
+
+# --- HTTP endpoint ---
+# /metrics  Prometheus scrape target
+# /healthz  liveness (the process and its HTTP thread are alive)
+# /readyz   readiness: every dependency check must pass
+
+def start_metrics_server(port: int, readiness_checks: Dict[str, Callable[[], bool]], extra_lines: Callable[[], List[str]] = None, registry: list = None) -> ThreadingHTTPServer:
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: str, content_type: str):
+            payload = body.encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/metrics':
+                self._send(200, render_metrics(extra_lines, registry), 'text/plain; version=0.0.4; charset=utf-8')
+            elif path == '/healthz':
+                self._send(200, json.dumps({"status": "ok"}), 'application/json')
+            elif path == '/readyz':
+                checks = {}
+                for name, check in readiness_checks.items():
+                    try:
+                        checks[name] = bool(check())
+                    except Exception:
+                        checks[name] = False
+                ready = all(checks.values())
+                self._send(200 if ready else 503, json.dumps({"ready": ready, "checks": checks}), 'application/json')
+            else:
+                self._send(404, json.dumps({"error": "not found"}), 'application/json')
+
+        def log_message(self, format, *args):
+            logger.debug("Metrics endpoint request: " + format % args)
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    logger.info(f"Metrics endpoint listening on port {port} (/metrics, /healthz, /readyz).")
+    return server
@@ -0,0 +1,202 @@
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {'COMPLETED', 'FAILED'}
+
+# --- Coalescing progress reporter ---
+# Progress for a job is kept as "latest state" and flushed at most once per
+# min_interval, except when the status changes (which is always written through).
+# A background thread sends updates held back by the interval once they are due,
+# so the last state of a job is never left behind. Every flush covers all jobs
+# that are due: it pipelines PUBLISH + XADD (capped per-job stream, for late
+# subscribers) into one Redis round-trip and batches the job status writes into
+# one bulk_write. A job's state is dropped after its final update (COMPLETED,
+# FAILED or a scheduled retry) or after idle_ttl without updates.
+# Flushes are serialized, so updates of a job reach Redis and Mongo in the order
+# they were reported. A job whose status write fails is re-queued (merged with any
+# newer update of it) and retried up to max_write_attempts times.
+
+class ProgressReporter:
+
+    def __init__(self, redis_client, jobs_collection, stream_prefix: str, min_interval: float = 0.5, stream_maxlen: int = 50, stream_ttl: int = 86400, idle_ttl: float = 3600,
+                 max_write_attempts: int = 5):
+        self.redis_client = redis_client
+        self.jobs_collection = jobs_collection
+        self.stream_prefix = stream_prefix
+        self.min_interval = min_interval
+        self.stream_maxlen = stream_maxlen
+        self.stream_ttl = stream_ttl
+        self.idle_ttl = idle_ttl
+        self.max_write_attempts = max_write_attempts
+        self._lock = threading.Lock()
+        # Held for a whole flush, from taking the pending updates until they are written
+        self._write_lock = threading.Lock()
+        self._pending: Dict[str, dict] = {}
+        self._pending_fields: Dict[str, dict] = {}
+        self._last_flush: Dict[str, float] = {}
+        self._last_status: Dict[str, str] = {}
+        self._final: Set[str] = set() # Jobs whose pending update is their last one
+        self._write_failures: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def stream_key(self, job_id: str) -> str:
+        return f'{self.stream_prefix}:{job_id}'
+
+    def report(self, job_id: str, status: str, progress: int, message: str, final_url: str = None, fields: Optional[dict] = None, final: bool = False):
+        """
+        Records the latest progress of a job. `fields` are extra job document fields
+        (e.g. errorMessage) written together with the status. `final` marks the last
+        update of this run of the job (e.g. a retry was scheduled): it is written
+        immediately and the job's state is dropped, as for COMPLETED and FAILED.
+        """
+        payload = {"jobId": job_id, "status": status, "progress": progress, "message": message}
+        if final_url:
+            payload['finalResultUrl'] = final_url
+        with self._lock:
+            self._pending[job_id] = payload
+            job_fields = self._pending_fields.setdefault(job_id, {})
+            if status != self._last_status.get(job_id):
+                job_fields['status'] = status
+            if final_url:
+                job_fields['finalResultUrl'] = final_url
+            if fields:
+                job_fields.update(fields)
+            if final or status in TERMINAL_STATUSES:
+                self._final.add(job_id)
+            due = self._due_jobs(time.monotonic())
+            if (job_fields or job_id in self._final) and job_id not in due:
+                due.append(job_id)
+            self._ensure_flusher()
+        if due:
+            self.flush(due)
+
+    def _due_jobs(self, now: float) -> List[str]:
+        # Called with the lock held
+        return [job_id for job_id in self._pending if now - self._last_flush.get(job_id, 0.0) >= self.min_interval]
+
+    def _ensure_flusher(self):
+        # Called with the lock held; started on first use so a reporter costs no thread until then
+        if self._flusher is None or not self._flusher.is_alive():
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, name='progress-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        tick = max(self.min_interval / 2, 0.05)
+        while not self._stop.wait(tick):
+            with self._lock:
+                now = time.monotonic()
+                due = self._due_jobs(now)
+                for job_id in [j for j, at in self._last_flush.items() if j not in self._pending and now - at >= self.idle_ttl]:
+                    # Abandoned job (e.g. its worker moved on); its next update is simply written through
+                    self._last_flush.pop(job_id, None)
+                    self._last_status.pop(job_id, None)
+            if due:
+                self.flush(due)
+
+    def close(self):
+        """Stops the background flusher and writes everything still pending."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+
+    def flush(self, job_ids: Optional[List[str]] = None):
+        """Writes pending updates (all jobs by default). Errors are logged; failed status writes are re-queued."""
+        with self._write_lock:
+            with self._lock:
+                job_ids = list(self._pending) if job_ids is None else [j for j in job_ids if j in self._pending]
+                batch = [(job_id, self._pending.pop(job_id), self._pending_fields.pop(job_id, {}), job_id in self._final) for job_id in job_ids]
+                now = time.monotonic()
+                for job_id, payload, _, final in batch:
+                    if final:
+                        self._final.discard(job_id)
+                        self._last_flush.pop(job_id, None)
+                        self._last_status.pop(job_id, None)
+                    else:
+                        self._last_flush[job_id] = now
+                        self._last_status[job_id] = payload['status']
+            if not batch:
+                return
+
+            failed = self._write_job_fields(batch)
+            if failed:
+                self._requeue([entry for entry in batch if entry[0] in failed])
+            self._publish([entry for entry in batch if entry[0] not in failed])
+
+    def _write_job_fields(self, batch: list) -> Set[str]:
+        """Writes the status fields of a batch; returns the jobs whose write failed."""
+        with_fields = [(job_id, job_fields) for job_id, _, job_fields, _ in batch if job_fields]
+        if not with_fields:
+            return set()
+        updates = [UpdateOne({"jobId": job_id}, {"$set": {**job_fields, "updatedAt": time.time()}}) for job_id, job_fields in with_fields]
+        try:
+            result = self.jobs_collection.bulk_write(updates, ordered=False)
+        except BulkWriteError as e:
+            failed = {with_fields[error['index']][0] for error in e.details.get('writeErrors', [])}
+            logger.error("Failed to write job status updates", extra={"job_ids": sorted(failed), "error": str(e)})
+            return failed
+        except Exception as e:
+            failed = {job_id for job_id, _ in with_fields}
+            logger.error("Failed to write job status updates", extra={"job_ids": sorted(failed), "error": str(e)})
+            return failed
+        if result.matched_count < len(updates):
+            logger.warning(f"{len(updates) - result.matched_count} job status updates matched no job document.", extra={"job_ids": [job_id for job_id, _ in with_fields]})
+        for job_id, _ in with_fields:
+            self._write_failures.pop(job_id, None)
+        return set()
+
+    def _requeue(self, entries: list):
+        """Puts failed entries back as pending, unless a job has failed max_write_attempts times."""
+        with self._lock:
+            now = time.monotonic()
+            for job_id, payload, job_fields, final in entries:
+                attempts = self._write_failures.get(job_id, 0) + 1
+                if attempts >= self.max_write_attempts:
+                    self._write_failures.pop(job_id, None)
+                    logger.error(f"Dropping progress update after {attempts} failed writes.", extra={"job_id": job_id, "status": payload['status']})
+                    continue
+                self._write_failures[job_id] = attempts
+                # A newer update reported meanwhile wins; fields it does not set are kept
+                self._pending.setdefault(job_id, payload)
+                self._pending_fields[job_id] = {**job_fields, **self._pending_fields.get(job_id, {})}
+                if final:
+                    self._final.add(job_id)
+                # Retried by the background flusher once min_interval has passed
+                self._last_flush[job_id] = now
+
+    def _publish(self, batch: list):
+        if not batch:
+            return
+        job_ids = [job_id for job_id, _, _, _ in batch]
+        if not self.redis_client:
+            logger.error("Redis client not initialized for publishing progress", extra={"job_ids": job_ids})
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for job_id, payload, _, _ in batch:
+                data = json.dumps(payload)
+                pipe.publish(f'progress:{job_id}', data)
+                pipe.xadd(self.stream_key(job_id), {"data": data}, maxlen=self.stream_maxlen, approximate=True)
+                pipe.expire(self.stream_key(job_id), self.stream_ttl)
+            pipe.execute()
+            logger.debug("Published progress updates", extra={"job_ids": job_ids})
+        except Exception as e:
+            logger.error("Failed to publish progress update", extra={"job_ids": job_ids, "error": str(e)})
+
+    def latest(self, job_id: str) -> Optional[dict]:
+        """Latest progress of a job from its capped stream, for subscribers connecting late."""
+        entries = self.redis_client.xrevrange(self.stream_key(job_id), count=1)
+        if not entries:
+            return None
+        _, fields = entries[0]
+        return json.loads(fields['data'])
@@ -0,0 +1,155 @@
+import json
+import time
+import random
+import socket
+import logging
+from typing import List, Optional, Tuple
+
+from minio.error import S3Error
+from pymongo.errors import AutoReconnect, ConnectionFailure, NetworkTimeout, ExecutionTimeout, WriteConcernError
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError, BusyLoadingError
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+
+logger = logging.getLogger(__name__)
+
+# --- Error classification ---
+# Transient: the same message is likely to succeed later (network, timeouts,
+# throttling, a dependency restarting). Everything else is permanent and goes
+# straight to the dead-letter stream.
+
+TRANSIENT_ERRORS = (
+    AutoReconnect, ConnectionFailure, NetworkTimeout, ExecutionTimeout, WriteConcernError,
+    RedisConnectionError, RedisTimeoutError, BusyLoadingError,
+    Urllib3HTTPError,
+    ConnectionError, TimeoutError, socket.timeout,
+)
+TRANSIENT_S3_CODES = {'SlowDown', 'InternalError', 'ServiceUnavailable', 'RequestTimeout', 'RequestTimeTooSkewed', 'XMinioServerNotInitialized'}
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, S3Error):
+        return error.code in TRANSIENT_S3_CODES
+    return isinstance(error, TRANSIENT_ERRORS)
+
+# --- Delayed re-enqueue and dead letters ---
+# Retries wait in a sorted set scored by due time and are moved back into the job
+# stream by a Lua script, so the XADD and ZREM of a message happen together and
+# concurrent workers cannot lose or duplicate it. Messages carry their attempt
+# number and error history with them.
+
+# KEYS: delayed set, job stream. ARGV: now, limit. XADD runs before ZREM, so a
+# failing XADD aborts the script with the message still in the delayed set.
+PROMOTE_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, payload in ipairs(due) do
+    local fields = {}
+    for key, value in pairs(cjson.decode(payload)) do
+        fields[#fields + 1] = key
+        fields[#fields + 1] = value
+    end
+    redis.call('XADD', KEYS[2], '*', unpack(fields))
+    redis.call('ZREM', KEYS[1], payload)
+end
+return #due
+"""
+
+class RetryPolicy:
+
+    def __init__(self, redis_client, stream: str, max_attempts: int = 5, backoff_base: float = 2.0, backoff_max: float = 300.0,
+                 delayed_key: Optional[str] = None, dead_letter_stream: Optional[str] = None, dead_letter_maxlen: int = 10000):
+        self.redis_client = redis_client
+        self.stream = stream
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.delayed_key = delayed_key or f'{stream}:delayed'
+        self.dead_letter_stream = dead_letter_stream or f'{stream}:dead'
+        self.dead_letter_maxlen = dead_letter_maxlen
+        self._promote_script = None
+
+    @staticmethod
+    def attempt(message_data: dict) -> int:
+        try:
+            return max(1, int(message_data.get('attempt', 1)))
+        except (TypeError, ValueError):
+            return 1
+
+    @staticmethod
+    def error_history(message_data: dict) -> List[dict]:
+        try:
+            history = json.loads(message_data.get('errorHistory') or '[]')
+            return history if isinstance(history, list) else []
+        except ValueError:
+            return []
+
+    def backoff(self, attempt: int) -> float:
+        # Exponential with full jitter, so retries of a shared outage spread out
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    def handle_failure(self, message_data: dict, error: BaseException) -> Tuple[str, float]:
+        """
+        Schedules a retry or dead-letters the message. Returns ('retry', delay) or
+        ('dead', 0). The caller acknowledges the original message afterwards.
+        """
+        attempt = self.attempt(message_data)
+        transient = is_transient(error)
+        history = self.error_history(message_data) + [{
+            "attempt": attempt,
+            "type": type(error).__name__,
+            "error": str(error),
+            "transient": transient,
+            "at": time.time(),
+        }]
+        fields = {k: v for k, v in message_data.items() if k not in ('attempt', 'errorHistory')}
+
+        if transient and attempt < self.max_attempts:
+            delay = self.backoff(attempt)
+            payload = json.dumps({**fields, "attempt": str(attempt + 1), "errorHistory": json.dumps(history)}, sort_keys=True)
+            self.redis_client.zadd(self.delayed_key, {payload: time.time() + delay})
+            return 'retry', delay
+
+        self.redis_client.xadd(
+            self.dead_letter_stream,
+            {**fields, "attempt": str(attempt), "errorHistory": json.dumps(history), "deadLetteredAt": str(time.time())},
+            maxlen=self.dead_letter_maxlen,
+            approximate=True,
+        )
+        return 'dead', 0.0
+
+    def promote_due(self, limit: int = 100) -> int:
+        """Moves retries whose delay has passed back into the job stream."""
+        if self._promote_script is None:
+            self._promote_script = self.redis_client.register_script(PROMOTE_DUE_SCRIPT)
+        promoted = self._promote_script(keys=[self.delayed_key, self.stream], args=[time.time(), limit])
+        if promoted:
+            logger.info(f"Re-enqueued {promoted} delayed retries into {self.stream}.")
+        return promoted
+
+    def replay_dead_letters(self, job_id: Optional[str] = None, limit: Optional[int] = None, delete: bool = True, dry_run: bool = False) -> int:
+        """
+        Re-enqueues dead-lettered messages with a fresh attempt counter. The error
+        history is kept, so repeated failures stay visible.
+        """
+        replayed = 0
+        last_id = '-'
+        while limit is None or replayed < limit:
+            batch = self.redis_client.xrange(self.dead_letter_stream, min=last_id, max='+', count=100)
+            if last_id != '-':
+                batch = [entry for entry in batch if entry[0] != last_id]
+            if not batch:
+                break
+            for entry_id, fields in batch:
+                last_id = entry_id
+                if job_id and fields.get('jobId') != job_id:
+                    continue
+                if limit is not None and replayed >= limit:
+                    break
+                replayed += 1
+                if dry_run:
+                    continue
+                message = {k: v for k, v in fields.items() if k not in ('attempt', 'deadLetteredAt')}
+                pipe = self.redis_client.pipeline()
+                pipe.xadd(self.stream, message)
+                if delete:
+                    pipe.xdel(self.dead_letter_stream, entry_id)
+                pipe.execute()
+        return replayed
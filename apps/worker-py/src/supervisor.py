@@ -0,0 +1,157 @@
+import os
+import time
+import signal
+import logging
+import urllib.request
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Prefork supervisor ---
+# Forks `count` consumer processes, each running target(slot). Slots are stable,
+# so a restarted child reuses its consumer name and can pick up the messages its
+# predecessor left pending. Crashed children are restarted with exponential
+# backoff; SIGTERM/SIGINT are passed through to every child, which finishes its
+# in-flight job before exiting. Children still running at the drain deadline are killed
+# (their unacknowledged messages stay pending for the next start of that slot).
+# Threads of the supervisor (e.g. its metrics endpoint) are started by after_start,
+# once the first children are forked, so the initial fork copies no other thread.
+# Children restarted later close the inherited listening socket of that endpoint.
+
+class Supervisor:
+
+    def __init__(self, target: Callable[[int], int], count: int, drain_timeout: float = 60.0,
+                 backoff_initial: float = 1.0, backoff_max: float = 60.0, stable_after: float = 60.0):
+        self.target = target
+        self.count = count
+        self.drain_timeout = drain_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self._ctx = mp.get_context('fork')
+        self.children: Dict[int, mp.Process] = {}
+        self._started_at: Dict[int, float] = {}
+        self._backoff: Dict[int, float] = {}
+        self._restart_at: Dict[int, float] = {}
+        self.restarts = metrics.Counter('worker_py_supervisor_restarts_total', 'Consumer processes restarted after exiting.', ('slot',))
+        self.shutting_down = False
+        self._http_server = None
+
+    def _spawn(self, slot: int):
+        process = self._ctx.Process(target=self._run_child, args=(slot,), name=f'worker-py-consumer-{slot}')
+        process.start()
+        self.children[slot] = process
+        self._started_at[slot] = time.monotonic()
+        self._restart_at.pop(slot, None)
+        logger.info(f"Started consumer process slot={slot} pid={process.pid}.")
+
+    def _run_child(self, slot: int):
+        # Default handlers until the child installs its own graceful ones
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        if self._http_server is not None:
+            self._http_server.socket.close()
+        os._exit(self.target(slot) or 0)
+
+    def _handle_signal(self, signum, frame):
+        if not self.shutting_down:
+            logger.info(f"Supervisor received signal {signum}. Draining consumer processes...")
+            self.shutting_down = True
+
+    def _reap(self, slot: int):
+        process = self.children.pop(slot)
+        process.join()
+        uptime = time.monotonic() - self._started_at.pop(slot)
+        if self.shutting_down:
+            return
+        # A child that ran long enough counts as healthy: its next crash starts the backoff over
+        delay = self.backoff_initial if uptime >= self.stable_after else min(self._backoff.get(slot, self.backoff_initial / 2) * 2, self.backoff_max)
+        self._backoff[slot] = delay
+        self._restart_at[slot] = time.monotonic() + delay
+        self.restarts.inc(str(slot))
+        logger.warning(f"Consumer process slot={slot} pid={process.pid} exited with code {process.exitcode} after {uptime:.1f}s; restarting in {delay:.1f}s.")
+
+    def run(self, after_start: Optional[Callable[[], object]] = None) -> int:
+        """
+        Supervises the children until SIGTERM/SIGINT, then drains them. `after_start`
+        is called once the first children are running; if it returns a server (e.g.
+        the metrics endpoint), restarted children close its listening socket.
+        """
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        for slot in range(self.count):
+            self._spawn(slot)
+        if after_start is not None:
+            self._http_server = after_start()
+
+        while not self.shutting_down:
+            sentinels = {process.sentinel: slot for slot, process in self.children.items()}
+            timeout = 1.0
+            if self._restart_at:
+                timeout = max(0.0, min(min(self._restart_at.values()) - time.monotonic(), timeout))
+            if sentinels:
+                ready = wait(list(sentinels), timeout=timeout)
+            else:
+                time.sleep(timeout)
+                ready = []
+            for sentinel in ready:
+                self._reap(sentinels[sentinel])
+            now = time.monotonic()
+            for slot, restart_at in list(self._restart_at.items()):
+                if now >= restart_at and not self.shutting_down:
+                    self._spawn(slot)
+
+        return self._drain()
+
+    def _drain(self) -> int:
+        for process in self.children.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.drain_timeout
+        for slot, process in list(self.children.items()):
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error(f"Consumer process slot={slot} pid={process.pid} did not drain within {self.drain_timeout}s; killing it. Its pending messages will be reclaimed on the next start.")
+                process.kill()
+                process.join()
+        logger.info("All consumer processes stopped.")
+        return 0
+
+    def alive(self) -> List[int]:
+        return [slot for slot, process in self.children.items() if process.is_alive()]
+
+# --- Aggregated metrics ---
+
+def _add_label(line: str, label: str) -> str:
+    name_end = line.find(' ')
+    brace = line.find('{', 0, name_end)
+    if brace == -1:
+        return f'{line[:name_end]}{{{label}}}{line[name_end:]}'
+    return f'{line[:brace + 1]}{label},{line[brace + 1:]}'
+
+def aggregate_child_metrics(ports: Dict[int, int], timeout: float = 2.0) -> List[str]:
+    """Merges the children's /metrics into one exposition, labelling every sample with its slot."""
+    families: Dict[str, list] = {}  # metric name -> [HELP/TYPE lines, samples]
+    for slot, port in sorted(ports.items()):
+        try:
+            body = urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=timeout).read().decode('utf-8')
+        except Exception as e:
+            logger.warning(f"Failed to scrape consumer slot={slot} on port {port}: {str(e)}")
+            continue
+        family = None
+        for line in body.splitlines():
+            if line.startswith('# HELP ') or line.startswith('# TYPE '):
+                family = families.setdefault(line.split(' ', 3)[2], [[], []])
+                if line not in family[0]:
+                    family[0].append(line)
+            elif line and family is not None:
+                family[1].append(_add_label(line, f'slot="{slot}"'))
+    lines = []
+    for meta, samples in families.values():
+        lines.extend(meta)
+        lines.extend(samples)
+    return lines
@@ -0,0 +1,256 @@
+import os
+import time
+import uuid
+import atexit
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+from dotenv import load_dotenv
+
+# --- Shared Weaviate client factory ---
+# One client per process and connection name, created on first use. Readiness is
+# cached for WEAVIATE_READY_TTL seconds, failed connects are retried with
+# exponential backoff, and a client inherited through fork() is replaced rather
+# than shared with the parent. WEAVIATE_MODE=memory swaps in an in-memory
+# stand-in for tests and benchmarks.
+# It lives in apps/worker-py because the worker-py image only contains this
+# directory; weaviate_client.py at the repository root re-exports it.
+
+load_dotenv()
+
+WEAVIATE_MODE = os.getenv("WEAVIATE_MODE", "auto").lower()  # auto | cloud | custom | memory
+WEAVIATE_READY_TTL = float(os.getenv("WEAVIATE_READY_TTL", "10"))  # Seconds
+WEAVIATE_RECONNECT_BACKOFF_MAX = float(os.getenv("WEAVIATE_RECONNECT_BACKOFF_MAX", "30"))  # Seconds
+
+class WeaviateUnavailable(ConnectionError):
+    """Raised while Weaviate cannot be reached (including during reconnect backoff)."""
+
+def connect_from_env():
+    """
+    Connects according to the environment: Weaviate Cloud when an API key is set
+    (or WEAVIATE_MODE=cloud), otherwise a self-hosted instance at WEAVIATE_URL.
+    """
+    if WEAVIATE_MODE == "memory":
+        return shared_memory_store()
+
+    import weaviate
+    from weaviate.classes.init import Auth
+
+    weaviate_url = os.getenv("WEAVIATE_URL")
+    weaviate_api_key = os.getenv("WEAVIATE_API_KEY")
+    if not weaviate_url:
+        raise ValueError("Missing required environment variable: WEAVIATE_URL")
+    auth = Auth.api_key(weaviate_api_key) if weaviate_api_key else None
+
+    if WEAVIATE_MODE == "cloud" or (WEAVIATE_MODE == "auto" and weaviate_api_key):
+        return weaviate.connect_to_weaviate_cloud(cluster_url=weaviate_url, auth_credentials=auth)
+
+    parsed = urlparse(weaviate_url if "://" in weaviate_url else f"http://{weaviate_url}")
+    secure = parsed.scheme == "https"
+    return weaviate.connect_to_custom(
+        http_host=parsed.hostname,
+        http_port=parsed.port or (443 if secure else 80),
+        http_secure=secure,
+        grpc_host=os.getenv("WEAVIATE_GRPC_HOST", parsed.hostname),
+        grpc_port=int(os.getenv("WEAVIATE_GRPC_PORT", "50051")),
+        grpc_secure=secure,
+        auth_credentials=auth,
+    )
+
+class WeaviateClientFactory:
+
+    def __init__(self, connect: Callable[[], Any] = connect_from_env, ready_ttl: float = WEAVIATE_READY_TTL,
+                 backoff_initial: float = 0.5, backoff_max: float = WEAVIATE_RECONNECT_BACKOFF_MAX):
+        self.connect = connect
+        self.ready_ttl = ready_ttl
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self._client = None
+        self._pid = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._last_error: Optional[Exception] = None
+        self._ready: Optional[bool] = None
+        self._ready_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The shared client, connecting on first use. Raises WeaviateUnavailable while backing off."""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                return self._client
+            # Inherited from the parent process: its sockets are not ours to use or close
+            self._client = None
+            now = time.monotonic()
+            if now < self._retry_at:
+                raise WeaviateUnavailable(f"Weaviate unavailable, next connection attempt in {self._retry_at - now:.1f}s: {self._last_error}")
+            try:
+                client = self.connect()
+            except Exception as e:
+                self._failures += 1
+                self._retry_at = now + min(self.backoff_max, self.backoff_initial * (2 ** (self._failures - 1)))
+                self._last_error = e
+                raise WeaviateUnavailable(f"Failed to connect to Weaviate: {str(e)}") from e
+            self._client, self._pid = client, os.getpid()
+            self._failures, self._retry_at, self._last_error = 0, 0.0, None
+            return client
+
+    def is_ready(self) -> bool:
+        """Readiness of Weaviate, re-checked at most once per ready_ttl."""
+        now = time.monotonic()
+        if self._ready is not None and now - self._ready_checked_at < self.ready_ttl:
+            return self._ready
+        try:
+            ready = bool(self.get().is_ready())
+        except WeaviateUnavailable:
+            ready = False
+        except Exception:
+            # The connection itself failed; reconnect on next use
+            self.reset()
+            ready = False
+        self._ready, self._ready_checked_at = ready, now
+        return ready
+
+    def reset(self):
+        """Closes the client; the next get() reconnects."""
+        with self._lock:
+            client, self._client = self._client, None
+            self._ready = None
+        if client is not None and self._pid == os.getpid():
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    close = reset
+
+_factories: Dict[str, WeaviateClientFactory] = {}
+_factories_lock = threading.Lock()
+
+def get_client_factory(name: str = "default", connect: Callable[[], Any] = None, **options) -> WeaviateClientFactory:
+    """Process-wide factory for a named connection; `connect`/options apply when it is first created."""
+    with _factories_lock:
+        if name not in _factories:
+            _factories[name] = WeaviateClientFactory(connect or connect_from_env, **options)
+        return _factories[name]
+
+def get_weaviate_client(name: str = "default"):
+    return get_client_factory(name).get()
+
+@atexit.register
+def close_all_clients():
+    for factory in list(_factories.values()):
+        factory.close()
+
+def initialize_weaviate_client():
+    """
+    Initialize connection to Weaviate.
+    Returns the shared Weaviate client instance if it is ready.
+    """
+    factory = get_client_factory()
+    if not factory.is_ready():
+        raise ConnectionError("Failed to establish connection with Weaviate")
+    print("Successfully connected to Weaviate!")
+    return factory.get()
+
+# --- In-memory stand-in ---
+# Covers the subset of the v4 client API used in this repository: collections.get()
+# with data.insert, query.near_vector / fetch_objects, aggregate.over_all and iterator.
+
+class _MemoryData:
+    def __init__(self, collection: "_MemoryCollection"):
+        self._collection = collection
+
+    def insert(self, properties: dict, vector: Optional[List[float]] = None, uuid: Any = None):
+        object_id = uuid or _new_uuid()
+        self._collection.objects[object_id] = (dict(properties), None if vector is None else np.asarray(vector, dtype=np.float32))
+        return object_id
+
+class _MemoryQuery:
+    def __init__(self, collection: "_MemoryCollection"):
+        self._collection = collection
+
+    def near_vector(self, near_vector, limit: int = 10, return_properties: List[str] = None, **kwargs):
+        query = np.asarray(near_vector, dtype=np.float32)
+        scored = []
+        for object_id, (properties, vector) in self._collection.objects.items():
+            if vector is None:
+                continue
+            denominator = float(np.linalg.norm(query) * np.linalg.norm(vector)) or 1.0
+            scored.append((1.0 - float(query @ vector) / denominator, object_id))
+        scored.sort(key=lambda item: item[0])
+        return SimpleNamespace(objects=[self._collection.result(object_id, return_properties, distance) for distance, object_id in scored[:limit]])
+
+    def fetch_objects(self, limit: int = None, after: Any = None, return_properties: List[str] = None, **kwargs):
+        ids = list(self._collection.objects)
+        if after is not None:
+            ids = ids[ids.index(after) + 1:]
+        return SimpleNamespace(objects=[self._collection.result(object_id, return_properties) for object_id in ids[:limit]])
+
+class _MemoryAggregate:
+    def __init__(self, collection: "_MemoryCollection"):
+        self._collection = collection
+
+    def over_all(self, total_count: bool = False, **kwargs):
+        return SimpleNamespace(total_count=len(self._collection.objects), properties={})
+
+class _MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.objects: Dict[Any, tuple] = {}
+        self.data = _MemoryData(self)
+        self.query = _MemoryQuery(self)
+        self.aggregate = _MemoryAggregate(self)
+
+    def result(self, object_id, return_properties: List[str] = None, distance: float = None):
+        properties, vector = self.objects[object_id]
+        if return_properties is not None:
+            properties = {key: properties.get(key) for key in return_properties}
+        return SimpleNamespace(uuid=object_id, properties=dict(properties), vector=vector,
+                               metadata=SimpleNamespace(distance=distance), references=None, collection=self.name)
+
+    def iterator(self, return_properties: List[str] = None, **kwargs) -> Iterator[Any]:
+        for object_id in list(self.objects):
+            yield self.result(object_id, return_properties)
+
+class _MemoryCollections:
+    def __init__(self):
+        self._collections: Dict[str, _MemoryCollection] = {}
+
+    def get(self, name: str) -> _MemoryCollection:
+        return self._collections.setdefault(name, _MemoryCollection(name))
+
+    def exists(self, name: str) -> bool:
+        return name in self._collections
+
+class InMemoryWeaviate:
+    """In-process stand-in for a Weaviate v4 client, for tests and benchmarks."""
+
+    def __init__(self):
+        self.collections = _MemoryCollections()
+        self.closed = False
+
+    def is_ready(self) -> bool:
+        return not self.closed
+
+    def is_connected(self) -> bool:
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+_memory_store: Optional[InMemoryWeaviate] = None
+
+def shared_memory_store() -> InMemoryWeaviate:
+    """The process-wide stand-in, so its data survives reconnects like a real server's would."""
+    global _memory_store
+    if _memory_store is None:
+        _memory_store = InMemoryWeaviate()
+    _memory_store.closed = False
+    return _memory_store
+
+def _new_uuid():
+    return uuid.uuid4()
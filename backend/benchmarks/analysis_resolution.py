@@ -0,0 +1,140 @@
+"""
+Benchmark rozdzielczości analizy (ProcessingConfig.analysis_max_side).
+
+Dla kolejnych wartości analysis_max_side mierzy czas analyze_frame_pixels na
+klatce oraz dokładność względem wzorca: wykrycie (recall), precyzję
+i średnie IoU ramek obiektów (IoU >= 0.5), zgodność nastroju i błąd jasności
+względem pełnej rozdzielczości. Wzorcem ramek dla klatek syntetycznych są
+narysowane prostokąty, a dla własnych obrazów (--images) wyniki w pełnej
+rozdzielczości. Nastrój jest liczony z próbki pikseli źródła (source_mood),
+więc jego zgodność mierzy błąd próbkowania, a nie uśredniania przy zmniejszaniu.
+
+Uruchomienie (z katalogu backend):
+    python benchmarks/analysis_resolution.py --width 3840 --height 2160
+    python benchmarks/analysis_resolution.py --images /sciezka/do/kadrow/*.jpg --sides 0 1920 960
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from media_processor import ProcessingConfig, analyze_frame_pixels
+
+def synthetic_frame(width: int, height: int, objects: int, rng: np.random.Generator):
+    """Klatka z gradientem, szumem i nienachodzącymi prostokątami; zwraca (klatka, ramki)."""
+    gradient = np.linspace(40, 120, width, dtype=np.float32)[None, :, None]
+    frame = np.broadcast_to(gradient, (height, width, 3)).copy()
+    frame += rng.normal(0, 6, size=frame.shape).astype(np.float32)
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+
+    # Siatka komórek gwarantuje, że prostokąty się nie stykają
+    columns = int(np.ceil(np.sqrt(objects * width / height)))
+    rows = int(np.ceil(objects / columns))
+    cell_w, cell_h = width // columns, height // rows
+    boxes = []
+    for cell in rng.choice(columns * rows, size=objects, replace=False):
+        w = int(rng.integers(cell_w // 4, cell_w * 3 // 4))
+        h = int(rng.integers(cell_h // 4, cell_h * 3 // 4))
+        x = (cell % columns) * cell_w + int(rng.integers(4, cell_w - w - 4))
+        y = (cell // columns) * cell_h + int(rng.integers(4, cell_h - h - 4))
+        color = tuple(int(c) for c in rng.integers(150, 255, size=3))
+        cv2.rectangle(frame, (x, y), (x + w - 1, y + h - 1), color, -1)
+        boxes.append((x, y, w, h))
+    return frame, boxes
+
+def iou(a, b) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    union = aw * ah + bw * bh - w * h
+    return w * h / union if union else 0.0
+
+def match_boxes(reference, detected, threshold: float = 0.5):
+    """Zachłanne dopasowanie ramek; zwraca (liczba dopasowań, suma IoU)."""
+    pairs = sorted(((iou(r, d), i, j) for i, r in enumerate(reference) for j, d in enumerate(detected)), reverse=True)
+    used_reference, used_detected, matched, total_iou = set(), set(), 0, 0.0
+    for score, i, j in pairs:
+        if score < threshold:
+            break
+        if i in used_reference or j in used_detected:
+            continue
+        used_reference.add(i)
+        used_detected.add(j)
+        matched += 1
+        total_iou += score
+    return matched, total_iou
+
+def boxes_of(result) -> list:
+    return [(o['position']['x'], o['position']['y'], o['position']['width'], o['position']['height']) for o in result['objects']]
+
+def measure(frames, references, max_side: int, full_results, repeat: int) -> dict:
+    config = ProcessingConfig(use_gpu=False, analysis_max_side=max_side, log_level='WARNING')
+    timings, results = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [analyze_frame_pixels(frame, config) for frame in frames]
+        timings.append((time.perf_counter() - started) / len(frames))
+
+    reference_count = detected_count = matched = 0
+    total_iou = 0.0
+    for reference, result in zip(references, results):
+        detected = boxes_of(result)
+        count, iou_sum = match_boxes(reference, detected)
+        reference_count += len(reference)
+        detected_count += len(detected)
+        matched += count
+        total_iou += iou_sum
+    full_results = full_results or results
+    return {
+        'max_side': max_side,
+        'ms_per_frame': min(timings) * 1000,
+        'recall': matched / reference_count if reference_count else 1.0,
+        'precision': matched / detected_count if detected_count else 1.0,
+        'mean_iou': total_iou / matched if matched else 0.0,
+        'mood_agreement': float(np.mean([r['mood']['mood'] == f['mood']['mood'] for r, f in zip(results, full_results)])),
+        'brightness_error': float(np.mean([abs(r['analysis']['brightness'] - f['analysis']['brightness']) for r, f in zip(results, full_results)])),
+        'results': results,
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', nargs='+', help='Własne obrazy zamiast klatek syntetycznych')
+    parser.add_argument('--width', type=int, default=3840)
+    parser.add_argument('--height', type=int, default=2160)
+    parser.add_argument('--frames', type=int, default=4)
+    parser.add_argument('--objects', type=int, default=12)
+    parser.add_argument('--sides', type=int, nargs='+', default=[0, 1920, 1280, 960, 640, 480],
+                        help='Wartości analysis_max_side (0 = pełna rozdzielczość, wzorzec)')
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    if args.images:
+        frames = [cv2.imread(path) for path in args.images]
+        references = None
+    else:
+        rng = np.random.default_rng(42)
+        frames, references = zip(*(synthetic_frame(args.width, args.height, args.objects, rng) for _ in range(args.frames)))
+
+    if references is None:
+        config = ProcessingConfig(use_gpu=False, log_level='WARNING')
+        references = [boxes_of(analyze_frame_pixels(frame, config)) for frame in frames]
+
+    rows = []
+    for side in [0] + [side for side in args.sides if side != 0]:
+        rows.append(measure(frames, references, side, rows[0]['results'] if rows else None, args.repeat))
+    full = rows[0]
+
+    print(f"{'max_side':>9}{'ms/klatkę':>11}{'przysp.':>9}{'recall':>8}{'precyzja':>10}{'IoU':>7}{'nastrój':>9}{'Δjasność':>10}")
+    for row in rows:
+        print(f"{row['max_side'] or 'pełna':>9}{row['ms_per_frame']:>11.1f}{full['ms_per_frame'] / row['ms_per_frame']:>8.1f}x"
+              f"{row['recall']:>8.2f}{row['precision']:>10.2f}{row['mean_iou']:>7.2f}"
+              f"{row['mood_agreement']:>9.2f}{row['brightness_error']:>10.2f}")
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,115 @@
+"""
+Benchmark analizy klatek wideo w MediaProcessor.
+
+Porównuje dawny przebieg (zapis próbkowanych klatek do JPEG przez
+extract_frames, potem trzy osobne przebiegi analyze_frame / detect_objects /
+analyze_scene_mood, z których każdy ponownie czyta i dekoduje pliki) z potokiem
+jednokrotnego dekodowania w pamięci (wątki oraz procesy z pierścieniem w
+pamięci współdzielonej). Raportuje czas oraz bajty odczytane i zapisane przez
+proces (rchar/wchar, więc także trafienia w page cache) w przeliczeniu na
+minutę materiału.
+
+Uruchomienie (z katalogu backend):
+    python benchmarks/frame_pipeline.py --seconds 60 --width 1920 --height 1080
+    python benchmarks/frame_pipeline.py --video /sciezka/do/pliku.mp4 --interval 0.5
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import psutil
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from media_processor import MediaProcessor, ProcessingConfig
+
+def synthetic_video(path: str, seconds: float, fps: float, width: int, height: int, seed: int = 42, fourcc: str = 'mp4v') -> str:
+    """Wideo z ujęciami co 4 s, ruchomymi prostokątami i szumem (żeby kontury i kodek miały co robić)."""
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    background = None
+    for i in range(int(seconds * fps)):
+        if i % int(4 * fps) == 0:
+            background = rng.integers(0, 255, size=(height // 8, width // 8, 3), dtype=np.uint8)
+            background = cv2.resize(background, (width, height), interpolation=cv2.INTER_LINEAR)
+        frame = background.copy()
+        for k in range(5):
+            x = int((i * (3 + k) + k * width // 5) % width)
+            cv2.rectangle(frame, (x, height // 4), (x + width // 10, height // 4 + height // 3), (40 * k, 255 - 40 * k, 128), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+def legacy_pipeline(processor: MediaProcessor, video_path: str) -> int:
+    frames = processor.extract_frames(video_path)
+    with ThreadPoolExecutor(max_workers=processor.config.max_workers) as executor:
+        list(executor.map(processor.analyze_frame, frames))
+        list(executor.map(processor.detect_objects, frames))
+        list(executor.map(processor.analyze_scene_mood, frames))
+    processor._cleanup_temp_files()
+    return len(frames)
+
+def fused_pipeline(processor: MediaProcessor, video_path: str) -> int:
+    return sum(1 for _ in processor.iter_video_results(video_path))
+
+def measure(name: str, run, processor: MediaProcessor, video_path: str, minutes: float, repeat: int) -> dict:
+    process = psutil.Process()
+    timings, io = [], None
+    for _ in range(repeat):
+        before = process.io_counters()
+        started = time.perf_counter()
+        frames = run(processor, video_path)
+        timings.append(time.perf_counter() - started)
+        after = process.io_counters()
+        io = (after.read_chars - before.read_chars, after.write_chars - before.write_chars)
+    best = min(timings)
+    return {
+        'name': name,
+        'frames': frames,
+        'best_s': best,
+        's_per_video_min': best / minutes,
+        'read_mb_per_video_min': io[0] / 1024 / 1024 / minutes,
+        'written_mb_per_video_min': io[1] / 1024 / 1024 / minutes,
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', help='Istniejący plik wideo zamiast syntetycznego')
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--fps', type=float, default=25.0)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--interval', type=float, default=1.0, help='ProcessingConfig.frame_interval w sekundach')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='frame-pipeline-')
+    try:
+        video_path = args.video or synthetic_video(os.path.join(work_dir, 'synthetic.mp4'), args.seconds, args.fps, args.width, args.height)
+        results = []
+        for name, run, shared in (('jpeg + 3 przebiegi', legacy_pipeline, False),
+                                  ('w pamięci, wątki', fused_pipeline, False),
+                                  ('w pamięci, procesy + shm', fused_pipeline, True)):
+            config = ProcessingConfig(use_gpu=False, frame_interval=args.interval, max_workers=args.workers,
+                                      shared_memory_frames=shared, cache_dir=os.path.join(work_dir, 'cache'),
+                                      log_level='WARNING')
+            with MediaProcessor(output_dir=os.path.join(work_dir, 'out'), config=config) as processor:
+                minutes = processor.extract_video_metadata(video_path)['duration'] / 60 or 1.0
+                results.append(measure(name, run, processor, video_path, minutes, args.repeat))
+
+        print(f"{'wariant':<28}{'klatki':>8}{'s/min':>10}{'odczyt MB/min':>16}{'zapis MB/min':>15}")
+        for result in results:
+            print(f"{result['name']:<28}{result['frames']:>8}{result['s_per_video_min']:>10.2f}"
+                  f"{result['read_mb_per_video_min']:>16.1f}{result['written_mb_per_video_min']:>15.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,86 @@
+"""
+Benchmark strategii próbkowania klatek (MediaProcessor.iter_sampled_frames).
+
+Dla każdego pliku i odstępu próbkowania mierzy przepustowość strategii read
+(dekodowanie i konwersja każdej klatki, dawny tryb), grab, seek, ffmpeg (jeśli
+dostępny jest plik binarny) oraz tę wybraną przez auto. Raportuje próbki na
+sekundę i krotność czasu rzeczywistego (sekundy materiału na sekundę pracy).
+
+Domyślnie używa dwóch syntetycznych plików: MPEG-4 (krótki GOP) i MJPEG
+(wyłącznie klatki kluczowe), co odpowiada materiałom z montażu i z kamer.
+
+Uruchomienie (z katalogu backend):
+    python benchmarks/frame_sampling.py --seconds 60 --intervals 0.2 1 5
+    python benchmarks/frame_sampling.py --video /sciezka/do/dailies.mov --ffmpeg-binary /usr/bin/ffmpeg
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from frame_pipeline import synthetic_video
+from media_processor import MediaProcessor, ProcessingConfig
+
+STRATEGIES = ('read', 'grab', 'seek', 'ffmpeg', 'auto')
+
+def measure(video_path: str, interval: float, strategy: str, ffmpeg_binary: str, repeat: int) -> dict:
+    config = ProcessingConfig(use_gpu=False, frame_interval=interval, sampling_strategy=strategy,
+                              ffmpeg_binary=ffmpeg_binary, log_level='WARNING')
+    processor = MediaProcessor(output_dir=tempfile.gettempdir(), config=config)
+    duration = processor.extract_video_metadata(video_path)['duration']
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        # Plan (z badaniem GOP) jest częścią kosztu strategii auto
+        plan = processor.plan_sampling(video_path)
+        samples = sum(1 for _ in processor.iter_sampled_frames(video_path, plan))
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    return {
+        'strategy': strategy,
+        'chosen': plan['strategy'],
+        'samples': samples,
+        'samples_per_s': samples / best,
+        'realtime': duration / best,
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video', action='append', help='Plik wideo (można podać wiele razy) zamiast syntetycznych')
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--fps', type=float, default=25.0)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--intervals', type=float, nargs='+', default=[0.2, 1.0, 5.0], help='Odstępy próbkowania w sekundach')
+    parser.add_argument('--ffmpeg-binary', default=shutil.which('ffmpeg'))
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='frame-sampling-')
+    try:
+        videos = args.video or [
+            synthetic_video(os.path.join(work_dir, 'mpeg4.mp4'), args.seconds, args.fps, args.width, args.height),
+            synthetic_video(os.path.join(work_dir, 'mjpeg.avi'), args.seconds, args.fps, args.width, args.height, fourcc='MJPG'),
+        ]
+        strategies = [s for s in STRATEGIES if s != 'ffmpeg' or args.ffmpeg_binary]
+        if not args.ffmpeg_binary:
+            print("Brak pliku binarnego ffmpeg, strategia ffmpeg pominięta (--ffmpeg-binary)")
+
+        print(f"{'plik':<16}{'odstęp':>8}  {'strategia':<14}{'próbki':>8}{'próbki/s':>11}{'x czas rz.':>12}")
+        for video_path in videos:
+            for interval in args.intervals:
+                for strategy in strategies:
+                    result = measure(video_path, interval, strategy, args.ffmpeg_binary or 'ffmpeg', args.repeat)
+                    label = strategy if strategy != 'auto' else f"auto→{result['chosen']}"
+                    print(f"{os.path.basename(video_path)[:15]:<16}{interval:>8.1f}  {label:<14}{result['samples']:>8}"
+                          f"{result['samples_per_s']:>11.1f}{result['realtime']:>12.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main_cli()
@@ -14,9 +14,8 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Security
 from datetime import datetime, timedelta
 import openai
+import sys
 from dotenv import load_dotenv
-import weaviate
-from weaviate.classes.init import Auth
 
 # Konfiguracja loggera
 logger = setup_logging()
@@ -43,14 +42,13 @@ security = HTTPBearer()
 # Load env for OpenAI and Weaviate
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-WEAVIATE_URL = os.getenv("WEAVIATE_URL")
-WEAVIATE_API_KEY = os.getenv("WEAVIATE_API_KEY")
 
-# Initialize Weaviate client
-weaviate_client = weaviate.connect_to_weaviate_cloud(
-    cluster_url=WEAVIATE_URL,
-    auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
-)
+# Współdzielony klient Weaviate (moduł w katalogu głównym repozytorium); łączy się
+# dopiero przy pierwszym użyciu, a nie przy imporcie aplikacji
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from weaviate_client import get_client_factory
+
+weaviate_factory = get_client_factory()
 
 @contextmanager
 def get_db():
@@ -217,14 +215,15 @@ async def upload_script(file: UploadFile = File(...), user_id: int = Depends(get
             script_id = c.lastrowid
             conn.commit()
         # Save to Weaviate
-        weaviate_client.batch.add_data_object({
-            "user_id": user_id,
-            "script_id": script_id,
-            "title": file.filename,
-            "text": text,
-            "embedding": embedding
-        }, "Script")
-        weaviate_client.batch.flush()
+        weaviate_factory.get().collections.get("Script").data.insert(
+            properties={
+                "user_id": user_id,
+                "script_id": script_id,
+                "title": file.filename,
+                "text": text,
+            },
+            vector=embedding,
+        )
         logger.info(f"Scenariusz {file.filename} przesłany pomyślnie (ID: {script_id})")
         return {
             "id": script_id,
@@ -13,14 +13,21 @@ import pytesseract
 from skimage import measure
 import json
 import logging
-from typing import List, Dict, Any, Optional, Tuple, Set, Generator
+from typing import List, Dict, Any, Optional, Tuple, Set, Generator, Callable, Iterable, Deque, Union
 from dataclasses import dataclass, field
 from contextlib import contextmanager
 from datetime import datetime
 import multiprocessing as mp
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
 import hashlib
 import pickle
+import numbers
+import threading
+import queue
+import time
+import weakref
+from collections import OrderedDict, deque
 from pathlib import Path
 import psutil
 import gc
@@ -52,16 +59,278 @@ class ProcessingConfig:
     use_gpu: bool = True
     cache_dir: str = ".cache"
     cache_ttl: int = 3600  # 1 godzina
+    cache_max_bytes: int = 2 * 1024 * 1024 * 1024  # 2GB
+    cache_full_hash: bool = False  # Hash całego pliku zamiast próbki bloków
     memory_limit: int = 1024 * 1024 * 1024  # 1GB
+    frame_buffer_slots: int = 0  # Klatki w locie w potoku analizy (0 = 2 * max_workers)
+    shared_memory_frames: bool = False  # Analiza w procesach, klatki przez pamięć współdzieloną
+    file_workers: int = 2  # Pliki przetwarzane jednocześnie w process_many (klatki trafiają do wspólnych pul)
+    sampling_strategy: str = "auto"  # auto | grab | seek | ffmpeg | read
+    ffmpeg_binary: str = "ffmpeg"
+    detect_scenes: bool = True  # Wymaga dekodowania wszystkich klatek (wspólnie z próbkowaniem)
+    decode_backend: str = "opencv"  # opencv | ffmpeg (potok), gdy dekodowane są wszystkie klatki
+    scene_detection_size: Tuple[int, int] = (64, 36)  # Rozmiar miniatur do detekcji scen
+    scene_histogram_threshold: float = 0.0  # Minimalna odległość histogramów przy cięciu (0-1)
+    analysis_max_side: int = 0  # Dłuższy bok obrazu analizowanego w pikselach (0 = pełna rozdzielczość); nastrój z próbki źródła bez uśredniania
+    skip_duplicate_frames: bool = True  # Klatki niemal identyczne z ostatnią analizowaną dziedziczą jej wyniki
+    duplicate_hash_threshold: int = 4  # Maksymalna odległość Hamminga odcisków dHash (z 64 bitów)
     log_level: str = "INFO"
 
+# Pola konfiguracji, które wpływają na wynik analizy (a więc na klucz cache'a)
+OUTPUT_CONFIG_FIELDS = (
+    'frame_interval', 'scene_threshold', 'min_object_area',
+    'detect_scenes', 'scene_detection_size', 'scene_histogram_threshold', 'analysis_max_side',
+    'skip_duplicate_frames', 'duplicate_hash_threshold',
+    'face_detection_scale', 'face_detection_neighbors',
+    'edge_detection_threshold1', 'edge_detection_threshold2',
+)
+
+# Zmiana formatu lub sposobu liczenia wyników albo wpisów cache'a unieważnia stare wpisy
+CACHE_FORMAT_VERSION = 3
+
+def file_fingerprint(file_path: str, full_hash: bool = False, block_size: int = 64 * 1024, blocks: int = 16) -> str:
+    """
+    Oblicza odcisk zawartości pliku.
+    
+    Domyślnie hashowany jest rozmiar oraz próbka bloków (pierwszy, ostatni
+    i równomiernie rozłożone pomiędzy nimi), co przy dużych plikach wideo
+    kosztuje kilka odczytów zamiast całego pliku. Pliki mniejsze niż próbka
+    są hashowane w całości.
+    
+    Args:
+        file_path: Ścieżka do pliku
+        full_hash: Czy hashować cały plik
+        block_size: Rozmiar pojedynczego bloku próbki
+        blocks: Liczba bloków próbki
+        
+    Returns:
+        Odcisk w postaci szesnastkowej
+    """
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{size}:{'full' if full_hash else 'sampled'}".encode())
+    with open(file_path, 'rb') as f:
+        if full_hash or size <= block_size * blocks:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        else:
+            step = (size - block_size) / (blocks - 1)
+            for i in range(blocks):
+                f.seek(int(i * step))
+                digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+# --- Kolumnowy format wpisów cache'a ---
+# Każdy wpis to katalog z plikiem meta.json (schemat oraz małe sekcje, np.
+# metadata) i plikami .npy z kolumnami sekcji będących listami rekordów
+# (frame_analyses, moods) lub listami list rekordów (objects). Liczby całkowite
+# są zawężane do najmniejszego typu, a napisy kodowane słownikowo, więc
+# kolumny są zwarte i można je mapować do pamięci (mmap) bez deserializacji.
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Nieobsługiwany typ w wyniku: {type(value).__name__}")
+
+def _flatten_record(record: Dict[str, Any], prefix: Tuple[str, ...] = ()) -> Generator[Tuple[Tuple[str, ...], Any], None, None]:
+    for name, value in record.items():
+        if not isinstance(name, str):
+            raise TypeError("Klucze rekordu muszą być napisami")
+        if isinstance(value, dict) and value:
+            yield from _flatten_record(value, prefix + (name,))
+        else:
+            yield prefix + (name,), value
+
+def _narrow_int(values: List[int]) -> np.ndarray:
+    low, high = min(values, default=0), max(values, default=0)
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return np.asarray(values, dtype=dtype)
+    raise OverflowError("Wartość poza zakresem int64")
+
+def _encode_column(values: List[Any]) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Koduje jedną kolumnę; ValueError, jeśli wartości nie mają wspólnego typu skalarnego."""
+    if all(isinstance(v, (bool, np.bool_)) for v in values):
+        return np.asarray(values, dtype=bool), {'type': 'bool'}
+    if all(isinstance(v, numbers.Integral) and not isinstance(v, (bool, np.bool_)) for v in values):
+        return _narrow_int([int(v) for v in values]), {'type': 'int'}
+    if all(isinstance(v, numbers.Real) and not isinstance(v, (bool, np.bool_)) for v in values):
+        return np.asarray(values, dtype=np.float64), {'type': 'float'}
+    if all(isinstance(v, str) for v in values):
+        categories = sorted(set(values))
+        codes = {category: i for i, category in enumerate(categories)}
+        return _narrow_int([codes[v] for v in values]), {'type': 'str', 'categories': categories}
+    raise ValueError("Kolumna o mieszanych lub złożonych typach")
+
+def _encode_records(records: List[Dict[str, Any]], directory: Path, prefix: str) -> List[Dict[str, Any]]:
+    """Rozkłada listę rekordów o jednakowej strukturze na kolumny zapisane jako .npy."""
+    if not records or not all(isinstance(record, dict) for record in records):
+        raise ValueError("Sekcja nie jest niepustą listą rekordów")
+    paths = [path for path, _ in _flatten_record(records[0])]
+    rows = [dict(_flatten_record(record)) for record in records]
+    if any(row.keys() != set(paths) for row in rows):
+        raise ValueError("Rekordy o różnej strukturze")
+    columns = []
+    for i, path in enumerate(paths):
+        values = [row[path] for row in rows]
+        try:
+            array, column = _encode_column(values)
+        except (ValueError, OverflowError):
+            # Pojedyncze pole złożone (np. lista kolorów) zostaje w JSON, reszta sekcji jest kolumnowa
+            columns.append({'type': 'json', 'path': list(path), 'values': json.loads(json.dumps(values, default=_json_default))})
+            continue
+        column.update(path=list(path), file=f"{prefix}c{i}.npy")
+        np.save(directory / column['file'], array, allow_pickle=False)
+        columns.append(column)
+    return columns
+
+def _encode_section(value: Any, directory: Path, prefix: str) -> Dict[str, Any]:
+    """Zwraca schemat sekcji; sekcje, których nie da się ująć kolumnowo, trafiają do JSON."""
+    try:
+        if isinstance(value, list) and value and all(isinstance(item, list) for item in value):
+            flat = [record for item in value for record in item]
+            offsets = np.cumsum([0] + [len(item) for item in value], dtype=np.int64)
+            columns = _encode_records(flat, directory, prefix)
+            np.save(directory / f"{prefix}offsets.npy", offsets, allow_pickle=False)
+            return {'layout': 'nested_records', 'columns': columns, 'offsets': f"{prefix}offsets.npy", 'length': len(value)}
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            return {'layout': 'records', 'columns': _encode_records(value, directory, prefix), 'length': len(value)}
+        if isinstance(value, list) and value:
+            array, column = _encode_column(value)
+            column['file'] = f"{prefix}values.npy"
+            np.save(directory / column['file'], array, allow_pickle=False)
+            return {'layout': 'values', 'column': column, 'length': len(value)}
+    except (ValueError, TypeError, OverflowError):
+        for leftover in directory.glob(f"{prefix}*.npy"):
+            leftover.unlink()
+    return {'layout': 'json', 'value': json.loads(json.dumps(value, default=_json_default))}
+
+def _select_sections(result: Dict[str, Any], sections: Optional[List[str]]) -> Dict[str, Any]:
+    return {name: result[name] for name in sections if name in result} if sections else result
+
+class CachedResult:
+    """
+    Leniwy widok wpisu cache'a.
+    
+    Sekcje są wczytywane dopiero przy pierwszym dostępie, a kolumny mapowane
+    do pamięci. column() zwraca kolumnę jako tablicę NumPy bez budowania
+    słowników, np. column('moods', 'brightness').
+    """
+    
+    def __init__(self, directory: Path, meta: Dict[str, Any]):
+        self.directory = directory
+        self.meta = meta
+        self._loaded: Dict[str, Any] = {}
+        
+    def keys(self) -> List[str]:
+        return list(self.meta['sections'])
+        
+    def __contains__(self, section: str) -> bool:
+        return section in self.meta['sections']
+        
+    def __getitem__(self, section: str) -> Any:
+        if section not in self._loaded:
+            self._loaded[section] = self._decode_section(self.meta['sections'][section])
+        return self._loaded[section]
+        
+    def to_dict(self, sections: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Materializuje wybrane (domyślnie wszystkie) sekcje jako zwykły słownik."""
+        return {section: self[section] for section in (sections or self.keys()) if section in self}
+        
+    def column(self, section: str, field: str) -> np.ndarray:
+        """Kolumna sekcji rekordów; pola zagnieżdżone oddziela się kropką."""
+        schema = self.meta['sections'][section]
+        if schema['layout'] == 'values':
+            return self._load_column(schema['column'])
+        for column in schema.get('columns', []):
+            if '.'.join(column['path']) == field:
+                return self._load_column(column)
+        raise KeyError(f"{section}.{field}")
+        
+    def offsets(self, section: str) -> np.ndarray:
+        """Granice rekordów per klatka dla sekcji typu lista list (np. objects)."""
+        return np.load(self.directory / self.meta['sections'][section]['offsets'], mmap_mode='r')
+        
+    def _load_column(self, column: Dict[str, Any]) -> np.ndarray:
+        if column['type'] == 'json':
+            values = np.empty(len(column['values']), dtype=object)
+            for i, value in enumerate(column['values']):
+                values[i] = value
+            return values
+        array = np.load(self.directory / column['file'], mmap_mode='r')
+        if column['type'] == 'str':
+            return np.asarray(column['categories'], dtype=object)[array]
+        return array
+        
+    def _decode_records(self, columns: List[Dict[str, Any]], length: int) -> List[Dict[str, Any]]:
+        records = [{} for _ in range(length)]
+        for column in columns:
+            if column['type'] == 'json':
+                values = column['values']
+            else:
+                values = np.load(self.directory / column['file'], mmap_mode='r').tolist()
+            if column['type'] == 'str':
+                values = [column['categories'][code] for code in values]
+            *parents, name = column['path']
+            for record, value in zip(records, values):
+                for parent in parents:
+                    record = record.setdefault(parent, {})
+                record[name] = value
+        return records
+        
+    def _decode_section(self, schema: Dict[str, Any]) -> Any:
+        layout = schema['layout']
+        if layout == 'json':
+            return schema['value']
+        if layout == 'records':
+            return self._decode_records(schema['columns'], schema['length'])
+        if layout == 'values':
+            values = self._load_column(schema['column'])
+            return values.tolist()
+        offsets = np.load(self.directory / schema['offsets']).tolist()
+        flat = self._decode_records(schema['columns'], offsets[-1])
+        return [flat[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
 class CacheManager:
-    """Zarządza cache'owaniem wyników przetwarzania."""
+    """
+    Zarządza cache'owaniem wyników przetwarzania.
+    
+    Klucze są adresowane zawartością: ten sam plik pod dwiema ścieżkami trafia
+    w jeden wpis, a plik przekodowany pod tą samą ścieżką dostaje nowy. Wpisy
+    są zapisywane atomowo w formacie kolumnowym (zob. CachedResult), a ich
+    łączny rozmiar jest ograniczony budżetem max_bytes; po jego przekroczeniu
+    usuwane są najdawniej używane wpisy według indeksu w index.json.
+    
+    Odczyty aktualizują kolejność LRU tylko w pamięci; indeks trafia na dysk
+    przy zapisie wpisu i eksmisji, w close() oraz najwyżej co INDEX_SAVE_INTERVAL
+    sekund. Utracone po awarii czasy dostępu są uzgadniane z plikami przy starcie.
+    """
+    
+    META_FILE = "meta.json"
+    
+    INDEX_FILE = "index.json"
+    
+    # Sekundy między zapisami indeksu zmienionego tylko przez odczyty
+    INDEX_SAVE_INTERVAL = 30.0
     
-    def __init__(self, cache_dir: str, ttl: int):
+    def __init__(self, cache_dir: str, ttl: int, max_bytes: int = 2 * 1024 * 1024 * 1024, full_hash: bool = False):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.full_hash = full_hash
+        self._lock = threading.RLock()
+        # Odciski plików zapamiętane po (ścieżka, i-węzeł, rozmiar, mtime), aby nie czytać pliku ponownie
+        self._fingerprints: Dict[Tuple[str, int, int, int], str] = {}
+        # klucz -> {'size', 'created', 'accessed'}; kolejność od najdawniej używanego
+        self._index: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'expired': 0}
+        # Czy indeks w pamięci różni się od index.json i kiedy był ostatnio zapisany
+        self._index_dirty = False
+        self._index_saved_at = time.monotonic()
+        self._load_index()
         
     def _get_cache_key(self, data: Any) -> str:
         """Generuje klucz cache'a na podstawie danych."""
@@ -73,39 +342,239 @@ class CacheManager:
             content = pickle.dumps(data)
         return hashlib.sha256(content).hexdigest()
         
-    def get(self, key: str) -> Optional[Any]:
-        """Pobiera dane z cache'a."""
-        try:
-            cache_file = self.cache_dir / f"{key}.cache"
-            if not cache_file.exists():
+    def fingerprint(self, file_path: str) -> str:
+        """Odcisk zawartości pliku, liczony ponownie tylko po zmianie rozmiaru lub mtime."""
+        st = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), st.st_ino, st.st_size, st.st_mtime_ns)
+        fingerprint = self._fingerprints.get(memo_key)
+        if fingerprint is None:
+            fingerprint = file_fingerprint(file_path, full_hash=self.full_hash)
+            self._fingerprints[memo_key] = fingerprint
+        return fingerprint
+        
+    def make_key(self, file_path: str, config: "ProcessingConfig", kind: str) -> str:
+        """
+        Buduje klucz cache'a dla pliku.
+        
+        Args:
+            file_path: Ścieżka do pliku multimedialnego
+            config: Konfiguracja przetwarzania (liczą się tylko pola z OUTPUT_CONFIG_FIELDS)
+            kind: Rodzaj przetwarzania, np. 'video' lub 'image'
+            
+        Returns:
+            Klucz cache'a
+        """
+        descriptor = {
+            'content': self.fingerprint(file_path),
+            'config': {name: getattr(config, name) for name in OUTPUT_CONFIG_FIELDS},
+            'kind': kind,
+            'version': CACHE_FORMAT_VERSION,
+        }
+        return self._get_cache_key(json.dumps(descriptor, sort_keys=True))
+        
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key
+        
+    def open(self, key: str) -> Optional[CachedResult]:
+        """
+        Otwiera wpis cache'a bez wczytywania sekcji.
+        
+        Args:
+            key: Klucz cache'a
+            
+        Returns:
+            Leniwy widok wpisu lub None, jeśli wpisu nie ma lub wygasł
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            entry_dir = self._entry_path(key)
+            if entry is None or not (entry_dir / self.META_FILE).exists():
+                self._forget(key)
+                self._stats['misses'] += 1
                 return None
                 
             # Sprawdź TTL
-            if datetime.now().timestamp() - cache_file.stat().st_mtime > self.ttl:
-                cache_file.unlink()
+            if datetime.now().timestamp() - entry['created'] > self.ttl:
+                self._remove(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                self._index_changed()
                 return None
                 
-            with cache_file.open('rb') as f:
-                return pickle.load(f)
+            entry['accessed'] = datetime.now().timestamp()
+            self._index.move_to_end(key)
+            
+        try:
+            with (entry_dir / self.META_FILE).open() as f:
+                meta = json.load(f)
+        except Exception as e:
+            logger.warning(f"Błąd podczas odczytu z cache'a: {e}")
+            with self._lock:
+                self._remove(key)
+                self._stats['misses'] += 1
+                self._index_changed()
+            return None
+            
+        with self._lock:
+            self._stats['hits'] += 1
+            self._index_changed()
+        return CachedResult(entry_dir, meta)
+        
+    def get(self, key: str, sections: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Pobiera dane z cache'a.
+        
+        Args:
+            key: Klucz cache'a
+            sections: Sekcje do wczytania (domyślnie wszystkie)
+            
+        Returns:
+            Słownik z wybranymi sekcjami lub None
+        """
+        cached = self.open(key)
+        if cached is None:
+            return None
+        try:
+            return cached.to_dict(sections)
         except Exception as e:
+            # Wpis usunięty przez inny proces lub uszkodzony
             logger.warning(f"Błąd podczas odczytu z cache'a: {e}")
+            with self._lock:
+                self._remove(key)
+                self._stats['hits'] -= 1
+                self._stats['misses'] += 1
+                self._index_changed()
             return None
             
-    def set(self, key: str, data: Any) -> None:
-        """Zapisuje dane do cache'a."""
+    def set(self, key: str, data: Dict[str, Any]) -> None:
+        """Zapisuje dane do cache'a (atomowo: katalog tymczasowy + rename)."""
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{key[:16]}-", suffix=".tmp"))
         try:
-            cache_file = self.cache_dir / f"{key}.cache"
-            with cache_file.open('wb') as f:
-                pickle.dump(data, f)
+            meta = {'version': CACHE_FORMAT_VERSION, 'sections': {}}
+            for i, (name, value) in enumerate(data.items()):
+                meta['sections'][name] = _encode_section(value, tmp_dir, f"s{i}_")
+            with (tmp_dir / self.META_FILE).open('w') as f:
+                json.dump(meta, f)
+            size = sum(path.stat().st_size for path in tmp_dir.iterdir())
+            if size > self.max_bytes:
+                logger.info(f"Wynik ({size / 1024 / 1024:.1f} MB) przekracza budżet cache'a, pomijanie zapisu")
+                return
+                
+            with self._lock:
+                entry_dir = self._entry_path(key)
+                if entry_dir.exists():
+                    # Katalogu nie da się podmienić atomowo; stary wpis usuwamy po podmianie
+                    stale_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{key[:16]}-", suffix=".tmp"))
+                    os.replace(entry_dir, stale_dir / key)
+                    os.replace(tmp_dir, entry_dir)
+                    shutil.rmtree(stale_dir, ignore_errors=True)
+                else:
+                    os.replace(tmp_dir, entry_dir)
+                now = datetime.now().timestamp()
+                self._index.pop(key, None)
+                self._index[key] = {'size': size, 'created': now, 'accessed': now}
+                self._stats['writes'] += 1
+                self._evict()
+                self._save_index()
         except Exception as e:
             logger.warning(f"Błąd podczas zapisu do cache'a: {e}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
             
     def clear_expired(self) -> None:
         """Czyści wygasłe wpisy z cache'a."""
         now = datetime.now().timestamp()
-        for cache_file in self.cache_dir.glob("*.cache"):
-            if now - cache_file.stat().st_mtime > self.ttl:
-                cache_file.unlink()
+        with self._lock:
+            for key, entry in list(self._index.items()):
+                if now - entry['created'] > self.ttl:
+                    self._remove(key)
+                    self._stats['expired'] += 1
+            self._save_index()
+            
+    def stats(self) -> Dict[str, Any]:
+        """Statystyki cache'a: trafienia, chybienia, zapisy, eksmisje i zajętość."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': self._stats['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._index),
+                'bytes': self._total_bytes(),
+                'max_bytes': self.max_bytes,
+            }
+            
+    def _total_bytes(self) -> int:
+        return sum(entry['size'] for entry in self._index.values())
+        
+    def _evict(self) -> None:
+        """Usuwa najdawniej używane wpisy, aż cache zmieści się w budżecie."""
+        total = self._total_bytes()
+        while total > self.max_bytes and self._index:
+            key, entry = next(iter(self._index.items()))
+            self._remove(key)
+            total -= entry['size']
+            self._stats['evictions'] += 1
+            
+    def _forget(self, key: str) -> None:
+        if self._index.pop(key, None) is not None:
+            self._index_changed()
+            
+    def _index_changed(self) -> None:
+        """Oznacza indeks jako zmieniony; zapisuje go, jeśli od ostatniego zapisu minęło INDEX_SAVE_INTERVAL."""
+        self._index_dirty = True
+        if time.monotonic() - self._index_saved_at >= self.INDEX_SAVE_INTERVAL:
+            self._save_index()
+            
+    def _remove(self, key: str) -> None:
+        self._index.pop(key, None)
+        shutil.rmtree(self._entry_path(key), ignore_errors=True)
+            
+    def _load_index(self) -> None:
+        """Wczytuje indeks i uzgadnia go z plikami na dysku (np. po awarii lub zapisie z innego procesu)."""
+        entries = {}
+        try:
+            with (self.cache_dir / self.INDEX_FILE).open() as f:
+                entries = json.load(f).get('entries', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Uszkodzony indeks cache'a, odbudowa z plików: {e}")
+            
+        on_disk = {}
+        for meta_file in self.cache_dir.glob(f"*/{self.META_FILE}"):
+            entry_dir = meta_file.parent
+            mtime = meta_file.stat().st_mtime
+            on_disk[entry_dir.name] = entries.get(entry_dir.name) or {'created': mtime, 'accessed': mtime}
+            on_disk[entry_dir.name]['size'] = sum(path.stat().st_size for path in entry_dir.iterdir())
+        for key, entry in sorted(on_disk.items(), key=lambda item: item[1]['accessed']):
+            self._index[key] = entry
+        # Wpisy w starym formacie (pickle) oraz pozostałości po przerwanych zapisach
+        for stale in self.cache_dir.glob("*.cache"):
+            stale.unlink()
+        for tmp_path in self.cache_dir.glob(".*.tmp"):
+            if datetime.now().timestamp() - tmp_path.stat().st_mtime > 3600:
+                shutil.rmtree(tmp_path) if tmp_path.is_dir() else tmp_path.unlink()
+        with self._lock:
+            self._evict()
+            self._save_index()
+            
+    def close(self) -> None:
+        """Zapisuje indeks, jeśli zmieniły go odczyty od ostatniego zapisu."""
+        with self._lock:
+            if self._index_dirty:
+                self._save_index()
+                
+    def _save_index(self) -> None:
+        """Zapisuje indeks atomowo."""
+        self._index_dirty = False
+        self._index_saved_at = time.monotonic()
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".index-", suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'version': CACHE_FORMAT_VERSION, 'entries': self._index}, f)
+            os.replace(tmp_path, self.cache_dir / self.INDEX_FILE)
+        except Exception as e:
+            logger.warning(f"Błąd podczas zapisu indeksu cache'a: {e}")
 
 class MemoryManager:
     """Zarządza zużyciem pamięci."""
@@ -137,6 +606,615 @@ class MemoryManager:
                 logger.warning(f"Przekroczono limit pamięci podczas {operation_name}")
                 self.free_memory()
 
+# Obsługiwane formaty
+VIDEO_FORMATS = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'}
+IMAGE_FORMATS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
+
+# --- Analiza pojedynczej klatki ---
+# Funkcje na poziomie modułu, aby mogły działać zarówno w wątkach, jak i
+# w procesach roboczych (bez serializacji MediaProcessor). Odcień szarości,
+# krawędzie i HSV są liczone raz i współdzielone przez wszystkie analizy.
+
+def _as_image(image: Any) -> np.ndarray:
+    """Zwraca obraz BGR; przyjmuje tablicę NumPy albo ścieżkę do pliku."""
+    if isinstance(image, np.ndarray):
+        return image
+    img = cv2.imread(image)
+    if img is None:
+        raise ValueError(f"Nie można odczytać klatki: {image}")
+    return img
+
+def downscale_for_analysis(image: np.ndarray, max_side: int) -> Tuple[np.ndarray, Tuple[float, float]]:
+    """
+    Zmniejsza obraz do rozdzielczości analizy.
+    
+    Obraz jest skalowany raz (INTER_AREA, która uśrednia piksele zamiast je
+    pomijać), tak aby dłuższy bok nie przekraczał max_side. Mniejsze obrazy
+    i max_side=0 zwracane są bez kopiowania.
+    
+    Args:
+        image: Obraz (BGR lub w skali szarości)
+        max_side: Maksymalny dłuższy bok w pikselach (0 = bez zmniejszania)
+        
+    Returns:
+        Krotka (obraz do analizy, skala (x, y) z analizy do współrzędnych źródła)
+    """
+    height, width = image.shape[:2]
+    if not max_side or max(height, width) <= max_side:
+        return image, (1.0, 1.0)
+    factor = max_side / max(height, width)
+    size = (max(1, int(round(width * factor))), max(1, int(round(height * factor))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA), (width / size[0], height / size[1])
+
+def classify_object_type(aspect_ratio: float, extent: float, area: float) -> str:
+    """Zgrubna klasyfikacja kształtu konturu."""
+    if extent < 0.3:
+        return 'irregular'
+    if aspect_ratio < 0.5:
+        return 'vertical'
+    if aspect_ratio > 2.0:
+        return 'horizontal'
+    return 'compact'
+
+def objects_from_edges(edges: np.ndarray, config: ProcessingConfig,
+                       scale: Tuple[float, float] = (1.0, 1.0)) -> List[Dict[str, Any]]:
+    """
+    Wyznacza obiekty z konturów mapy krawędzi.
+    
+    Przy mapie w rozdzielczości analizy (zob. downscale_for_analysis) pozycje,
+    pola i obwody są przeliczane na współrzędne źródła, a min_object_area
+    dotyczy pikseli źródła.
+    """
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    scale_x, scale_y = scale
+    
+    objects = []
+    for contour in contours:
+        area = cv2.contourArea(contour) * scale_x * scale_y
+        if area > config.min_object_area:
+            x, y, w, h = cv2.boundingRect(contour)
+            x, y, w, h = x * scale_x, y * scale_y, w * scale_x, h * scale_y
+            aspect_ratio = float(w / h) if h > 0 else 0.0
+            extent = float(area / (w * h)) if w * h > 0 else 0.0
+            
+            objects.append({
+                'position': {'x': int(round(x)), 'y': int(round(y)), 'width': int(round(w)), 'height': int(round(h))},
+                'area': float(area),
+                'perimeter': float(cv2.arcLength(contour, True) * np.sqrt(scale_x * scale_y)),
+                'aspect_ratio': aspect_ratio,
+                'extent': extent,
+                'type': classify_object_type(aspect_ratio, extent, area)
+            })
+            
+    return objects
+
+def frame_statistics(gray: np.ndarray, edges: np.ndarray) -> Dict[str, float]:
+    """Jasność, kontrast, ostrość i gęstość krawędzi."""
+    mean, std = cv2.meanStdDev(gray)
+    return {
+        'brightness': float(mean[0][0]),
+        'contrast': float(std[0][0]),
+        'sharpness': float(cv2.Laplacian(gray, cv2.CV_32F).var()),
+        'edges_density': float(np.count_nonzero(edges) / edges.size)
+    }
+
+def scene_mood(img: np.ndarray, hsv: np.ndarray) -> Dict[str, Any]:
+    """Nastrój kadru na podstawie jasności, nasycenia i temperatury barw."""
+    _, saturation, value, _ = cv2.mean(hsv)
+    blue, _, red, _ = cv2.mean(img)
+    brightness = value / 255.0
+    saturation = saturation / 255.0
+    warmth = (red - blue) / 255.0
+    
+    if brightness < 0.3:
+        mood = 'dark'
+    elif brightness > 0.7 and saturation > 0.4:
+        mood = 'vibrant'
+    elif saturation < 0.15:
+        mood = 'muted'
+    elif warmth > 0.1:
+        mood = 'warm'
+    elif warmth < -0.1:
+        mood = 'cold'
+    else:
+        mood = 'neutral'
+        
+    return {'mood': mood, 'brightness': brightness, 'saturation': saturation, 'warmth': warmth}
+
+def source_mood(image: np.ndarray, max_side: int) -> Dict[str, Any]:
+    """
+    Nastrój obrazu źródłowego przy ograniczonej liczbie pikseli.
+    
+    Uśrednianie pikseli przy zmniejszaniu (INTER_AREA) miesza sąsiednie barwy
+    i zaniża nasycenie, przez co kadry przechodzą np. z 'neutral' w 'muted'.
+    Dlatego nastrój liczony jest z co n-tego piksela źródła (bez uśredniania),
+    tak aby próbka nie przekraczała max_side pikseli na dłuższym boku.
+    
+    Args:
+        image: Obraz BGR w rozdzielczości źródła
+        max_side: Maksymalny dłuższy bok próbki w pikselach (0 = wszystkie piksele)
+        
+    Returns:
+        Wynik scene_mood dla próbki
+    """
+    height, width = image.shape[:2]
+    if max_side and max(height, width) > max_side:
+        step = -(-max(height, width) // max_side)
+        image = np.ascontiguousarray(image[::step, ::step])
+    return scene_mood(image, cv2.cvtColor(image, cv2.COLOR_BGR2HSV))
+
+def analyze_frame_pixels(frame: np.ndarray, config: ProcessingConfig) -> Dict[str, Any]:
+    """
+    Wykonuje wszystkie analizy klatki w jednym przebiegu.
+    
+    Klatka jest raz zmniejszana do analysis_max_side; statystyki dotyczą
+    zmniejszonej klatki, nastrój próbki pikseli źródła (zob. source_mood),
+    a obiekty są w współrzędnych źródła.
+    
+    Args:
+        frame: Klatka BGR
+        config: Konfiguracja przetwarzania
+        
+    Returns:
+        Dict z kluczami 'analysis', 'objects' i 'mood'
+    """
+    img, scale = downscale_for_analysis(frame, config.analysis_max_side)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, config.edge_detection_threshold1, config.edge_detection_threshold2)
+    return {
+        'analysis': frame_statistics(gray, edges),
+        'objects': objects_from_edges(edges, config, scale),
+        'mood': source_mood(frame, config.analysis_max_side)
+    }
+
+# Kodeki, w których każda klatka jest kluczowa (przeskok kosztuje jedno dekodowanie)
+INTRA_ONLY_CODECS = {
+    'MJPG', 'mjpa', 'mjpb', 'jpeg',
+    'apch', 'apcn', 'apcs', 'apco', 'ap4h', 'ap4x',  # ProRes
+    'AVdn', 'AVdh',  # DNxHD / DNxHR
+}
+
+# Backend FFmpeg w OpenCV przeskakuje do punktu ~16 klatek przed celem i dekoduje
+# od poprzedzającej go klatki kluczowej, więc przeskok kosztuje około
+# SEEK_PREROLL_FRAMES + GOP / 2 dekodowań
+SEEK_PREROLL_FRAMES = 16
+
+def seek_cost(keyframe_interval: float) -> float:
+    """Przybliżona liczba dekodowanych klatek na jeden przeskok."""
+    return SEEK_PREROLL_FRAMES + keyframe_interval / 2
+
+def probe_keyframe_interval(video_path: str, max_packets: int = 600) -> Optional[float]:
+    """
+    Szacuje odstęp między klatkami kluczowymi (GOP) na podstawie pierwszych pakietów.
+    
+    Czyta surowe pakiety bez dekodowania, więc kosztuje tylko demultipleksację.
+    
+    Args:
+        video_path: Ścieżka do pliku wideo
+        max_packets: Liczba badanych pakietów
+        
+    Returns:
+        Długość grupy klatek, w którą trafia losowa klatka (średnia odstępów
+        ważona ich długością, odporna na skupiska klatek kluczowych przy cięciach);
+        dolne oszacowanie, jeśli w próbce była jedna klatka kluczowa; None, jeśli
+        backend nie udostępnia flag pakietów
+    """
+    if not hasattr(cv2, 'CAP_PROP_LRF_HAS_KEY_FRAME'):
+        return None
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+    try:
+        if not cap.isOpened() or not cap.set(cv2.CAP_PROP_FORMAT, -1):
+            return None
+        keyframes = []
+        packets = 0
+        while packets < max_packets and cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(packets)
+            packets += 1
+        if not keyframes:
+            return None
+        if len(keyframes) == 1:
+            return float(packets)
+        gaps = np.diff(keyframes + [packets]).astype(np.float64)
+        return float((gaps ** 2).sum() / gaps.sum())
+    finally:
+        cap.release()
+
+class SceneChangeDetector:
+    """
+    Wykrywa cięcia na strumieniu wszystkich klatek wideo.
+    
+    Klatki są zmniejszane (INTER_AREA) do szarych miniatur i zbierane w partie,
+    dla których różnice kolejnych klatek i odległości histogramów liczone są
+    wektorowo w NumPy. Cięcie to klatka, której średnia różnica bezwzględna od
+    poprzedniej przekracza threshold, a odległość histogramów (0-1) wynosi co
+    najmniej histogram_threshold. Wyniki pojawiają się w changes w miarę
+    przetwarzania partii.
+    """
+    
+    HISTOGRAM_BINS = 16
+    
+    def __init__(self, threshold: float, fps: float, size: Tuple[int, int] = (64, 36),
+                 histogram_threshold: float = 0.0, batch_size: int = 64):
+        self.threshold = threshold
+        self.fps = fps or 25.0
+        self.size = tuple(size)
+        self.histogram_threshold = histogram_threshold
+        self.batch_size = batch_size
+        # Slot 0 przechowuje ostatnią klatkę poprzedniej partii
+        self._batch = np.empty((batch_size + 1, self.size[1], self.size[0]), dtype=np.uint8)
+        self._indices = np.empty(batch_size, dtype=np.int64)
+        self._count = 0
+        self._has_previous = False
+        self.frames_seen = 0
+        self.changes: List[Dict[str, Any]] = []
+        
+    def add(self, frame_index: int, frame: np.ndarray) -> None:
+        """Dodaje klatkę BGR (w kolejności dekodowania)."""
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._batch[self._count + 1])
+        self._indices[self._count] = frame_index
+        self._count += 1
+        self.frames_seen += 1
+        if self._count == self.batch_size:
+            self.flush()
+            
+    def flush(self) -> List[Dict[str, Any]]:
+        """Przetwarza niepełną partię; wywoływane po ostatniej klatce."""
+        if self._count == 0:
+            return self.changes
+        start = 0 if self._has_previous else 1
+        frames = self._batch[start:self._count + 1]
+        indices = self._indices[:self._count] if self._has_previous else self._indices[1:self._count]
+        
+        if len(frames) > 1:
+            signed = frames.astype(np.int16)
+            differences = np.abs(signed[1:] - signed[:-1]).mean(axis=(1, 2))
+            
+            count, pixels = len(frames), frames[0].size
+            shift = 8 - int(np.log2(self.HISTOGRAM_BINS))
+            bins = (frames.reshape(count, -1) >> shift).astype(np.intp) + np.arange(count)[:, None] * self.HISTOGRAM_BINS
+            histograms = np.bincount(bins.ravel(), minlength=count * self.HISTOGRAM_BINS).reshape(count, -1) / pixels
+            histogram_distances = 0.5 * np.abs(histograms[1:] - histograms[:-1]).sum(axis=1)
+            
+            cuts = (differences > self.threshold) & (histogram_distances >= self.histogram_threshold)
+            for i in np.flatnonzero(cuts):
+                frame_index = int(indices[i])
+                self.changes.append({
+                    'frame': frame_index,
+                    'timestamp': frame_index / self.fps,
+                    'score': float(differences[i]),
+                    'histogram_distance': float(histogram_distances[i])
+                })
+                
+        self._batch[0] = self._batch[self._count]
+        self._has_previous = True
+        self._count = 0
+        return self.changes
+
+# Różnica jasności sąsiednich pikseli miniatury (w poziomach 0-255), od której bit dHash jest ustawiany
+DHASH_MARGIN = 2.0
+
+def _dhash_thumbnail(frame: np.ndarray, hash_size: int) -> np.ndarray:
+    # Pośrednia miniatura uint8 jest tania, a jej zaokrąglenia uśredniają się w końcowej (float)
+    thumbnail = cv2.resize(frame, ((hash_size + 1) * 4, hash_size * 4), interpolation=cv2.INTER_AREA).astype(np.float32)
+    thumbnail = cv2.resize(thumbnail, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY) if thumbnail.ndim == 3 else thumbnail
+
+def _dhash_bits(thumbnail: np.ndarray, margin: float) -> int:
+    return int.from_bytes(np.packbits(thumbnail[:, :-1] - thumbnail[:, 1:] > margin).tobytes(), 'big')
+
+def frame_dhash(frame: np.ndarray, hash_size: int = 8, margin: float = DHASH_MARGIN) -> int:
+    """
+    Odcisk percepcyjny dHash klatki.
+    
+    Klatka jest zmniejszana (INTER_AREA) do miniatury (hash_size + 1) x hash_size
+    w skali szarości, a każdy bit mówi, czy piksel jest jaśniejszy od prawego
+    sąsiada o więcej niż margin poziomów. Miniatura liczona jest w float, a próg
+    margin sprawia, że w płaskich obszarach (niebo, ściana) szum nie przełącza
+    bitów. Kompresja, szum i drobne zmiany ekspozycji zmieniają niewiele bitów.
+    
+    Returns:
+        Odcisk jako liczba o hash_size * hash_size bitach
+    """
+    return _dhash_bits(_dhash_thumbnail(frame, hash_size), margin)
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+class DuplicateFrameFilter:
+    """
+    Wykrywa próbkowane klatki niemal identyczne z ostatnią analizowaną.
+    
+    Klatka, której odcisk dHash różni się od odcisku ostatniej analizowanej
+    klatki o co najwyżej threshold bitów, a średnia jasność miniatury o co
+    najwyżej brightness_tolerance poziomów (dHash jest na nią niewrażliwy,
+    a nastrój i statystyki nie), jest duplikatem i dziedziczy jej wyniki;
+    każda inna staje się nowym wzorcem. Porównanie z ostatnią
+    analizowaną, a nie poprzednią klatką, nie pozwala powolnym zmianom
+    (np. zoomowi) kumulować się bez ponownej analizy.
+    """
+    
+    def __init__(self, threshold: int = 4, hash_size: int = 8, brightness_tolerance: float = 8.0):
+        self.threshold = threshold
+        self.hash_size = hash_size
+        self.brightness_tolerance = brightness_tolerance
+        self._reference: Optional[Tuple[int, float]] = None  # Odcisk i jasność wzorca
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.frames_analyzed = 0
+        self.hash_seconds = 0.0
+        self.analysis_seconds = 0.0  # Czas analiz w wątkach/procesach roboczych
+        
+    def is_duplicate(self, frame: np.ndarray) -> bool:
+        """Sprawdza klatkę (w kolejności próbkowania); klatka niebędąca duplikatem zostaje wzorcem."""
+        started = time.perf_counter()
+        thumbnail = _dhash_thumbnail(frame, self.hash_size)
+        fingerprint, brightness = _dhash_bits(thumbnail, DHASH_MARGIN), float(thumbnail.mean())
+        duplicate = (
+            self._reference is not None
+            and hamming_distance(fingerprint, self._reference[0]) <= self.threshold
+            and abs(brightness - self._reference[1]) <= self.brightness_tolerance
+        )
+        if not duplicate:
+            self._reference = (fingerprint, brightness)
+        self.frames_checked += 1
+        self.frames_skipped += duplicate
+        self.hash_seconds += time.perf_counter() - started
+        return duplicate
+        
+    def record_analysis(self, seconds: float) -> None:
+        """Odnotowuje czas analizy klatki niebędącej duplikatem."""
+        self.frames_analyzed += 1
+        self.analysis_seconds += seconds
+        
+    def summary(self) -> Dict[str, Any]:
+        """
+        Podsumowanie do processing_info.
+        
+        Returns:
+            Dict z progiem, liczbą sprawdzonych i pominiętych klatek, odsetkiem
+            pominiętych, czasem hashowania oraz szacowanym oszczędzonym czasem
+            analizy (średni czas analizy razy liczba pominiętych, minus czas
+            hashowania; w sekundach pracy wątków/procesów roboczych)
+        """
+        mean_analysis = self.analysis_seconds / self.frames_analyzed if self.frames_analyzed else 0.0
+        return {
+            'threshold': self.threshold,
+            'frames_checked': self.frames_checked,
+            'frames_skipped': self.frames_skipped,
+            'skip_rate': self.frames_skipped / self.frames_checked if self.frames_checked else 0.0,
+            'hash_time': self.hash_seconds,
+            'time_saved': self.frames_skipped * mean_analysis - self.hash_seconds,
+        }
+
+class FrameRingBuffer:
+    """
+    Pierścień slotów na klatki w pamięci współdzielonej.
+    
+    Dekoder zajmuje wolny slot (acquire), kopiuje do niego klatkę, a proces
+    roboczy czyta ją bez serializacji. Slot wraca do puli (release) dopiero po
+    odebraniu wyniku analizy klatki.
+    """
+    
+    def __init__(self, slots: int, shape: Tuple[int, ...], dtype: Any = np.uint8):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        size = int(np.prod(self.shape)) * self.dtype.itemsize * slots
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        
+    @property
+    def name(self) -> str:
+        return self.shm.name
+        
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """Zwraca numer wolnego slotu; queue.Empty po upływie timeout."""
+        return self._free.get(timeout=timeout)
+        
+    def release(self, slot: int) -> None:
+        self._free.put(slot)
+        
+    def reset(self) -> None:
+        """Zwalnia wszystkie sloty; wolno wywołać dopiero po zakończeniu zadań korzystających z pierścienia."""
+        self._free = queue.Queue()
+        for slot in range(self.slots):
+            self._free.put(slot)
+        
+    def close(self) -> None:
+        del self.frames
+        self.shm.close()
+        self.shm.unlink()
+
+# Bezczynne pierścienie trzymane przez MediaProcessor do ponownego użycia
+IDLE_RING_LIMIT = 2
+
+def bounded_map(executor: Executor, fn: Callable[[Any], Any], items: Iterable[Any], window: int) -> Generator[Any, None, None]:
+    """
+    Jak executor.map, ale z co najwyżej window zadaniami w locie.
+    
+    Kolejne elementy items są pobierane dopiero po odebraniu wcześniejszych
+    wyników, więc wejście może być dowolnie długim generatorem. Przerwanie
+    iteracji anuluje zadania, które jeszcze się nie rozpoczęły.
+    
+    Yields:
+        Wyniki fn w kolejności elementów items
+    """
+    pending: Deque[Future] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+def _remove_temp_files(temp_files: List[str]) -> None:
+    logger.debug("Czyszczenie plików tymczasowych")
+    for file_path in temp_files:
+        try:
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+            elif os.path.isdir(file_path):
+                shutil.rmtree(file_path)
+        except Exception as e:
+            logger.warning(f"Błąd podczas usuwania pliku tymczasowego {file_path}: {e}")
+    del temp_files[:]
+
+def _release_resources(pools: Dict[str, Executor], rings: "OrderedDict[Any, FrameRingBuffer]",
+                       temp_files: List[str], cleanup_temp_files: bool, wait_for_workers: bool = True) -> None:
+    """Zamyka pule i pierścienie procesora; nie odwołuje się do niego, więc służy też jako weakref.finalize."""
+    for kind in list(pools):
+        pools.pop(kind).shutdown(wait=wait_for_workers)
+    while rings:
+        rings.popitem()[1].close()
+    if cleanup_temp_files:
+        _remove_temp_files(temp_files)
+
+# Znacznik końca strumienia zadań dekodera
+_END_OF_STREAM = object()
+
+def _run_timed(fn: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """Zadanie puli zwracające (wynik, czas wykonania w sekundach)."""
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+# Pierścienie dołączone w procesie roboczym: nazwa -> (SharedMemory, tablica)
+_attached_rings: "OrderedDict[str, Tuple[shared_memory.SharedMemory, np.ndarray]]" = OrderedDict()
+
+def _analyze_ring_slot(name: str, slot: int, slots: int, shape: Tuple[int, ...], config: ProcessingConfig) -> Dict[str, Any]:
+    """Zadanie procesu roboczego: analiza klatki ze slotu pierścienia."""
+    if name not in _attached_rings:
+        # Procesy robocze dzielą resource_tracker z procesem, który utworzył pierścień i go usuwa
+        shm = shared_memory.SharedMemory(name=name)
+        _attached_rings[name] = (shm, np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=shm.buf))
+        while len(_attached_rings) > 4:
+            _, (stale, frames) = _attached_rings.popitem(last=False)
+            del frames
+            stale.close()
+    _attached_rings.move_to_end(name)
+    return analyze_frame_pixels(_attached_rings[name][1][slot], config)
+
+# --- Przetwarzanie wielu plików ---
+
+def collect_media_files(sources: Union[str, Iterable[str]]) -> List[Tuple[str, int]]:
+    """
+    Rozwija katalogi i ścieżki do listy plików z ich rozmiarami, bez duplikatów.
+    
+    Z katalogów (przeszukiwanych rekurencyjnie) brane są tylko pliki
+    w obsługiwanych formatach. Jawnie podane ścieżki są zachowywane także
+    wtedy, gdy nie istnieją (rozmiar 0), aby process_many zgłosił ich błąd.
+    
+    Args:
+        sources: Katalog, ścieżka pliku lub lista ścieżek
+        
+    Returns:
+        Lista krotek (ścieżka, rozmiar w bajtach)
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+    supported = VIDEO_FORMATS | IMAGE_FORMATS
+    paths: List[str] = []
+    for source in sources:
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            for root, dirs, names in os.walk(source):
+                dirs.sort()
+                paths.extend(os.path.join(root, name) for name in sorted(names) if Path(name).suffix.lower() in supported)
+        else:
+            paths.append(source)
+            
+    files, seen = [], set()
+    for path in paths:
+        real_path = os.path.realpath(path)
+        if real_path in seen:
+            continue
+        seen.add(real_path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        files.append((path, size))
+    return files
+
+class BatchReport:
+    """Zbiorcze statystyki przepustowości process_many, aktualizowane po każdym pliku."""
+    
+    def __init__(self):
+        self.files_total = 0
+        self.bytes_total = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.bytes_done = 0
+        self.media_seconds = 0.0  # Łączny czas trwania przetworzonych wideo
+        self.frames_analyzed = 0
+        self.busy_seconds = 0.0  # Suma czasów przetwarzania pojedynczych plików
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        
+    def start(self, files_total: int, bytes_total: int) -> None:
+        self.files_total += files_total
+        self.bytes_total += bytes_total
+        if self._started is None:
+            self._started = time.perf_counter()
+        self._finished = None
+        
+    def add(self, event: Dict[str, Any]) -> None:
+        """Uwzględnia wynik pojedynczego pliku (zdarzenie z process_many)."""
+        self.bytes_done += event['size']
+        self.busy_seconds += event['elapsed']
+        if event['error'] is not None:
+            self.failed += 1
+            return
+        self.succeeded += 1
+        result = event['result']
+        if 'metadata' in result:
+            self.media_seconds += float(result['metadata'].get('duration') or 0.0)
+        if 'processing_info' in result:
+            self.frames_analyzed += int(result['processing_info'].get('frames_analyzed') or 0)
+            
+    def finish(self) -> None:
+        self._finished = time.perf_counter()
+        
+    @property
+    def elapsed(self) -> float:
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.perf_counter()) - self._started
+        
+    def summary(self) -> Dict[str, Any]:
+        """
+        Raport przepustowości.
+        
+        Returns:
+            Dict z liczbą plików (w tym nieudanych), czasem, przepustowością
+            w plikach, MB, klatkach i sekundach materiału na sekundę oraz
+            średnią liczbą plików przetwarzanych jednocześnie
+        """
+        elapsed = self.elapsed
+        rate = (lambda amount: amount / elapsed) if elapsed > 0 else (lambda amount: 0.0)
+        return {
+            'files': self.files_total,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'pending': self.files_total - self.succeeded - self.failed,
+            'bytes': self.bytes_done,
+            'elapsed': elapsed,
+            'files_per_s': rate(self.succeeded + self.failed),
+            'mb_per_s': rate(self.bytes_done / 1024 / 1024),
+            'frames_per_s': rate(self.frames_analyzed),
+            'media_seconds': self.media_seconds,
+            'realtime_factor': rate(self.media_seconds),
+            'concurrency': rate(self.busy_seconds),
+        }
+
 class MediaProcessor:
     """Przetwarza pliki multimedialne z optymalizacjami wydajności."""
     
@@ -147,9 +1225,25 @@ class MediaProcessor:
         self.temp_files: List[str] = []
         
         # Inicjalizacja menedżerów
-        self.cache_manager = CacheManager(self.config.cache_dir, self.config.cache_ttl)
+        self.cache_manager = CacheManager(
+            self.config.cache_dir,
+            self.config.cache_ttl,
+            max_bytes=self.config.cache_max_bytes,
+            full_hash=self.config.cache_full_hash
+        )
         self.memory_manager = MemoryManager(self.config.memory_limit)
         
+        # Pule robocze i pierścienie klatek: tworzone przy pierwszym użyciu,
+        # współdzielone przez kolejne wywołania i zamykane w close()
+        self._pools: Dict[str, Executor] = {}
+        self._idle_rings: "OrderedDict[Tuple[int, Tuple[int, ...]], FrameRingBuffer]" = OrderedDict()
+        self._resources_lock = threading.Lock()
+        # Gdy close() nie zostanie wywołane, zasoby zwalniane są przy usunięciu obiektu lub wyjściu z interpretera
+        self._finalizer = weakref.finalize(
+            self, _release_resources, self._pools, self._idle_rings,
+            self.temp_files, self.config.cleanup_temp_files, False
+        )
+        
         # Konfiguracja poziomu logowania
         logger.setLevel(getattr(logging, self.config.log_level.upper()))
         
@@ -161,15 +1255,25 @@ class MediaProcessor:
             self.gpu_enabled = False
             logger.info("GPU niedostępne, używanie CPU")
             
-    def process_video(self, video_path: str) -> Dict[str, Any]:
-        """Przetwarza wideo z wykorzystaniem cache'a i monitorowaniem pamięci."""
+    def process_video(self, video_path: str, sections: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Przetwarza wideo z wykorzystaniem cache'a i monitorowaniem pamięci.
+        
+        Args:
+            video_path: Ścieżka do pliku wideo
+            sections: Sekcje wyniku do zwrócenia, np. ['metadata', 'scene_changes'];
+                przy trafieniu w cache wczytywane są tylko one
+                
+        Returns:
+            Dict zawierający wyniki przetwarzania
+        """
         logger.info(f"Rozpoczęto przetwarzanie wideo: {video_path}")
         start_time = datetime.now()
         
         try:
             # Sprawdź cache
-            cache_key = self.cache_manager._get_cache_key(video_path)
-            cached_result = self.cache_manager.get(cache_key)
+            cache_key = self.cache_manager.make_key(video_path, self.config, 'video')
+            cached_result = self.cache_manager.get(cache_key, sections)
             if cached_result:
                 logger.info(f"Znaleziono wyniki w cache'u dla: {video_path}")
                 return cached_result
@@ -186,7 +1290,7 @@ class MediaProcessor:
                 self.cache_manager.set(cache_key, result)
                 
                 logger.info(f"Zakończono przetwarzanie wideo: {video_path} (czas: {processing_time:.2f}s)")
-                return result
+                return _select_sections(result, sections)
                 
         except Exception as e:
             logger.error(f"Błąd podczas przetwarzania wideo: {e}", exc_info=True)
@@ -198,16 +1302,83 @@ class MediaProcessor:
                 
     def _cleanup_temp_files(self) -> None:
         """Czyści pliki tymczasowe."""
-        logger.debug("Czyszczenie plików tymczasowych")
-        for file_path in self.temp_files:
-            try:
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-            except Exception as e:
-                logger.warning(f"Błąd podczas usuwania pliku tymczasowego {file_path}: {e}")
-                
+        _remove_temp_files(self.temp_files)
+        
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        """Wspólna pula wątków analizy, tworzona przy pierwszym użyciu."""
+        return self._pool('threads')
+        
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        """Wspólna pula procesów analizy, tworzona przy pierwszym użyciu."""
+        return self._pool('processes')
+        
+    @property
+    def file_pool(self) -> ThreadPoolExecutor:
+        """Pula plików process_many; oddzielna, bo zadania plików czekają na zadania klatek w pulach analizy."""
+        return self._pool('files')
+        
+    def _pool(self, kind: str) -> Executor:
+        with self._resources_lock:
+            pool = self._pools.get(kind)
+            if pool is not None and getattr(pool, '_broken', False):
+                # Proces roboczy zginął (BrokenProcessPool); pula nie przyjmie już zadań
+                logger.warning("Pula procesów uszkodzona, tworzenie nowej")
+                pool.shutdown(wait=False)
+                pool = None
+            if pool is None:
+                if kind == 'processes':
+                    pool = ProcessPoolExecutor(max_workers=self.config.max_workers)
+                elif kind == 'files':
+                    pool = ThreadPoolExecutor(max_workers=self.config.file_workers, thread_name_prefix='media-files')
+                else:
+                    pool = ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix='media-analysis')
+                self._pools[kind] = pool
+            return pool
+            
+    def _checkout_ring(self, slots: int, shape: Tuple[int, ...]) -> FrameRingBuffer:
+        """Bezczynny pierścień o tych wymiarach albo nowy."""
+        with self._resources_lock:
+            ring = self._idle_rings.pop((slots, tuple(shape)), None)
+        return ring if ring is not None else FrameRingBuffer(slots, shape)
+        
+    def _return_ring(self, ring: FrameRingBuffer) -> None:
+        """
+        Odkłada pierścień do ponownego użycia.
+        
+        Procesy robocze pamiętają dołączone pierścienie, więc kolejne wideo
+        o tej samej rozdzielczości nie mapuje pamięci współdzielonej od nowa.
+        """
+        ring.reset()
+        stale = []
+        with self._resources_lock:
+            key = (ring.slots, ring.shape)
+            if key in self._idle_rings:
+                stale.append(ring)
+            else:
+                self._idle_rings[key] = ring
+            while len(self._idle_rings) > IDLE_RING_LIMIT:
+                stale.append(self._idle_rings.popitem(last=False)[1])
+        for ring in stale:
+            ring.close()
+            
+    def close(self) -> None:
+        """
+        Zamyka pule robocze i pierścienie, czyści pliki tymczasowe i zapisuje indeks cache'a.
+        
+        Procesor pozostaje użyteczny: kolejne wywołania utworzą pule od nowa.
+        """
+        with self._resources_lock:
+            _release_resources(self._pools, self._idle_rings, self.temp_files, self.config.cleanup_temp_files)
+        self.cache_manager.close()
+            
+    def __enter__(self) -> "MediaProcessor":
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+        
     @contextmanager
     def processing_context(self, operation_name: str):
         """Kontekst do przetwarzania z monitorowaniem zasobów."""
@@ -221,29 +1392,35 @@ class MediaProcessor:
             processing_time = (datetime.now() - start_time).total_seconds()
             logger.info(f"Zakończono operację: {operation_name} (czas: {processing_time:.2f}s)")
             
-    def __del__(self):
-        """Destruktor klasy."""
-        if self.config.cleanup_temp_files:
-            self._cleanup_temp_files()
-            
     def process_video_parallel(self, video_path: str) -> Dict[str, Any]:
-        """Przetwarza wideo równolegle używając wielu rdzeni CPU/GPU."""
+        """
+        Przetwarza wideo równolegle używając wielu rdzeni CPU.
+        
+        Każda próbkowana klatka jest dekodowana raz, do pamięci, i wszystkie
+        analizy (statystyki, obiekty, nastrój) wykonywane są na niej w jednym
+        zadaniu, bez zapisu klatek na dysk. Detekcja scen korzysta z tego samego
+        przebiegu dekodowania. Klatki niemal identyczne z ostatnią analizowaną
+        (skip_duplicate_frames) dziedziczą jej wyniki i są oznaczane jako
+        duplikaty.
+        """
         try:
             metadata = self.extract_video_metadata(video_path)
+            scene_detector = self.create_scene_detector(metadata['fps']) if self.config.detect_scenes else None
+            duplicate_filter = self.create_duplicate_filter()
+            plan = self.plan_sampling(video_path, decode_all=scene_detector is not None)
             
-            # Ekstrakcja klatek w osobnym procesie
-            with ProcessPoolExecutor(max_workers=self.config.max_workers) as executor:
-                frames_future = executor.submit(self.extract_frames, video_path)
-                scene_changes_future = executor.submit(self.detect_scene_changes, video_path)
-                
-                frames = frames_future.result()
-                scene_changes = scene_changes_future.result()
-            
-            # Analiza klatek równolegle
-            with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-                frame_analyses = list(executor.map(self.analyze_frame, frames))
-                frame_objects = list(executor.map(self.detect_objects, frames))
-                frame_moods = list(executor.map(self.analyze_scene_mood, frames))
+            frame_analyses, frame_objects, frame_moods = [], [], []
+            for result in self.iter_video_results(video_path, plan, scene_detector, duplicate_filter):
+                frame_analyses.append({
+                    'frame_index': result['frame_index'],
+                    'timestamp': result['timestamp'],
+                    'duplicate': result['duplicate'],
+                    'analyzed_frame': result['analyzed_frame'],
+                    **result['analysis']
+                })
+                frame_objects.append(result['objects'])
+                frame_moods.append(result['mood'])
+            scene_changes = scene_detector.changes if scene_detector is not None else []
             
             # Agregacja wyników
             results = {
@@ -255,6 +1432,10 @@ class MediaProcessor:
                 'processing_info': {
                     'gpu_enabled': self.gpu_enabled,
                     'workers_used': self.config.max_workers,
+                    'frames_analyzed': len(frame_analyses),
+                    'sampling': plan,
+                    'shared_memory_frames': self.config.shared_memory_frames,
+                    'duplicate_frames': duplicate_filter.summary() if duplicate_filter is not None else None,
                     'processing_time': None  # będzie uzupełnione później
                 }
             }
@@ -264,6 +1445,429 @@ class MediaProcessor:
         except Exception as e:
             logger.error(f"Błąd podczas przetwarzania wideo: {e}")
             raise
+            
+    def iter_video_results(self, video_path: str, plan: Optional[Dict[str, Any]] = None,
+                           scene_detector: Optional[SceneChangeDetector] = None,
+                           duplicate_filter: Optional[DuplicateFrameFilter] = None) -> Generator[Dict[str, Any], None, None]:
+        """
+        Strumieniowo zwraca wyniki analizy próbkowanych klatek, w kolejności klatek.
+        
+        Dekoder działa w osobnym wątku i przekazuje zadania do puli przez
+        ograniczoną kolejkę (frame_buffer_slots), więc zużycie pamięci jest stałe
+        niezależnie od długości wideo, a pierwsze wyniki są dostępne od razu.
+        Przy shared_memory_frames klatki trafiają do procesów roboczych przez
+        pierścień w pamięci współdzielonej. Pule i pierścienie należą do
+        procesora i są używane ponownie przez kolejne wywołania. Przerwanie
+        iteracji zatrzymuje dekoder i czeka na zadania już rozpoczęte.
+        
+        Args:
+            video_path: Ścieżka do pliku wideo
+            plan: Wynik plan_sampling (domyślnie wyznaczany dla pliku)
+            scene_detector: Detektor zasilany tym samym dekodowaniem; jego lista
+                changes jest kompletna po wyczerpaniu generatora
+            duplicate_filter: Filtr duplikatów (domyślnie create_duplicate_filter());
+                klatki uznane za duplikaty nie są analizowane
+            
+        Yields:
+            Dict z kluczami 'frame_index', 'timestamp', 'analysis', 'objects',
+            'mood', 'duplicate' i 'analyzed_frame' (klatka, z której pochodzą wyniki)
+        """
+        if duplicate_filter is None:
+            duplicate_filter = self.create_duplicate_filter()
+        window = self.config.frame_buffer_slots or 2 * self.config.max_workers
+        shared = self.config.shared_memory_frames
+        ring: Optional[FrameRingBuffer] = None
+        if shared:
+            metadata = self.extract_video_metadata(video_path)
+            if metadata['width'] and metadata['height']:
+                # Zadania w kolejce, jedno u konsumenta i jedno czekające w dekoderze
+                ring = self._checkout_ring(window + 2, (metadata['height'], metadata['width'], 3))
+                
+        executor = self.process_pool if shared else self.thread_pool
+        tasks: "queue.Queue[Any]" = queue.Queue(maxsize=window)
+        stop = threading.Event()
+        inflight: Set[Future] = set()
+        decoder = threading.Thread(
+            target=self._decode_stage,
+            args=(video_path, plan, scene_detector, duplicate_filter, executor, ring, tasks, stop, inflight),
+            name="frame-decoder",
+            daemon=True
+        )
+        decoder.start()
+        try:
+            while True:
+                task = tasks.get()
+                if task is _END_OF_STREAM:
+                    break
+                if isinstance(task, BaseException):
+                    raise task
+                frame_index, timestamp, future, slot, analyzed_frame = task
+                try:
+                    result, seconds = future.result()
+                finally:
+                    if slot is not None:
+                        ring.release(slot)
+                duplicate = analyzed_frame != frame_index
+                if duplicate_filter is not None and not duplicate:
+                    duplicate_filter.record_analysis(seconds)
+                yield {'frame_index': frame_index, 'timestamp': timestamp, **result,
+                       'duplicate': duplicate, 'analyzed_frame': analyzed_frame}
+        finally:
+            stop.set()
+            # Odblokuj dekoder czekający na miejsce w kolejce
+            while decoder.is_alive():
+                try:
+                    task = tasks.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if isinstance(task, tuple):
+                    task[2].cancel()
+            # Pula jest współdzielona: czekamy tylko na zadania tego wideo, zanim pierścień wróci do użycia
+            for future in list(inflight):
+                future.cancel()
+            wait(list(inflight))
+            if ring is not None:
+                self._return_ring(ring)
+                
+    def _decode_stage(self, video_path: str, plan: Optional[Dict[str, Any]],
+                      scene_detector: Optional[SceneChangeDetector], duplicate_filter: Optional[DuplicateFrameFilter],
+                      executor: Executor, ring: Optional[FrameRingBuffer],
+                      tasks: "queue.Queue[Any]", stop: threading.Event, inflight: Set[Future]) -> None:
+        """
+        Wątek dekodera dla iter_video_results: dekoduje klatki i zleca ich analizę.
+        
+        Duplikat nie trafia do puli ani do pierścienia; jego zadanie wskazuje
+        wynik ostatniej analizowanej klatki.
+        """
+        def put(item: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    tasks.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+            
+        frames = self.iter_sampled_frames(video_path, plan, scene_detector)
+        reference: Optional[Tuple[int, Future]] = None  # Ostatnia analizowana klatka i jej zadanie
+        try:
+            for frame_index, timestamp, frame in frames:
+                duplicate = duplicate_filter is not None and duplicate_filter.is_duplicate(frame)
+                if duplicate and reference is not None:
+                    if not put((frame_index, timestamp, reference[1], None, reference[0])):
+                        return
+                    continue
+                slot = None
+                if ring is not None and frame.shape == ring.shape:
+                    while slot is None and not stop.is_set():
+                        try:
+                            slot = ring.acquire(timeout=0.1)
+                        except queue.Empty:
+                            continue
+                    if slot is None:
+                        return
+                    np.copyto(ring.frames[slot], frame)
+                    future = executor.submit(_run_timed, _analyze_ring_slot, ring.name, slot, ring.slots, ring.shape, self.config)
+                else:
+                    future = executor.submit(_run_timed, analyze_frame_pixels, frame, self.config)
+                inflight.add(future)
+                future.add_done_callback(inflight.discard)
+                reference = (frame_index, future)
+                if not put((frame_index, timestamp, future, slot, frame_index)):
+                    future.cancel()
+                    return
+            put(_END_OF_STREAM)
+        except Exception as e:
+            logger.error(f"Błąd podczas dekodowania wideo {video_path}: {e}")
+            put(e)
+        finally:
+            frames.close()
+            
+    def plan_sampling(self, video_path: str, decode_all: bool = False) -> Dict[str, Any]:
+        """
+        Wybiera sposób próbkowania klatek.
+        
+        Przy sampling_strategy='auto' wybierane jest 'seek' (przeskok do
+        klatki kluczowej i dekodowanie tylko do próbki), gdy odstęp próbkowania
+        jest większy niż koszt przeskoku wynikający z GOP (zob. seek_cost;
+        kodeki wewnątrzklatkowe jak MJPEG, ProRes i DNxHD mają GOP równy 1),
+        a w pozostałych przypadkach 'grab' (pominięte klatki są dekodowane, ale
+        nie konwertowane ani kopiowane).
+        'ffmpeg' (filtr framestep przez potok) i 'read' (dekodowanie każdej
+        klatki, dawny tryb) wybiera się jawnie. Gdy metadane nie podają
+        rozdzielczości, 'ffmpeg' jest zastępowane przez 'read' albo 'grab'.
+        
+        Args:
+            video_path: Ścieżka do pliku wideo
+            decode_all: Czy potrzebne są wszystkie klatki (detekcja scen); wtedy
+                strategią jest 'read' albo 'ffmpeg', zależnie od decode_backend
+            
+        Returns:
+            Dict z kluczami 'strategy', 'frame_step' i 'keyframe_interval'
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Nie można otworzyć wideo: {video_path}")
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+            size_known = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) > 0 and int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) > 0
+        finally:
+            cap.release()
+            
+        frame_step = max(1, int(round(fps * self.config.frame_interval)))
+        codec = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+        strategy = self.config.sampling_strategy
+        if decode_all:
+            strategy = 'ffmpeg' if self.config.decode_backend == 'ffmpeg' else 'read'
+        keyframe_interval = None
+        if strategy in ('auto', 'seek'):
+            keyframe_interval = 1.0 if codec in INTRA_ONLY_CODECS else probe_keyframe_interval(video_path)
+        if strategy == 'auto':
+            seekable = frame_count > 0 and keyframe_interval is not None
+            strategy = 'seek' if seekable and frame_step > seek_cost(keyframe_interval) else 'grab'
+        if strategy == 'seek' and frame_count <= 0:
+            # Bez liczby klatek nie da się wyznaczyć celów przeskoków
+            strategy = 'grab'
+        if strategy == 'ffmpeg' and not size_known:
+            # Potok ffmpeg dzieli strumień na klatki według rozdzielczości z metadanych
+            logger.warning(f"Brak rozdzielczości w metadanych {video_path}; dekodowanie przez OpenCV zamiast potoku ffmpeg")
+            strategy = 'read' if decode_all else 'grab'
+            
+        plan = {'strategy': strategy, 'frame_step': frame_step, 'keyframe_interval': keyframe_interval, 'codec': codec}
+        logger.debug(f"Próbkowanie {video_path}: {plan}")
+        return plan
+        
+    def iter_sampled_frames(self, video_path: str, plan: Optional[Dict[str, Any]] = None,
+                            scene_detector: Optional[SceneChangeDetector] = None) -> Generator[Tuple[int, float, np.ndarray], None, None]:
+        """
+        Dekoduje klatki co frame_interval sekund.
+        
+        Args:
+            video_path: Ścieżka do pliku wideo
+            plan: Wynik plan_sampling (domyślnie wyznaczany dla pliku)
+            scene_detector: Detektor, do którego trafiają wszystkie zdekodowane
+                klatki; wymaga planu z decode_all=True
+            
+        Yields:
+            Krotki (numer klatki, czas w sekundach, klatka BGR)
+        """
+        plan = plan or self.plan_sampling(video_path, decode_all=scene_detector is not None)
+        if scene_detector is not None and plan['strategy'] not in ('read', 'ffmpeg'):
+            raise ValueError("Detekcja scen wymaga planu dekodującego wszystkie klatki (plan_sampling(decode_all=True))")
+            
+        if plan['strategy'] == 'ffmpeg':
+            frame_step = plan['frame_step']
+            frames = self._iter_frames_ffmpeg(video_path, 1 if scene_detector is not None else frame_step)
+            try:
+                for frame_index, timestamp, frame in frames:
+                    if scene_detector is not None:
+                        scene_detector.add(frame_index, frame)
+                    if frame_index % frame_step == 0:
+                        yield frame_index, timestamp, frame
+            finally:
+                frames.close()
+            if scene_detector is not None:
+                scene_detector.flush()
+            return
+            
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Nie można otworzyć wideo: {video_path}")
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            frame_step = plan['frame_step']
+            
+            if plan['strategy'] == 'seek':
+                max_grab = seek_cost(plan['keyframe_interval'] or frame_step)
+                position = 0  # Numer następnej klatki w dekoderze
+                for target in range(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), frame_step):
+                    if target - position > max_grab:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    else:
+                        # Cel bliżej niż koszt przeskoku: taniej dojść do niego kolejnymi klatkami
+                        for _ in range(target - position):
+                            cap.grab()
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    position = target + 1
+                    yield target, target / fps, frame
+                return
+                
+            convert_all = plan['strategy'] == 'read'
+            frame_count = 0
+            while cap.grab():
+                sampled = frame_count % frame_step == 0
+                if sampled or convert_all:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        if scene_detector is not None:
+                            scene_detector.add(frame_count, frame)
+                        if sampled:
+                            yield frame_count, frame_count / fps, frame
+                frame_count += 1
+            if scene_detector is not None:
+                scene_detector.flush()
+        finally:
+            cap.release()
+            
+    def _iter_frames_ffmpeg(self, video_path: str, frame_step: int) -> Generator[Tuple[int, float, np.ndarray], None, None]:
+        """Próbkowanie filtrem framestep w procesie ffmpeg; klatki BGR przychodzą potokiem."""
+        metadata = self.extract_video_metadata(video_path)
+        width, height = metadata['width'], metadata['height']
+        if width <= 0 or height <= 0:
+            # Przy zerowym rozmiarze klatki odczyt z potoku nigdy by się nie skończył
+            raise ValueError(f"Nieznana rozdzielczość wideo {video_path}; potok ffmpeg jej wymaga")
+        fps = metadata['fps'] or 25.0
+        process = (
+            ffmpeg
+            .input(video_path)
+            .filter('framestep', step=frame_step)
+            .output('pipe:', format='rawvideo', pix_fmt='bgr24', vsync='passthrough')
+            .global_args('-loglevel', 'error', '-nostdin')
+            .run_async(cmd=self.config.ffmpeg_binary, pipe_stdout=True)
+        )
+        frame_size = width * height * 3
+        try:
+            sequence = 0
+            while True:
+                buffer = bytearray(frame_size)
+                if process.stdout.readinto(buffer) < frame_size:
+                    break
+                frame_index = sequence * frame_step
+                yield frame_index, frame_index / fps, np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 3)
+                sequence += 1
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            
+    def extract_video_metadata(self, video_path: str) -> Dict[str, Any]:
+        """
+        Odczytuje podstawowe metadane wideo.
+        
+        Args:
+            video_path: Ścieżka do pliku wideo
+            
+        Returns:
+            Dict z fps, liczbą klatek, rozdzielczością, czasem trwania i kodekiem
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Nie można otworzyć wideo: {video_path}")
+        try:
+            fps = float(cap.get(cv2.CAP_PROP_FPS))
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+            return {
+                'fps': fps,
+                'frame_count': frame_count,
+                'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                'duration': frame_count / fps if fps > 0 else 0.0,
+                'codec': "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00'),
+                'file_size': os.path.getsize(video_path)
+            }
+        finally:
+            cap.release()
+            
+    def extract_frames(self, video_path: str) -> List[str]:
+        """
+        Zapisuje próbkowane klatki jako pliki JPEG.
+        
+        Args:
+            video_path: Ścieżka do pliku wideo
+            
+        Returns:
+            Lista ścieżek do zapisanych klatek
+        """
+        frames_dir = os.path.join(self.output_dir, "frames")
+        os.makedirs(frames_dir, exist_ok=True)
+        self.temp_files.append(frames_dir)
+        
+        frames = []
+        for frame_index, _, frame in self.iter_sampled_frames(video_path):
+            frame_path = os.path.join(frames_dir, f"frame_{frame_index}.jpg")
+            cv2.imwrite(frame_path, frame)
+            frames.append(frame_path)
+        return frames
+        
+    def create_scene_detector(self, fps: float) -> SceneChangeDetector:
+        """Detektor cięć skonfigurowany według ProcessingConfig."""
+        return SceneChangeDetector(
+            self.config.scene_threshold,
+            fps,
+            size=self.config.scene_detection_size,
+            histogram_threshold=self.config.scene_histogram_threshold
+        )
+        
+    def create_duplicate_filter(self) -> Optional[DuplicateFrameFilter]:
+        """Filtr duplikatów klatek według ProcessingConfig; None, gdy pomijanie jest wyłączone."""
+        if not self.config.skip_duplicate_frames:
+            return None
+        return DuplicateFrameFilter(self.config.duplicate_hash_threshold)
+        
+    def detect_scene_changes(self, video_path: str) -> List[Dict[str, Any]]:
+        """
+        Wykrywa cięcia w wideo (samodzielnie; process_video_parallel robi to w tym samym dekodowaniu co próbkowanie).
+        
+        Args:
+            video_path: Ścieżka do pliku wideo
+            
+        Returns:
+            Lista zmian scen ({'frame', 'timestamp', 'score', 'histogram_distance'})
+        """
+        scene_detector = self.create_scene_detector(self.extract_video_metadata(video_path)['fps'])
+        for _ in self.iter_sampled_frames(video_path, scene_detector=scene_detector):
+            pass
+        return scene_detector.changes
+        
+    def analyze_frame(self, frame: Any) -> Dict[str, float]:
+        """Statystyki klatki (ścieżka lub tablica BGR) w rozdzielczości analizy."""
+        img, _ = downscale_for_analysis(_as_image(frame), self.config.analysis_max_side)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(gray, self.config.edge_detection_threshold1, self.config.edge_detection_threshold2)
+        return frame_statistics(gray, edges)
+        
+    def detect_objects(self, frame: Any) -> List[Dict[str, Any]]:
+        """Wykrywa obiekty na klatce (ścieżka lub tablica BGR) na CPU."""
+        img, scale = downscale_for_analysis(_as_image(frame), self.config.analysis_max_side)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(gray, self.config.edge_detection_threshold1, self.config.edge_detection_threshold2)
+        return objects_from_edges(edges, self.config, scale)
+        
+    def analyze_scene_mood(self, frame: Any) -> Dict[str, Any]:
+        """Nastrój klatki (ścieżka lub tablica BGR)."""
+        return source_mood(_as_image(frame), self.config.analysis_max_side)
+        
+    def generate_tags(self, image: Any, mood: Optional[Dict[str, Any]] = None,
+                      objects: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+        """
+        Generuje tagi obrazu na podstawie nastroju i wykrytych obiektów.
+        
+        Args:
+            image: Ścieżka lub tablica BGR
+            mood: Wynik analyze_scene_mood, jeśli już policzony
+            objects: Wynik detect_objects, jeśli już policzony
+            
+        Returns:
+            Posortowana lista tagów
+        """
+        mood = mood if mood is not None else self.analyze_scene_mood(image)
+        objects = objects if objects is not None else self.detect_objects(image)
+        tags = {mood['mood']}
+        tags.update(obj['type'] for obj in objects)
+        if not objects:
+            tags.add('empty')
+        elif len(objects) > 10:
+            tags.add('busy')
+        return sorted(tags)
+        
+    def _classify_object_type(self, aspect_ratio: float, extent: float, area: float) -> str:
+        return classify_object_type(aspect_ratio, extent, area)
 
     def extract_frames_gpu(self, video_path: str) -> List[str]:
         """Ekstrahuje klatki z wideo używając GPU jeśli dostępne."""
@@ -271,48 +1875,35 @@ class MediaProcessor:
             if not self.gpu_enabled:
                 return self.extract_frames(video_path)
                 
-            cap = cv2.VideoCapture(video_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_interval = int(fps * self.config.frame_interval)
-            
             frames_dir = os.path.join(self.output_dir, "frames")
             os.makedirs(frames_dir, exist_ok=True)
             self.temp_files.append(frames_dir)
             
             frames = []
-            frame_count = 0
             
             # Utwórz strumień CUDA
             stream = cv2.cuda_Stream()
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                    
-                if frame_count % frame_interval == 0:
-                    # Przenieś frame na GPU
-                    gpu_frame = cv2.cuda_GpuMat()
-                    gpu_frame.upload(frame)
-                    
-                    # Przetwarzanie na GPU
-                    gpu_frame = cv2.cuda.cvtColor(gpu_frame, cv2.COLOR_BGR2RGB)
-                    
-                    # Pobierz wynik z GPU
-                    processed_frame = gpu_frame.download()
-                    
-                    frame_path = os.path.join(frames_dir, f"frame_{frame_count}.jpg")
-                    cv2.imwrite(frame_path, processed_frame)
-                    frames.append(frame_path)
-                    
-                frame_count += 1
+            for frame_count, _, frame in self.iter_sampled_frames(video_path):
+                # Przenieś frame na GPU
+                gpu_frame = cv2.cuda_GpuMat()
+                gpu_frame.upload(frame)
+                
+                # Przetwarzanie na GPU
+                gpu_frame = cv2.cuda.cvtColor(gpu_frame, cv2.COLOR_BGR2RGB)
+                
+                # Pobierz wynik z GPU
+                processed_frame = gpu_frame.download()
+                
+                frame_path = os.path.join(frames_dir, f"frame_{frame_count}.jpg")
+                cv2.imwrite(frame_path, processed_frame)
+                frames.append(frame_path)
                 
-            cap.release()
             return frames
             
         except Exception as e:
             logger.error(f"Błąd podczas ekstrakcji klatek na GPU: {e}")
-            return self.extract_frames(frame_path)  # Fallback do CPU
+            return self.extract_frames(video_path)  # Fallback do CPU
 
     def detect_objects_gpu(self, frame_path: str) -> List[Dict[str, Any]]:
         """Wykrywa obiekty na klatce używając GPU jeśli dostępne."""
@@ -320,9 +1911,7 @@ class MediaProcessor:
             if not self.gpu_enabled:
                 return self.detect_objects(frame_path)
                 
-            img = cv2.imread(frame_path)
-            if img is None:
-                raise ValueError(f"Nie można odczytać klatki: {frame_path}")
+            img, scale = downscale_for_analysis(_as_image(frame_path), self.config.analysis_max_side)
                 
             # Przenieś obraz na GPU
             gpu_img = cv2.cuda_GpuMat()
@@ -341,56 +1930,40 @@ class MediaProcessor:
             edges = gpu_edges.download()
             
             # Znajdź kontury (na CPU, bo nie ma GPU API)
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            objects = []
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > self.config.min_object_area:
-                    x, y, w, h = cv2.boundingRect(contour)
-                    aspect_ratio = float(w / h) if h > 0 else 0
-                    extent = float(area / (w * h)) if w * h > 0 else 0
-                    
-                    objects.append({
-                        'position': {'x': int(x), 'y': int(y), 'width': int(w), 'height': int(h)},
-                        'area': float(area),
-                        'perimeter': float(cv2.arcLength(contour, True)),
-                        'aspect_ratio': aspect_ratio,
-                        'extent': extent,
-                        'type': self._classify_object_type(aspect_ratio, extent, area)
-                    })
-                    
-            return objects
+            return objects_from_edges(edges, self.config, scale)
             
         except Exception as e:
             logger.error(f"Błąd podczas wykrywania obiektów na GPU: {e}")
             return self.detect_objects(frame_path)  # Fallback do CPU
 
-    def process_frames_batch(self, frames: List[str], batch_size: int = 10) -> List[Dict[str, Any]]:
-        """Przetwarza klatki wsadowo dla lepszej wydajności."""
-        results = []
+    def process_frames_batch(self, frames: Iterable[Any], batch_size: int = 10) -> List[Dict[str, Any]]:
+        """
+        Przetwarza klatki we wspólnej puli wątków.
         
-        for i in range(0, len(frames), batch_size):
-            batch = frames[i:i + batch_size]
+        Args:
+            frames: Ścieżki klatek lub tablice BGR (także generator)
+            batch_size: Liczba klatek analizowanych jednocześnie
             
-            with ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
-                batch_results = list(executor.map(lambda f: {
-                    'frame': f,
-                    'analysis': self.analyze_frame(f),
-                    'objects': self.detect_objects_gpu(f) if self.gpu_enabled else self.detect_objects(f),
-                    'mood': self.analyze_scene_mood(f)
-                }, batch))
-                
-            results.extend(batch_results)
+        Returns:
+            Lista wyników w kolejności klatek
+        """
+        def analyze(frame: Any) -> Dict[str, Any]:
+            return {
+                'frame': frame,
+                'analysis': self.analyze_frame(frame),
+                'objects': self.detect_objects_gpu(frame) if self.gpu_enabled else self.detect_objects(frame),
+                'mood': self.analyze_scene_mood(frame)
+            }
             
-        return results 
+        return list(bounded_map(self.thread_pool, analyze, frames, batch_size))
 
-    def process_media(self, file_path: str) -> Dict[str, Any]:
+    def process_media(self, file_path: str, sections: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Przetwarza plik multimedialny (wideo lub obraz) w zależności od formatu.
         
         Args:
             file_path: Ścieżka do pliku multimedialnego
+            sections: Sekcje wyniku do zwrócenia (domyślnie wszystkie)
             
         Returns:
             Dict zawierający wyniki przetwarzania
@@ -400,15 +1973,11 @@ class MediaProcessor:
         # Sprawdź rozszerzenie pliku
         extension = Path(file_path).suffix.lower()
         
-        # Obsługiwane formaty
-        video_formats = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'}
-        image_formats = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp'}
-        
         try:
-            if extension in video_formats:
-                return self.process_video(file_path)
-            elif extension in image_formats:
-                return self.process_image(file_path)
+            if extension in VIDEO_FORMATS:
+                return self.process_video(file_path, sections)
+            elif extension in IMAGE_FORMATS:
+                return self.process_image(file_path, sections)
             else:
                 raise ValueError(f"Nieobsługiwany format pliku: {extension}")
                 
@@ -416,12 +1985,87 @@ class MediaProcessor:
             logger.error(f"Błąd podczas przetwarzania pliku {file_path}: {e}", exc_info=True)
             raise
             
-    def process_image(self, image_path: str) -> Dict[str, Any]:
+    def process_many(self, sources: Union[str, Iterable[str]], sections: Optional[List[str]] = None,
+                     report: Optional[BatchReport] = None) -> Generator[Dict[str, Any], None, None]:
+        """
+        Przetwarza wiele plików, zwracając wyniki w kolejności ukończenia.
+        
+        Pliki są uruchamiane od największego, żeby długie wideo nie zostawały
+        na koniec jako maruderzy, po file_workers naraz; analiza klatek
+        wszystkich plików trafia do wspólnych pul procesora. Błąd jednego pliku
+        nie przerywa przetwarzania pozostałych. Przerwanie iteracji nie
+        uruchamia kolejnych plików i czeka na te w trakcie.
+        
+        Args:
+            sources: Katalog (przeszukiwany rekurencyjnie), ścieżka pliku lub lista ścieżek
+            sections: Sekcje wyniku do zwrócenia (domyślnie wszystkie)
+            report: Raport zbiorczy uzupełniany po każdym pliku; kompletny po
+                wyczerpaniu generatora (summary())
+            
+        Yields:
+            Dict z kluczami 'path', 'size', 'result' (None przy błędzie),
+            'error' (opis błędu lub None) i 'elapsed' (sekundy)
+        """
+        files = collect_media_files(sources)
+        report = report if report is not None else BatchReport()
+        report.start(len(files), sum(size for _, size in files))
+        logger.info(f"Rozpoczęto przetwarzanie {len(files)} plików ({report.bytes_total / 1024 / 1024:.1f} MB)")
+        
+        pending = deque(sorted(files, key=lambda item: item[1], reverse=True))
+        running: Dict[Future, Tuple[str, int]] = {}
+        executor = self.file_pool
+        
+        def submit_pending() -> None:
+            while pending and len(running) < self.config.file_workers:
+                path, size = pending.popleft()
+                running[executor.submit(self._process_file, path, sections)] = (path, size)
+                
+        try:
+            submit_pending()
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                finished = [(running.pop(future), future.result()) for future in done]
+                # Zwolnione miejsca zajmij, zanim wyniki trafią do konsumenta
+                submit_pending()
+                for (path, size), (result, error, elapsed) in finished:
+                    event = {'path': path, 'size': size, 'result': result, 'error': error, 'elapsed': elapsed}
+                    report.add(event)
+                    yield event
+        finally:
+            wait(list(running))
+            report.finish()
+            summary = report.summary()
+            logger.info(f"Zakończono przetwarzanie plików: {summary['succeeded']} udanych, {summary['failed']} błędów "
+                        f"(czas: {summary['elapsed']:.2f}s, {summary['mb_per_s']:.1f} MB/s)")
+            
+    def _process_file(self, file_path: str, sections: Optional[List[str]]) -> Tuple[Optional[Dict[str, Any]], Optional[str], float]:
+        """Zadanie pliku dla process_many: (wynik, błąd, czas w sekundach)."""
+        started = time.perf_counter()
+        try:
+            return self.process_media(file_path, sections), None, time.perf_counter() - started
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}", time.perf_counter() - started
+            
+    def open_cached(self, file_path: str) -> Optional[CachedResult]:
+        """
+        Otwiera zapisany wynik bez wczytywania sekcji, np. do odczytu pojedynczej kolumny.
+        
+        Args:
+            file_path: Ścieżka do pliku multimedialnego
+            
+        Returns:
+            Leniwy widok wyniku lub None, jeśli plik nie był jeszcze przetworzony
+        """
+        kind = 'video' if Path(file_path).suffix.lower() in VIDEO_FORMATS else 'image'
+        return self.cache_manager.open(self.cache_manager.make_key(file_path, self.config, kind))
+        
+    def process_image(self, image_path: str, sections: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Przetwarza pojedynczy obraz.
         
         Args:
             image_path: Ścieżka do pliku obrazu
+            sections: Sekcje wyniku do zwrócenia (domyślnie wszystkie)
             
         Returns:
             Dict zawierający wyniki przetwarzania
@@ -431,24 +2075,28 @@ class MediaProcessor:
         
         try:
             # Sprawdź cache
-            cache_key = self.cache_manager._get_cache_key(image_path)
-            cached_result = self.cache_manager.get(cache_key)
+            cache_key = self.cache_manager.make_key(image_path, self.config, 'image')
+            cached_result = self.cache_manager.get(cache_key, sections)
             if cached_result:
                 logger.info(f"Znaleziono wyniki w cache'u dla: {image_path}")
                 return cached_result
                 
             with self.memory_manager.monitor_memory("przetwarzanie_obrazu"):
-                # Wczytaj obraz
+                # Wczytaj obraz i jednorazowo zmniejsz go do rozdzielczości analizy
+                source = _as_image(image_path)
+                img, scale = downscale_for_analysis(source, self.config.analysis_max_side)
+                source_size = (int(source.shape[1]), int(source.shape[0]))
+                # Nastrój z pikseli źródła: uśrednione piksele mają zaniżone nasycenie
+                mood = source_mood(source, self.config.analysis_max_side)
+                del source
                 if self.gpu_enabled:
                     gpu_img = cv2.cuda_GpuMat()
-                    img = cv2.imread(image_path)
                     gpu_img.upload(img)
                     
                     # Przetwarzanie na GPU
-                    result = self._process_image_gpu(gpu_img)
+                    result = self._process_image_gpu(gpu_img, scale, source_size, mood)
                 else:
-                    img = cv2.imread(image_path)
-                    result = self._process_image_cpu(img)
+                    result = self._process_image_cpu(img, scale, source_size, mood)
                     
                 # Dodaj informacje o czasie przetwarzania
                 processing_time = (datetime.now() - start_time).total_seconds()
@@ -461,18 +2109,23 @@ class MediaProcessor:
                 self.cache_manager.set(cache_key, result)
                 
                 logger.info(f"Zakończono przetwarzanie obrazu: {image_path} (czas: {processing_time:.2f}s)")
-                return result
+                return _select_sections(result, sections)
                 
         except Exception as e:
             logger.error(f"Błąd podczas przetwarzania obrazu {image_path}: {e}", exc_info=True)
             raise
             
-    def _process_image_gpu(self, gpu_img: cv2.cuda_GpuMat) -> Dict[str, Any]:
+    def _process_image_gpu(self, gpu_img: cv2.cuda_GpuMat, scale: Tuple[float, float] = (1.0, 1.0),
+                           source_size: Optional[Tuple[int, int]] = None,
+                           mood: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Przetwarza obraz na GPU.
         
         Args:
-            gpu_img: Obraz na GPU
+            gpu_img: Obraz na GPU (w rozdzielczości analizy)
+            scale: Skala z rozdzielczości analizy do źródła
+            source_size: Rozdzielczość źródła (szerokość, wysokość)
+            mood: Nastrój policzony ze źródła (zob. source_mood), jeśli już policzony
             
         Returns:
             Dict zawierający wyniki przetwarzania
@@ -492,18 +2145,23 @@ class MediaProcessor:
             edges = gpu_edges.download()
             gray = gpu_gray.download()
             
-            return self._analyze_image(img, gray, edges)
+            return self._analyze_image(img, gray, edges, scale, source_size, mood)
             
         except Exception as e:
             logger.error(f"Błąd podczas przetwarzania obrazu na GPU: {e}")
-            return self._process_image_cpu(gpu_img.download())
+            return self._process_image_cpu(gpu_img.download(), scale, source_size, mood)
             
-    def _process_image_cpu(self, img: np.ndarray) -> Dict[str, Any]:
+    def _process_image_cpu(self, img: np.ndarray, scale: Tuple[float, float] = (1.0, 1.0),
+                           source_size: Optional[Tuple[int, int]] = None,
+                           mood: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Przetwarza obraz na CPU.
         
         Args:
-            img: Obraz w formacie NumPy array
+            img: Obraz w formacie NumPy array (w rozdzielczości analizy)
+            scale: Skala z rozdzielczości analizy do źródła
+            source_size: Rozdzielczość źródła (szerokość, wysokość)
+            mood: Nastrój policzony ze źródła (zob. source_mood), jeśli już policzony
             
         Returns:
             Dict zawierający wyniki przetwarzania
@@ -518,28 +2176,37 @@ class MediaProcessor:
             self.config.edge_detection_threshold2
         )
         
-        return self._analyze_image(img, gray, edges)
+        return self._analyze_image(img, gray, edges, scale, source_size, mood)
         
-    def _analyze_image(self, img: np.ndarray, gray: np.ndarray, edges: np.ndarray) -> Dict[str, Any]:
+    def _analyze_image(self, img: np.ndarray, gray: np.ndarray, edges: np.ndarray,
+                       scale: Tuple[float, float] = (1.0, 1.0), source_size: Optional[Tuple[int, int]] = None,
+                       mood: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Analizuje obraz i zwraca wyniki.
         
+        Wszystkie analizy korzystają z tego samego obrazu, skali szarości
+        i krawędzi w rozdzielczości analizy (poza nastrojem, jeśli został podany);
+        pozycje obiektów i 'resolution' są podawane w pikselach źródła.
+        
         Args:
-            img: Oryginalny obraz
+            img: Obraz w rozdzielczości analizy
             gray: Obraz w skali szarości
             edges: Wykryte krawędzie
+            scale: Skala z rozdzielczości analizy do źródła
+            source_size: Rozdzielczość źródła (szerokość, wysokość); domyślnie img
+            mood: Nastrój policzony ze źródła; domyślnie liczony z img
             
         Returns:
             Dict zawierający wyniki analizy
         """
         # Wykryj obiekty
-        objects = self.detect_objects_gpu(img) if self.gpu_enabled else self.detect_objects(img)
+        objects = objects_from_edges(edges, self.config, scale)
         
         # Analizuj nastrój
-        mood = self.analyze_scene_mood(img)
+        mood = mood if mood is not None else scene_mood(img, cv2.cvtColor(img, cv2.COLOR_BGR2HSV))
         
         # Generuj tagi
-        tags = self.generate_tags(img)
+        tags = self.generate_tags(img, mood, objects)
         
         # Oblicz statystyki
         stats = {
@@ -547,6 +2214,10 @@ class MediaProcessor:
             'contrast': float(np.std(gray)),
             'edges_density': float(np.mean(edges) / 255.0),
             'resolution': {
+                'width': source_size[0] if source_size else int(img.shape[1]),
+                'height': source_size[1] if source_size else int(img.shape[0])
+            },
+            'analysis_resolution': {
                 'width': int(img.shape[1]),
                 'height': int(img.shape[0])
             }
@@ -0,0 +1,66 @@
+import unittest
+import sys
+import os
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+import admission
+from admission import MB, MemoryGovernor, estimate_job_cost
+
+class TestMemoryGovernor(unittest.TestCase):
+    def setUp(self):
+        self.rss = 100 * MB
+        self.saved_rss = admission.current_rss
+        admission.current_rss = lambda: self.rss
+        self.governor = MemoryGovernor(1000 * MB, max_concurrency=4, high_watermark=0.9, default_cost=200 * MB)
+
+    def tearDown(self):
+        admission.current_rss = self.saved_rss
+
+    def test_slots_follow_headroom_and_concurrency(self):
+        # (1000 - 100) MB wolnego miejsca / 200 MB na zadanie, ale z pustym workerem zawsze 1
+        self.assertEqual(self.governor.available_slots(), 1)
+        self.governor.claim('a')
+        self.assertEqual(self.governor.available_slots(), 3)  # (1000 - 100 - 200) // 200
+        self.governor.claim('b')
+        self.governor.claim('c')
+        self.assertEqual(self.governor.available_slots(), 1)  # limit współbieżności
+        self.governor.claim('d')
+        self.assertEqual(self.governor.available_slots(), 0)
+
+    def test_estimates_replace_reservations(self):
+        self.governor.claim('a')
+        scenes = [['ANNA', 'BOB', 'CELINA']] * 10
+        self.assertEqual(self.governor.estimate('a', scenes), estimate_job_cost(scenes))
+        self.assertEqual(self.governor._reserved['a'], estimate_job_cost(scenes))
+        self.assertEqual(self.governor.available_slots(), 3)
+        self.governor.release('a')
+        self.assertEqual(self.governor.in_flight(), 0)
+        # Średni koszt zadania przesuwa się w stronę zwolnionej rezerwacji
+        self.assertLess(self.governor.typical_cost, 200 * MB)
+
+    def test_high_watermark_stops_claims(self):
+        self.governor.claim('a')
+        self.rss = 900 * MB
+        self.assertEqual(self.governor.available_slots(), 0)
+        self.governor.release('a')
+        # Bez zadań w toku jedno jest zawsze dopuszczane
+        self.assertEqual(self.governor.available_slots(), 1)
+
+    def test_calibration_from_a_job_running_alone(self):
+        self.governor.claim('a')
+        estimate = self.governor.estimate('a', [['ANNA', 'BOB']])
+        self.rss += 4 * estimate
+        self.governor.sample('a')
+        self.assertAlmostEqual(self.governor.scale, 0.8 + 0.2 * 4)
+
+        # Przy kilku zadaniach naraz pomiar RSS nie jest przypisywany jednemu z nich
+        self.governor.claim('b')
+        self.governor.estimate('b', [['ANNA']])
+        self.rss += 100 * MB
+        self.governor.sample('a')
+        self.assertAlmostEqual(self.governor.scale, 0.8 + 0.2 * 4)
+
+if __name__ == '__main__':
+    unittest.main()
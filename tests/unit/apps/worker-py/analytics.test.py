@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import random
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+import networkx as nx
+import numpy as np
+
+from analytics import EdgeArrays, pagerank, approximate_betweenness, detect_communities, analyze_graph
+
+def weighted_karate(seed=7):
+    graph = nx.karate_club_graph()
+    rng = random.Random(seed)
+    for a, b in graph.edges:
+        graph[a][b]['weight'] = rng.randint(1, 9)
+    return graph
+
+def as_array(edges, scores):
+    return np.array([scores[node] for node in edges.nodes])
+
+class TestPageRank(unittest.TestCase):
+    def test_matches_networkx(self):
+        for graph in (weighted_karate(), nx.les_miserables_graph()):
+            edges = EdgeArrays(graph)
+            result = pagerank(edges)
+            expected = as_array(edges, nx.pagerank(graph, weight='weight', tol=1e-12))
+            self.assertTrue(result['converged'])
+            self.assertLess(np.abs(result['scores'] - expected).max(), 1e-6)
+
+    def test_isolated_nodes_and_empty_graph(self):
+        graph = weighted_karate()
+        graph.add_nodes_from(['samotny', 'drugi'])
+        edges = EdgeArrays(graph)
+        expected = as_array(edges, nx.pagerank(graph, weight='weight', tol=1e-12))
+        self.assertLess(np.abs(pagerank(edges)['scores'] - expected).max(), 1e-6)
+        self.assertEqual(pagerank(EdgeArrays(nx.Graph()))['iterations'], 0)
+
+    def test_iteration_limit(self):
+        result = pagerank(EdgeArrays(weighted_karate()), max_iter=3)
+        self.assertEqual((result['iterations'], result['converged']), (3, False))
+        self.assertAlmostEqual(result['scores'].sum(), 1.0)
+
+class TestBetweenness(unittest.TestCase):
+    def exact(self, graph):
+        for a, b, w in graph.edges(data='weight', default=1):
+            graph[a][b]['distance'] = 1.0 / w
+        return nx.betweenness_centrality(graph, weight='distance')
+
+    def test_all_sources_match_networkx(self):
+        for graph in (nx.karate_club_graph(), weighted_karate(), nx.les_miserables_graph()):
+            edges = EdgeArrays(graph)
+            result = approximate_betweenness(edges, samples=edges.n)
+            self.assertTrue(result['exact'])
+            self.assertLess(np.abs(result['scores'] - as_array(edges, self.exact(graph))).max(), 1e-9)
+
+    def test_sample_estimates_the_exact_scores(self):
+        graph = nx.les_miserables_graph()
+        edges = EdgeArrays(graph)
+        result = approximate_betweenness(edges, samples=edges.n // 2)
+        expected = as_array(edges, self.exact(graph))
+        self.assertEqual((result['samples'], result['exact']), (edges.n // 2, False))
+        # Próbkowanie źródeł: wynik przeskalowany do pełnej liczby węzłów, ranking zachowany
+        self.assertEqual(int(np.argmax(result['scores'])), int(np.argmax(expected)))
+        self.assertGreater(np.corrcoef(result['scores'], expected)[0, 1], 0.9)
+        self.assertAlmostEqual(result['scores'].sum() / expected.sum(), 1.0, delta=0.3)
+
+class TestCommunities(unittest.TestCase):
+    def test_louvain_matches_networkx(self):
+        graph = weighted_karate()
+        result = detect_communities(graph, max_louvain_edges=1000, seed=3)
+        expected = nx.community.louvain_communities(graph, weight='weight', seed=3)
+        self.assertEqual(result['method'], 'louvain')
+        self.assertEqual(sorted(map(sorted, expected)), sorted(result['communities']))
+        self.assertGreater(nx.community.modularity(graph, result['communities'], weight='weight'), 0.3)
+
+    def test_level_and_time_budget_keep_a_partition(self):
+        graph = nx.les_miserables_graph()
+        for kwargs in ({'max_levels': 1}, {'time_budget': 1e-9}):
+            result = detect_communities(graph, max_louvain_edges=1000, **kwargs)
+            self.assertEqual(result['levels'], 1)
+            self.assertEqual(sorted(node for c in result['communities'] for node in c), sorted(graph.nodes))
+            self.assertGreater(nx.community.modularity(graph, result['communities'], weight='weight'), 0.3)
+
+    def test_large_graphs_use_label_propagation(self):
+        result = detect_communities(weighted_karate(), max_louvain_edges=10)
+        self.assertEqual((result['method'], result['levels']), ('label_propagation', 0))
+        self.assertEqual(detect_communities(nx.Graph(), 10), {"communities": [], "method": None, "levels": 0})
+
+class TestAnalyzeGraph(unittest.TestCase):
+    def test_attributes_and_summary(self):
+        graph = weighted_karate()
+        summary = analyze_graph(graph, time_budget=10, betweenness_samples=256, max_louvain_edges=1000)
+        self.assertEqual(graph.nodes[0]['weighted_degree'], float(graph.degree(0, weight='weight')))
+        self.assertEqual(summary['pagerank']['top'][0]['id'], str(max(graph.nodes, key=lambda n: graph.nodes[n]['pagerank'])))
+        self.assertTrue(summary['betweenness']['exact'])
+        self.assertEqual(summary['communities']['count'], len({graph.nodes[n]['community'] for n in graph.nodes}))
+
+if __name__ == '__main__':
+    unittest.main()
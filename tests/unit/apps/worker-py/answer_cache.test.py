@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import time
+
+# Dodaj ścieżkę do katalogu apps/worker-py, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py')))
+
+from answer_cache import AnswerCache, normalize_query
+
+class TestAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = AnswerCache(max_entries=3, ttl=60, similarity_threshold=0.9)
+
+    def test_exact_match_ignores_case_punctuation_and_spaces(self):
+        self.cache.put('Kto zabił Marka?', 'Anna')
+        self.assertEqual(normalize_query('  KTO   zabił marka ?? '), 'kto zabił marka')
+        self.assertEqual(self.cache.get_exact('kto zabił   Marka'), 'Anna')
+        self.assertIsNone(self.cache.get_exact('kto zabił Anne'))
+
+    def test_semantic_match_respects_threshold(self):
+        self.cache.put('kto zabił marka', 'Anna', [1.0, 0.0, 0.0])
+        answer, score = self.cache.get_similar([0.95, 0.1, 0.0])
+        self.assertEqual(answer, 'Anna')
+        self.assertGreater(score, 0.9)
+        # Zbyt odległe pytanie to chybienie
+        self.assertIsNone(self.cache.get_similar([0.5, 0.8, 0.0]))
+
+    def test_lru_and_ttl_eviction(self):
+        for i in range(3):
+            self.cache.put(f'pytanie {i}', i, [1.0, float(i), 0.0])
+        self.cache.get_exact('pytanie 0')  # Odświeża wpis 0, najstarszy jest teraz wpis 1
+        self.cache.put('pytanie 3', 3)
+        self.assertIsNone(self.cache.get_exact('pytanie 1'))
+        self.assertEqual(self.cache.get_exact('pytanie 0'), 0)
+
+        self.cache.ttl = 0
+        self.cache.put('nowe', 'x', [0.0, 0.0, 1.0])
+        time.sleep(0.01)
+        self.assertIsNone(self.cache.get_exact('nowe'))
+        self.assertIsNone(self.cache.get_similar([0.0, 0.0, 1.0]))
+
+    def test_invalidation_on_index_version_change(self):
+        version = {'value': 1}
+        cache = AnswerCache(index_version=lambda: version['value'], version_check_interval=0)
+        cache.put('pytanie', 'odpowiedź')
+        self.assertEqual(cache.get_exact('pytanie'), 'odpowiedź')
+        version['value'] = 2
+        self.assertIsNone(cache.get_exact('pytanie'))
+        self.assertEqual(cache.snapshot()['invalidations'], 1)
+
+    def test_update_in_place_invalidates_through_the_marker(self):
+        # Wersja jak w api.py: (znacznik indeksera, liczba scen)
+        index = {'marker': '7', 'count': 10, 'down': False}
+
+        def version():
+            if index['down']:
+                raise ConnectionError('redis niedostępny')
+            return index['marker'], index['count']
+
+        cache = AnswerCache(index_version=version, version_check_interval=0)
+        cache.get_exact('start')
+        cache.put('pytanie', 'stara odpowiedź')
+        # Niedostępny znacznik: wpisy zostają do następnego sprawdzenia
+        index['down'] = True
+        self.assertEqual(cache.get_exact('pytanie'), 'stara odpowiedź')
+        # Scena zastąpiona w miejscu: liczba obiektów bez zmian, znacznik inny
+        index.update(down=False, marker='8')
+        self.assertIsNone(cache.get_exact('pytanie'))
+
+    def test_hit_rate(self):
+        self.cache.put('a', 1, [1.0, 0.0])
+        self.cache.get_exact('a')
+        self.cache.get_similar([1.0, 0.01])
+        self.cache.get_similar([0.0, 1.0])
+        stats = self.cache.snapshot()
+        self.assertEqual((stats['exact_hits'], stats['semantic_hits'], stats['misses']), (1, 1, 1))
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import sys
+import os
+import time
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+from minio.error import S3Error
+
+from artifact_cache import ArtifactIndex, scene_fingerprint
+
+class FakeCursor(list):
+    def sort(self, key, direction):
+        return FakeCursor(sorted(self, key=lambda doc: doc[key], reverse=direction < 0))
+
+    def limit(self, count):
+        return FakeCursor(self[:count])
+
+class FakeIndexCollection:
+    """Kolekcja indeksu artefaktów w pamięci (tylko zapytania używane przez ArtifactIndex)."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find_one(self, query):
+        doc = self.docs.get(query['fingerprint'])
+        return dict(doc) if doc else None
+
+    def find(self, query):
+        if 'createdAt' in query:
+            before = query['createdAt']['$lt']
+            return FakeCursor(dict(d) for d in self.docs.values() if d['createdAt'] < before)
+        return FakeCursor(dict(d) for d in self.docs.values())
+
+    def count_documents(self, query):
+        return len(self.docs)
+
+    def update_one(self, query, update, upsert=False):
+        fingerprint = query['fingerprint']
+        if fingerprint not in self.docs:
+            if not upsert:
+                return
+            self.docs[fingerprint] = {'fingerprint': fingerprint}
+        doc = self.docs[fingerprint]
+        doc.update(update.get('$set', {}))
+        for key, amount in update.get('$inc', {}).items():
+            doc[key] = doc.get(key, 0) + amount
+
+    def delete_one(self, query):
+        self.docs.pop(query['fingerprint'], None)
+
+class FakeMinio:
+    def __init__(self):
+        self.objects = {}
+
+    def copy_object(self, bucket, key, source):
+        if source.object_name not in self.objects:
+            raise S3Error(response=None, code='NoSuchKey', message='', resource=None, request_id=None, host_id=None)
+        self.objects[key] = self.objects[source.object_name]
+
+    def remove_object(self, bucket, key):
+        self.objects.pop(key, None)
+
+class TestSceneFingerprint(unittest.TestCase):
+    SETTINGS = {"formats": ['gexf'], "analytics": [True, 10.0, 256, 200000]}
+
+    def test_order_of_scenes_and_characters_is_ignored(self):
+        self.assertEqual(
+            scene_fingerprint([['ANNA', 'BOB'], ['CELINA']], self.SETTINGS),
+            scene_fingerprint([['CELINA'], ['BOB', 'ANNA']], self.SETTINGS))
+
+    def test_content_and_settings_change_the_fingerprint(self):
+        base = scene_fingerprint([['ANNA', 'BOB']], self.SETTINGS)
+        self.assertNotEqual(base, scene_fingerprint([['ANNA', 'BOB'], ['ANNA', 'BOB']], self.SETTINGS))
+        self.assertNotEqual(base, scene_fingerprint([['ANNA', 'BOB']], {**self.SETTINGS, "formats": ['npz']}))
+        # Zmiana ustawień analityki (np. liczby próbek) unieważnia zapamiętany wynik
+        self.assertNotEqual(base, scene_fingerprint([['ANNA', 'BOB']], {**self.SETTINGS, "analytics": [True, 10.0, 64, 200000]}))
+
+class TestArtifactIndex(unittest.TestCase):
+    def setUp(self):
+        self.collection = FakeIndexCollection()
+        self.minio = FakeMinio()
+        self.index = ArtifactIndex(self.collection, self.minio, 'bucket', max_entries=2, ttl=100)
+
+    def store(self, fingerprint, job_id):
+        source_key = f'results/{job_id}/analysis_results.zip'
+        self.minio.objects[source_key] = f'zip {fingerprint}'
+        self.index.store(fingerprint, source_key, 10)
+
+    def test_miss_store_and_hit(self):
+        self.assertFalse(self.index.reuse('abc', 'results/j2/analysis_results.zip'))
+        self.store('abc', 'j1')
+        self.assertEqual(self.minio.objects['artifacts/abc.zip'], 'zip abc')
+        self.assertTrue(self.index.reuse('abc', 'results/j2/analysis_results.zip'))
+        self.assertEqual(self.minio.objects['results/j2/analysis_results.zip'], 'zip abc')
+        self.assertEqual(self.collection.docs['abc']['hits'], 1)
+
+    def test_expired_entry_is_a_miss_and_removed(self):
+        self.store('abc', 'j1')
+        self.collection.docs['abc']['createdAt'] -= 200
+        self.assertFalse(self.index.reuse('abc', 'results/j2/analysis_results.zip'))
+        self.assertNotIn('abc', self.collection.docs)
+        self.assertNotIn('artifacts/abc.zip', self.minio.objects)
+
+    def test_missing_object_drops_the_entry(self):
+        self.store('abc', 'j1')
+        del self.minio.objects['artifacts/abc.zip']
+        self.assertFalse(self.index.reuse('abc', 'results/j2/analysis_results.zip'))
+        self.assertEqual(self.collection.docs, {})
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.store('a', 'j1')
+        self.store('b', 'j2')
+        self.collection.docs['a']['lastUsedAt'] -= 10
+        self.collection.docs['b']['lastUsedAt'] -= 20
+        self.index.reuse('a', 'results/j3/analysis_results.zip')
+        self.store('c', 'j4')
+        self.assertEqual(sorted(self.collection.docs), ['a', 'c'])
+        self.assertNotIn('artifacts/b.zip', self.minio.objects)
+
+    def test_evict_removes_expired_before_counting_overflow(self):
+        self.index.max_entries = 3
+        for i, fingerprint in enumerate('abc'):
+            self.store(fingerprint, f'j{i}')
+        self.collection.docs['a']['createdAt'] = time.time() - 200
+        self.collection.docs['b']['lastUsedAt'] -= 50
+        self.index.max_entries = 2
+        self.assertEqual(self.index.evict(), 1)
+        self.assertEqual(sorted(self.collection.docs), ['b', 'c'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import io
+import json
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+import networkx as nx
+import numpy as np
+
+from artifacts import parse_formats, render_artifacts, write_npz, write_graphml
+
+def sample_graph():
+    graph = nx.Graph()
+    for name, size in (('ANNA', 3), ('BOB', 2), ('ŻANETA', 1)):
+        graph.add_node(name, label=name, size=size)
+    graph.add_edge('ANNA', 'BOB', weight=4)
+    graph.add_edge('BOB', 'ŻANETA', weight=1)
+    return graph
+
+class TestParseFormats(unittest.TestCase):
+    def test_known_formats_in_order_without_duplicates(self):
+        self.assertEqual(parse_formats(' NPZ, graphml,npz ,,gexf'), ['npz', 'graphml', 'gexf'])
+
+    def test_unknown_formats_are_dropped(self):
+        self.assertEqual(parse_formats('csv,graphml,pdf'), ['graphml'])
+
+    def test_fallback_to_gexf(self):
+        for raw in (None, '', 'csv', ' , '):
+            self.assertEqual(parse_formats(raw), ['gexf'])
+
+class TestWriters(unittest.TestCase):
+    def test_npz_round_trip(self):
+        graph = sample_graph()
+        (npz_name, npz_bytes, compressed), (dict_name, dict_bytes, _) = write_npz(graph)
+        self.assertEqual((npz_name, dict_name, compressed), ('network.npz', 'nodes.json', True))
+        nodes = json.loads(dict_bytes.decode('utf-8'))['nodes']
+        self.assertEqual(nodes, ['ANNA', 'BOB', 'ŻANETA'])
+        with np.load(io.BytesIO(npz_bytes)) as data:
+            edges = {(nodes[s], nodes[t]): float(w) for s, t, w in zip(data['source'], data['target'], data['weight'])}
+            self.assertEqual(data['node_size'].tolist(), [3, 2, 1])
+            # Bez etapu analityki kolumny metryk nie są zapisywane
+            self.assertNotIn('node_pagerank', data.files)
+        self.assertEqual(edges, {('ANNA', 'BOB'): 4.0, ('BOB', 'ŻANETA'): 1.0})
+
+    def test_npz_includes_analytics_columns(self):
+        graph = sample_graph()
+        for i, node in enumerate(graph.nodes):
+            graph.nodes[node].update(weighted_degree=float(i), pagerank=0.25 * i, betweenness=0.5, community=i % 2)
+        with np.load(io.BytesIO(write_npz(graph)[0][1])) as data:
+            self.assertEqual(data['node_pagerank'].tolist(), [0.0, 0.25, 0.5])
+            self.assertEqual(data['node_community'].dtype, np.int32)
+
+    def test_npz_of_empty_graph(self):
+        with np.load(io.BytesIO(write_npz(nx.Graph())[0][1])) as data:
+            self.assertEqual(len(data['source']), 0)
+
+    def test_graphml_round_trip(self):
+        graph = sample_graph()
+        (name, payload, compressed), = write_graphml(graph)
+        self.assertEqual((name, compressed), ('network.graphml', False))
+        restored = nx.read_graphml(io.BytesIO(payload))
+        self.assertEqual(sorted(restored.nodes), sorted(graph.nodes))
+        self.assertEqual(restored['ANNA']['BOB']['weight'], 4)
+        self.assertEqual(restored.nodes['ŻANETA']['size'], 1)
+
+    def test_render_artifacts_in_requested_order(self):
+        graph = sample_graph()
+        files = render_artifacts(graph, ['npz', 'gexf'])
+        self.assertEqual([name for name, _, _ in files], ['network.npz', 'nodes.json', 'network.gexf'])
+        restored = nx.read_gexf(io.BytesIO(files[2][1]))
+        self.assertEqual(sorted(restored.edges(data='weight')), sorted(graph.edges(data='weight')))
+
+if __name__ == '__main__':
+    unittest.main()
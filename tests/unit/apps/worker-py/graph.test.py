@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import io
+import json
+import zipfile
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock
+
+# Dodaj ścieżkę do katalogu apps/worker-py, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py')))
+
+import networkx as nx
+
+import graph
+from graph import iter_json_array, filter_relationships, build_graph, write_archive
+
+SCENES = [
+    {"scene_id": "s1", "title": "Kuchnia ] noc, \"cicho\"", "relationships": [
+        {"character_a": "ANNA", "character_b": "BOB", "strength": 0.9},
+        {"character_a": "ANNA", "character_b": "CELINA", "strength": 0.1},
+    ]},
+    {"scene_id": "s2", "title": "ścieżka \\ ukośnik,   [nawias]", "relationships": []},
+    {"scene_id": "s3", "relationships": [{"character_a": "ANNA", "character_b": "BOB", "strength": 0.4}]},
+    {"scene_id": "s4", "relationships": None},
+]
+
+class TestIterJsonArray(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, content, name='analysis.json'):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_array_across_block_boundaries(self):
+        path = self.write(json.dumps(SCENES, ensure_ascii=False, indent=1))
+        # Każdy rozmiar bloku przecina napisy z ']' i ',', sekwencje ucieczki i znaki wielobajtowe
+        for block_size in list(range(1, 40)) + [64, 1000]:
+            self.assertEqual(list(iter_json_array(path, block_size)), SCENES, block_size)
+
+    def test_json_lines(self):
+        path = self.write('\n'.join(json.dumps(scene) for scene in SCENES) + '\n')
+        for block_size in (1, 7, 4096):
+            self.assertEqual(list(iter_json_array(path, block_size)), SCENES)
+
+    def test_numbers_split_between_blocks(self):
+        path = self.write('[12345, 6.78e3 ,-9, {"a": [1, 2]}]')
+        for block_size in range(1, 12):
+            self.assertEqual(list(iter_json_array(path, block_size)), [12345, 6780.0, -9, {"a": [1, 2]}])
+
+    def test_empty_inputs(self):
+        self.assertEqual(list(iter_json_array(self.write(' [ ] '))), [])
+        self.assertEqual(list(iter_json_array(self.write(''))), [])
+
+    def test_truncated_file_raises(self):
+        path = self.write(json.dumps(SCENES)[:-20])
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array(path, 16))
+
+class TestBuildGraph(unittest.TestCase):
+    def test_filter_relationships(self):
+        self.assertEqual(list(filter_relationships(SCENES[0], 0.3)), [("ANNA", "BOB", 0.9)])
+        self.assertEqual(list(filter_relationships(SCENES[0], 0.05)), [("ANNA", "BOB", 0.9), ("ANNA", "CELINA", 0.1)])
+        self.assertEqual(list(filter_relationships(SCENES[3], 0.0)), [])
+
+    def test_build_graph_filters_inline_and_keeps_last_strength(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'analysis.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(SCENES, f)
+            g = build_graph(path, threshold=0.3)
+        self.assertFalse(g.has_node('CELINA'))
+        self.assertEqual(g['ANNA']['BOB']['weight'], 0.4)
+        self.assertTrue(all(g.has_node(scene['scene_id']) for scene in SCENES))
+
+class TestArchive(unittest.TestCase):
+    def test_large_members_use_zip64(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            big = os.path.join(tmp, 'analysis.json')
+            with open(big, 'wb') as f:
+                f.write(os.urandom(4096))
+            archive = os.path.join(tmp, 'film.zip')
+            # Obniżony próg zamiast pliku > 4 GB
+            with mock.patch.object(zipfile, 'ZIP64_LIMIT', 1024):
+                write_archive(archive, [big])
+                with self.assertRaises(zipfile.LargeZipFile):
+                    with zipfile.ZipFile(os.path.join(tmp, 'bez_zip64.zip'), 'w', allowZip64=False) as z:
+                        z.write(big, 'analysis.json')
+            with zipfile.ZipFile(archive) as z:
+                self.assertIsNone(z.testzip())
+                info = z.getinfo('analysis.json')
+                self.assertEqual(info.file_size, 4096)
+                # Rozszerzenie Zip64 (identyfikator 0x0001) w katalogu centralnym
+                self.assertEqual(info.extra[:2], b'\x01\x00')
+                with open(big, 'rb') as f:
+                    self.assertEqual(z.read('analysis.json'), f.read())
+
+    def test_main_writes_gexf_and_archive(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            analysis = os.path.join(tmp, 'analysis.json')
+            locations = os.path.join(tmp, 'locations.json')
+            gexf = os.path.join(tmp, 'network.gexf')
+            archive = os.path.join(tmp, 'film.zip')
+            with open(analysis, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(json.dumps(scene) for scene in SCENES))
+            with open(locations, 'w', encoding='utf-8') as f:
+                f.write('[]')
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(graph.main([analysis, '--gexf', gexf, '--archive', archive, '--include', locations]), 0)
+            self.assertEqual(nx.read_gexf(gexf).number_of_edges(), 1)
+            with zipfile.ZipFile(archive) as z:
+                self.assertEqual(z.namelist(), ['analysis.json', 'locations.json', 'network.gexf'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import sys
+import os
+import random
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+from main import build_relationship_graph
+from graph_state import GraphState
+
+CAST = ['ANNA', 'BOB', 'CELINA', 'DAREK', 'EWA', 'FILIP', 'GOSIA', 'HENRYK']
+
+def make_scene(scene_id, characters, status='INDEXED'):
+    return {'sceneId': scene_id, 'status': status, 'analysisResult': {'characters': characters}}
+
+def random_characters(rng):
+    characters = rng.sample(CAST, rng.randint(0, 5))
+    # Szum, który pełna przebudowa też musi obsłużyć: duplikaty, białe znaki, błędne wpisy
+    if characters and rng.random() < 0.2:
+        characters.append(characters[0])
+    if characters and rng.random() < 0.2:
+        characters[0] = f'  {characters[0]} '
+    if rng.random() < 0.1:
+        characters.append('')
+    if rng.random() < 0.1:
+        characters.append(None)
+    return characters
+
+def graph_signature(G):
+    nodes = {node: dict(data) for node, data in G.nodes(data=True)}
+    edges = {frozenset((a, b)): data['weight'] for a, b, data in G.edges(data=True)}
+    return nodes, edges
+
+class TestIncrementalGraphState(unittest.TestCase):
+    """Incremental updates must always match a full rebuild of the INDEXED scenes."""
+
+    def assertMatchesFullRebuild(self, state, scenes):
+        indexed = [scene for scene in scenes.values() if scene['status'] == 'INDEXED']
+        expected = build_relationship_graph(indexed, 'test-job')
+        self.assertEqual(graph_signature(state.to_graph()), graph_signature(expected))
+
+    def test_initial_build_matches_full_rebuild(self):
+        rng = random.Random(1)
+        scenes = {f's{i}': make_scene(f's{i}', random_characters(rng)) for i in range(40)}
+        state = GraphState('test-job')
+        state.apply_scenes(scenes.values())
+        self.assertMatchesFullRebuild(state, scenes)
+
+    def test_random_reindex_sequence_matches_full_rebuild(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            scenes = {f's{i}': make_scene(f's{i}', random_characters(rng)) for i in range(30)}
+            state = GraphState('test-job')
+            state.apply_scenes(scenes.values())
+
+            for _ in range(15):
+                changed = set()
+                for _ in range(rng.randint(1, 4)):
+                    scene_id = f's{rng.randint(0, 35)}'
+                    action = rng.random()
+                    if action < 0.6:
+                        scenes[scene_id] = make_scene(scene_id, random_characters(rng))
+                    elif action < 0.8:
+                        scenes[scene_id] = make_scene(scene_id, random_characters(rng), status='FAILED_ANALYSIS')
+                    else:
+                        scenes.pop(scene_id, None)
+                    changed.add(scene_id)
+
+                if rng.random() < 0.5:
+                    # Re-index z listą zmienionych scen
+                    state.apply_scenes([scenes[s] for s in changed if s in scenes], scope=changed)
+                else:
+                    # Re-index bez podpowiedzi: pełna lista scen INDEXED
+                    state.apply_scenes([s for s in scenes.values() if s['status'] == 'INDEXED'])
+                self.assertMatchesFullRebuild(state, scenes)
+
+    def test_unchanged_scenes_report_no_change(self):
+        scenes = [make_scene('s1', ['ANNA', 'BOB']), make_scene('s2', ['BOB', 'CELINA'])]
+        state = GraphState('test-job')
+        self.assertEqual(state.apply_scenes(scenes), ['s1', 's2'])
+        state.final_url = 'http://minio/results.zip'
+        self.assertEqual(state.apply_scenes(scenes), [])
+        self.assertEqual(state.final_url, 'http://minio/results.zip')
+        self.assertEqual(state.apply_scenes([make_scene('s2', ['CELINA'])], scope=['s2']), ['s2'])
+        self.assertIsNone(state.final_url)
+
+    def test_duplicate_scene_ids_match_full_rebuild(self):
+        scenes = [make_scene('s1', ['ANNA', 'BOB']), make_scene('s1', ['ANNA', 'CELINA'])]
+        state = GraphState('test-job')
+        state.apply_scenes(scenes)
+        expected = build_relationship_graph(scenes, 'test-job')
+        self.assertEqual(graph_signature(state.to_graph()), graph_signature(expected))
+
+        state.apply_scenes([make_scene('s1', ['ANNA', 'BOB'])], scope=['s1'])
+        expected = build_relationship_graph([make_scene('s1', ['ANNA', 'BOB'])], 'test-job')
+        self.assertEqual(graph_signature(state.to_graph()), graph_signature(expected))
+
+    def test_document_round_trip(self):
+        rng = random.Random(7)
+        scenes = {f's.{i}': make_scene(f's.{i}', random_characters(rng)) for i in range(20)}
+        state = GraphState('test-job')
+        state.apply_scenes(scenes.values())
+        state.formats, state.analytics = ['gexf'], [True, 10.0, 256, 200000]
+        restored = GraphState.from_document('test-job', state.to_document())
+        self.assertEqual(graph_signature(restored.to_graph()), graph_signature(state.to_graph()))
+        self.assertEqual((restored.formats, restored.analytics), (['gexf'], [True, 10.0, 256, 200000]))
+        self.assertEqual(restored.apply_scenes(scenes.values()), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+import unittest
+import sys
+import os
+import io
+import time
+import zipfile
+import threading
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+import networkx as nx
+
+import main
+from metrics import StageLaps
+
+def make_scene(scene_id, characters, status='INDEXED'):
+    return {'jobId': 'job', 'sceneId': scene_id, 'status': status, 'analysisResult': {'characters': characters}}
+
+def matches(doc, query):
+    for key, expected in query.items():
+        if isinstance(expected, dict) and '$in' in expected:
+            if doc.get(key) not in expected['$in']:
+                return False
+        elif doc.get(key) != expected:
+            return False
+    return True
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+
+    def find(self, query, projection=None):
+        return [dict(doc) for doc in self.docs if matches(doc, query)]
+
+    def find_one(self, query):
+        found = self.find(query)
+        return found[0] if found else None
+
+    def replace_one(self, query, doc, upsert=False):
+        self.docs = [d for d in self.docs if not matches(d, query)] + [doc]
+
+class FakeMongo:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def __getitem__(self, name):
+        return self if name == main.DB_NAME else self.collections.setdefault(name, FakeCollection())
+
+class FakeRedis:
+    def __init__(self):
+        self.acked, self.dead = [], []
+
+    def xack(self, stream, group, message_id):
+        self.acked.append(message_id)
+
+    def xadd(self, stream, fields, **kwargs):
+        self.dead.append(fields)
+
+class FakeMinio:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, bucket, key, data, size, content_type=None):
+        self.objects[key] = data.read()
+
+class FakeReporter:
+    def __init__(self, fail_on=()):
+        self.statuses = []
+        self.fail_on = fail_on
+
+    def report(self, job_id, status, progress, message, **kwargs):
+        if status in self.fail_on:
+            raise ConnectionError('mongo niedostępne')
+        self.statuses.append(status)
+
+class FakeArtifactIndex:
+    def __init__(self):
+        self.stored = set()
+
+    def reuse(self, fingerprint, dest_key, job_id_for_logging=None):
+        return fingerprint in self.stored
+
+    def store(self, fingerprint, source_key, size, job_id_for_logging=None):
+        self.stored.add(fingerprint)
+
+class TestGraphJob(unittest.TestCase):
+    def setUp(self):
+        self.saved = {name: getattr(main, name) for name in (
+            'mongo_client', 'redis_client', 'minio_client', 'progress_reporter', 'retry_policy', 'artifact_index',
+            'GRAPH_MEMOIZATION_ENABLED', 'GRAPH_ANALYTICS_SETTINGS')}
+        self.scenes = FakeCollection()
+        self.states = FakeCollection()
+        main.mongo_client = FakeMongo({main.SCENES_COLLECTION_NAME: self.scenes, main.GRAPH_STATES_COLLECTION_NAME: self.states})
+        main.redis_client = FakeRedis()
+        main.minio_client = FakeMinio()
+        main.progress_reporter = FakeReporter()
+        main.retry_policy = None
+        main.GRAPH_MEMOIZATION_ENABLED = False
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(main, name, value)
+
+    def run_job(self, **fields):
+        return main._process_graph_job('1-0', {'jobId': 'job', **fields}, StageLaps())
+
+    def exported_graph(self):
+        archive = zipfile.ZipFile(io.BytesIO(main.minio_client.objects['results/job/analysis_results.zip']))
+        return nx.read_gexf(io.BytesIO(archive.read('network.gexf')))
+
+    def test_scenes_without_characters_give_an_empty_graph(self):
+        self.scenes.docs = [make_scene('s1', []), make_scene('s2', None)]
+        self.assertEqual(self.run_job(), 'completed')
+        self.assertEqual(self.exported_graph().number_of_nodes(), 0)
+        self.assertEqual(main.progress_reporter.statuses[-1], 'COMPLETED')
+        self.assertEqual(main.redis_client.dead, [])
+
+    def test_no_indexed_scenes_fail(self):
+        self.scenes.docs = [make_scene('s1', ['ANNA', 'BOB'], status='PENDING')]
+        self.assertEqual(self.run_job(), 'failed')
+        self.assertEqual(main.progress_reporter.statuses[-1], 'FAILED')
+        self.assertEqual(len(main.redis_client.dead), 1)
+        self.assertEqual(main.redis_client.acked, ['1-0'])
+
+    def test_failed_progress_publish_still_acknowledges(self):
+        main.progress_reporter = FakeReporter(fail_on=('FAILED',))
+        self.assertEqual(self.run_job(), 'failed')
+        self.assertEqual(len(main.redis_client.dead), 1)
+        self.assertEqual(main.redis_client.acked, ['1-0'])
+
+    def test_changed_ids_without_saved_state_rebuild_everything(self):
+        self.scenes.docs = [
+            make_scene('s1', ['ANNA', 'BOB']),
+            make_scene('s2', ['CELINA', 'DAREK', 'EWA']),
+            make_scene('s3', ['FILIP', 'GOSIA', 'ANNA']),
+        ]
+        self.assertEqual(self.run_job(changedSceneIds='["s1"]'), 'completed')
+        self.assertEqual(self.exported_graph().number_of_nodes(), 7)
+        self.assertEqual(len(self.states.docs[0]['scenes']), 3)
+
+    def test_changed_ids_update_saved_state(self):
+        self.scenes.docs = [make_scene('s1', ['ANNA', 'BOB']), make_scene('s2', ['CELINA', 'DAREK'])]
+        self.run_job()
+        self.scenes.docs[0] = make_scene('s1', ['ANNA', 'EWA'])
+        self.assertEqual(self.run_job(changedSceneIds='s1'), 'completed')
+        self.assertEqual(sorted(self.exported_graph().nodes), ['ANNA', 'CELINA', 'DAREK', 'EWA'])
+
+    def test_memoized_result_depends_on_analytics_settings(self):
+        main.GRAPH_MEMOIZATION_ENABLED = True
+        main.artifact_index = FakeArtifactIndex()
+        self.scenes.docs = [make_scene('s1', ['ANNA', 'BOB'])]
+        self.assertEqual(self.run_job(), 'completed')
+        self.states.docs = []
+        self.assertEqual(self.run_job(), 'memoized')
+        # Inne ustawienia analityki: zapamiętany wynik nie pasuje, graf jest liczony od nowa
+        self.states.docs = []
+        main.GRAPH_ANALYTICS_SETTINGS = main.GRAPH_ANALYTICS_SETTINGS[:2] + [64] + main.GRAPH_ANALYTICS_SETTINGS[3:]
+        self.assertEqual(self.run_job(), 'completed')
+        self.assertEqual(len(main.artifact_index.stored), 2)
+
+class TestLazyHelpers(unittest.TestCase):
+    def test_concurrent_first_calls_share_one_reporter(self):
+        created = []
+
+        class SlowReporter:
+            def __init__(self, *args, **kwargs):
+                time.sleep(0.05)
+                created.append(self)
+
+        saved = main.ProgressReporter, main.progress_reporter, main.mongo_client
+        main.ProgressReporter, main.progress_reporter, main.mongo_client = SlowReporter, None, FakeMongo({})
+        try:
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(main.get_progress_reporter())) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            main.ProgressReporter, main.progress_reporter, main.mongo_client = saved
+        self.assertEqual(len(created), 1)
+        self.assertTrue(all(result is created[0] for result in results))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import sys
+import os
+import json
+import time
+import urllib.request
+import urllib.error
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+import metrics
+from metrics import Counter, Gauge, Histogram, StageLaps, render_metrics, start_metrics_server
+
+class TestExposition(unittest.TestCase):
+    def test_label_values_are_escaped(self):
+        counter = Counter('errors_total', 'Błędy.', ('stream',))
+        counter.inc('a\\b"c\nd')
+        self.assertEqual(counter.render()[-1], 'errors_total{stream="a\\\\b\\"c\\nd"} 1.0')
+
+    def test_counter_and_gauge(self):
+        counter = Counter('jobs_total', 'Zadania.', ('outcome',))
+        counter.inc('completed')
+        counter.inc('completed', amount=2)
+        gauge = Gauge('in_flight', 'W toku.')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        self.assertEqual(counter.value('completed'), 3.0)
+        self.assertEqual(render_metrics(registry=[counter, gauge]).splitlines(), [
+            '# HELP jobs_total Zadania.',
+            '# TYPE jobs_total counter',
+            'jobs_total{outcome="completed"} 3.0',
+            '# HELP in_flight W toku.',
+            '# TYPE in_flight gauge',
+            'in_flight 1.0',
+        ])
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('stage_seconds', 'Etapy.', ('stage',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, 'zip')
+        self.assertEqual(histogram.render()[2:], [
+            'stage_seconds_bucket{stage="zip",le="0.1"} 2',
+            'stage_seconds_bucket{stage="zip",le="1.0"} 3',
+            'stage_seconds_bucket{stage="zip",le="+Inf"} 4',
+            'stage_seconds_sum{stage="zip"} 3.65',
+            'stage_seconds_count{stage="zip"} 4',
+        ])
+
+    def test_failing_extra_lines_do_not_break_the_scrape(self):
+        def broken():
+            raise ConnectionError('redis niedostępny')
+        counter = Counter('jobs_total', 'Zadania.')
+        self.assertEqual(render_metrics(broken, registry=[counter]).splitlines()[-1], '# TYPE jobs_total counter')
+
+class TestStageLaps(unittest.TestCase):
+    def setUp(self):
+        self.saved = metrics.JOB_STAGE_SECONDS
+        metrics.JOB_STAGE_SECONDS = Histogram('stage_seconds', 'Etapy.', ('stage',), buckets=(0.01, 10.0))
+
+    def tearDown(self):
+        metrics.JOB_STAGE_SECONDS = self.saved
+
+    def test_each_lap_observes_time_since_the_previous_one(self):
+        laps = StageLaps()
+        time.sleep(0.03)
+        first = laps.lap('fetch')
+        second = laps.lap('build')
+        self.assertGreaterEqual(first, 0.03)
+        self.assertLess(second, 0.01)
+        self.assertGreaterEqual(laps.total(), first + second)
+        series = metrics.JOB_STAGE_SECONDS._series
+        self.assertEqual(series[('fetch',)][0], [0, 1])
+        self.assertEqual(series[('build',)][0], [1, 1])
+
+class TestMetricsServer(unittest.TestCase):
+    def setUp(self):
+        self.ready = {'redis': True}
+        counter = Counter('jobs_total', 'Zadania.')
+        counter.inc()
+        checks = {'redis': lambda: self.ready['redis'], 'mongo': lambda: True}
+        self.server = start_metrics_server(0, checks, extra_lines=lambda: ['extra_metric 1'], registry=[counter])
+        self.base = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get(self, path):
+        try:
+            with urllib.request.urlopen(self.base + path, timeout=2) as response:
+                return response.status, response.headers['Content-Type'], response.read().decode('utf-8')
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers['Content-Type'], e.read().decode('utf-8')
+
+    def test_metrics(self):
+        status, content_type, body = self.get('/metrics')
+        self.assertEqual(status, 200)
+        self.assertTrue(content_type.startswith('text/plain; version=0.0.4'))
+        self.assertIn('jobs_total 1.0\n', body)
+        self.assertTrue(body.endswith('extra_metric 1\n'))
+
+    def test_healthz(self):
+        self.assertEqual(self.get('/healthz')[::2], (200, '{"status": "ok"}'))
+
+    def test_readyz_reports_each_check(self):
+        status, _, body = self.get('/readyz?verbose=1')
+        self.assertEqual((status, json.loads(body)), (200, {"ready": True, "checks": {"redis": True, "mongo": True}}))
+        self.ready['redis'] = False
+        status, _, body = self.get('/readyz')
+        self.assertEqual((status, json.loads(body)['checks']['redis']), (503, False))
+
+    def test_raising_check_is_not_ready(self):
+        del self.ready['redis']  # Sprawdzenie zgłasza KeyError
+        status, _, body = self.get('/readyz')
+        self.assertEqual((status, json.loads(body)['checks']), (503, {"redis": False, "mongo": True}))
+
+    def test_unknown_path(self):
+        self.assertEqual(self.get('/nic')[0], 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import sys
+import os
+import json
+import time
+import threading
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+from pymongo.errors import BulkWriteError
+
+from progress import ProgressReporter
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def publish(self, channel, data):
+        self.commands.append(('publish', channel, json.loads(data)))
+
+    def xadd(self, *args, **kwargs):
+        pass
+
+    def expire(self, *args):
+        pass
+
+    def execute(self):
+        self.redis.batches.append(self.commands)
+
+class FakeRedis:
+    def __init__(self):
+        self.batches = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def published(self, job_id):
+        return [payload for batch in self.batches for _, channel, payload in batch if channel == f'progress:{job_id}']
+
+class FakeBulkResult:
+    def __init__(self, count):
+        self.matched_count = count
+
+class FakeJobs:
+    def __init__(self):
+        self.writes = []
+        self.failing = set()  # Zadania, których zapis kończy się błędem
+        self.gate = None  # Zdarzenie wstrzymujące zapis (symulacja wolnego Mongo)
+
+    def bulk_write(self, updates, ordered=False):
+        if self.gate is not None:
+            gate, self.gate = self.gate, None
+            gate.wait(2)
+        errors = [{'index': i, 'code': 1, 'errmsg': 'błąd'} for i, update in enumerate(updates) if update._filter['jobId'] in self.failing]
+        self.writes.append([update for update in updates if update._filter['jobId'] not in self.failing])
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nMatched': len(updates) - len(errors)})
+        return FakeBulkResult(len(updates))
+
+    def written(self, job_id):
+        return [update._doc['$set'] for batch in self.writes for update in batch if update._filter['jobId'] == job_id]
+
+class TestProgressReporter(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.jobs = FakeJobs()
+        self.reporter = ProgressReporter(self.redis, self.jobs, 'progress', min_interval=0.2)
+
+    def tearDown(self):
+        self.reporter.close()
+
+    def test_held_back_update_is_sent_when_due(self):
+        self.reporter.report('job', 'GENERATING_GRAPH', 10, 'start')
+        self.reporter.report('job', 'GENERATING_GRAPH', 30, 'budowanie')
+        self.assertEqual([p['progress'] for p in self.redis.published('job')], [10])
+        time.sleep(0.5)
+        self.assertEqual([p['progress'] for p in self.redis.published('job')], [10, 30])
+        self.assertEqual(self.reporter._pending, {})
+
+    def test_retry_notice_is_written_and_state_dropped(self):
+        self.reporter.report('job', 'GENERATING_GRAPH', 10, 'start')
+        self.reporter.report('job', 'GENERATING_GRAPH', 30, 'budowanie')
+        self.reporter.report('job', 'GENERATING_GRAPH', 0, 'retry in 2s', final=True)
+        self.assertEqual(self.redis.published('job')[-1]['message'], 'retry in 2s')
+        self.assertEqual((self.reporter._pending, self.reporter._last_flush, self.reporter._last_status), ({}, {}, {}))
+
+    def test_due_jobs_are_flushed_together(self):
+        for job_id in ('a', 'b', 'c'):
+            self.reporter.report(job_id, 'GENERATING_GRAPH', 10, 'start')
+            self.reporter.report(job_id, 'GENERATING_GRAPH', 30, 'budowanie')
+        time.sleep(0.5)
+        self.assertIn({'a', 'b', 'c'}, [{channel.split(':')[1] for _, channel, _ in batch} for batch in self.redis.batches])
+
+    def test_idle_jobs_are_forgotten(self):
+        self.reporter.idle_ttl = 0.2
+        self.reporter.report('job', 'GENERATING_GRAPH', 10, 'start')
+        time.sleep(0.6)
+        self.assertEqual(self.reporter._last_flush, {})
+
+    def test_concurrent_flushes_keep_job_order(self):
+        gate = self.jobs.gate = threading.Event()
+        first = threading.Thread(target=self.reporter.report, args=('job', 'GENERATING_GRAPH', 80, 'zip'))
+        first.start()
+        time.sleep(0.05)  # Pierwszy zapis czeka w Mongo
+        second = threading.Thread(target=self.reporter.report, args=('job', 'COMPLETED', 100, 'koniec'))
+        second.start()
+        time.sleep(0.05)
+        # Drugi zapis nie wyprzedza pierwszego
+        self.assertEqual(self.jobs.writes, [])
+        gate.set()
+        first.join()
+        second.join()
+        self.assertEqual([p['status'] for p in self.redis.published('job')], ['GENERATING_GRAPH', 'COMPLETED'])
+        self.assertEqual([w['status'] for w in self.jobs.written('job')], ['GENERATING_GRAPH', 'COMPLETED'])
+
+    def test_failed_write_is_isolated_and_retried(self):
+        self.reporter.max_write_attempts = 100
+        self.jobs.failing.add('zly')
+        # Błąd zapisu jednego zadania nie trafia do wywołującego ani nie blokuje innych
+        self.reporter.report('zly', 'GENERATING_GRAPH', 50, 'analiza', fields={'errorMessage': 'x'})
+        self.reporter.report('dobry', 'COMPLETED', 100, 'koniec')
+        self.assertEqual([w['status'] for w in self.jobs.written('dobry')], ['COMPLETED'])
+        self.assertEqual((self.jobs.written('zly'), self.redis.published('zly')), ([], []))
+
+        self.jobs.failing.clear()
+        time.sleep(0.5)
+        self.assertEqual(self.jobs.written('zly')[-1]['errorMessage'], 'x')
+        self.assertEqual([p['progress'] for p in self.redis.published('zly')], [50])
+        self.assertEqual(self.reporter._pending, {})
+
+    def test_write_is_dropped_after_max_attempts(self):
+        self.reporter.max_write_attempts = 2
+        self.jobs.failing.add('zly')
+        self.reporter.report('zly', 'FAILED', 0, 'błąd')
+        time.sleep(0.5)
+        self.assertEqual((self.reporter._pending, self.reporter._write_failures), ({}, {}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+
+# Dodaj ścieżkę do katalogu apps/worker-py, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py')))
+
+from retrieval import BM25Index, HybridRetriever, reciprocal_rank_fusion
+
+SCENES = {
+    's1': 'INT. KUCHNIA - NOC. ANNA parzy herbatę i rozmawia z BOBEM o pogodzie.',
+    's2': 'EXT. PARK - DZIEŃ. BOB biega po parku, pogoda jest piękna.',
+    's3': 'INT. BIURO - DZIEŃ. CELINA czyta list od DARKA i płacze.',
+    's4': 'EXT. DWORZEC - NOC. DAREK czeka na pociąg, pada deszcz.',
+    's5': 'INT. KUCHNIA - DZIEŃ. EWA gotuje obiad, radio gra cicho.',
+}
+
+class TestRetrieval(unittest.TestCase):
+    def setUp(self):
+        self.ids = list(SCENES)
+        self.retriever = HybridRetriever(
+            # Wyszukiwanie wektorowe symulowane stałym rankingiem, który nie zna nazw własnych
+            vector_search=lambda vector, k: ['s5', 's2', 's1', 's4', 's3'][:k],
+            load_corpus=lambda: list(self.ids),
+            key=lambda doc: doc,
+            text=lambda doc: SCENES[doc],
+            candidates=5,
+            max_context=3,
+        )
+        self.retriever.refresh()
+
+    def test_bm25_finds_exact_names(self):
+        index = BM25Index(self.ids, [SCENES[i] for i in self.ids])
+        hits = index.search('list od Darka', 3)
+        self.assertEqual(self.ids[hits[0][0]], 's3')
+        self.assertEqual(index.search('słowo spoza korpusu', 3), [])
+
+    def test_rank_fusion_rewards_agreement(self):
+        fused = reciprocal_rank_fusion([['a', 'b', 'c'], ['b', 'c', 'a']])
+        self.assertEqual(max(fused, key=fused.get), 'b')
+
+    def test_hybrid_brings_lexical_match_first_and_trims_context(self):
+        docs = self.retriever.retrieve('Co robi CELINA w biurze z listem od DARKA?', None)
+        self.assertEqual(docs[0], 's3')
+        self.assertLessEqual(len(docs), 3)
+
+    def test_vector_only_before_index_is_built(self):
+        self.retriever.index = None
+        self.retriever.version_check_interval = 3600
+        self.retriever._checked_at = float('inf')
+        docs = self.retriever.retrieve('cokolwiek', None)
+        self.assertEqual(docs[0], 's5')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import unittest
+import sys
+import os
+import io
+import json
+import time
+import random
+from contextlib import redirect_stdout
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+from minio.error import S3Error
+from pymongo.errors import AutoReconnect, DuplicateKeyError
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError
+
+from retry import RetryPolicy, is_transient
+from dead_letters import list_dead_letters
+
+def stream_id(entry_id):
+    return tuple(int(part) for part in entry_id.split('-'))
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+class FakeRedis:
+    """Zbiory posortowane i strumienie w pamięci (bez Lua)."""
+
+    def __init__(self):
+        self.zsets, self.streams, self.next_id = {}, {}, 0
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def xadd(self, stream, fields, maxlen=None, approximate=False):
+        self.next_id += 1
+        entry_id = f'{self.next_id}-0'
+        self.streams.setdefault(stream, []).append((entry_id, dict(fields)))
+        return entry_id
+
+    def xrange(self, stream, min='-', max='+', count=None):
+        entries = [e for e in self.streams.get(stream, []) if min == '-' or stream_id(e[0]) >= stream_id(min)]
+        return entries[:count] if count else entries
+
+    def xdel(self, stream, entry_id):
+        self.streams[stream] = [e for e in self.streams.get(stream, []) if e[0] != entry_id]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+def lua_redis():
+    """fakeredis z obsługą Lua, jeśli jest zainstalowany; promote_due wymaga skryptów."""
+    try:
+        import fakeredis
+        client = fakeredis.FakeRedis(decode_responses=True)
+        client.eval('return 1', 0)
+        return client
+    except Exception:
+        return None
+
+class TestErrorClassification(unittest.TestCase):
+    def test_transient_and_permanent_errors(self):
+        for error in (AutoReconnect('x'), RedisConnectionError('x'), TimeoutError(), ConnectionResetError()):
+            self.assertTrue(is_transient(error), error)
+        for error in (ValueError('x'), KeyError('x'), DuplicateKeyError('x'), ResponseError('x')):
+            self.assertFalse(is_transient(error), error)
+
+    def test_s3_errors_by_code(self):
+        def s3_error(code):
+            return S3Error(response=None, code=code, message='', resource=None, request_id=None, host_id=None)
+        self.assertTrue(is_transient(s3_error('SlowDown')))
+        self.assertFalse(is_transient(s3_error('AccessDenied')))
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.policy = RetryPolicy(self.redis, 'jobs', max_attempts=3, backoff_base=2.0, backoff_max=5.0)
+
+    def test_attempt_and_history_parsing(self):
+        self.assertEqual(RetryPolicy.attempt({}), 1)
+        self.assertEqual(RetryPolicy.attempt({'attempt': '3'}), 3)
+        self.assertEqual(RetryPolicy.attempt({'attempt': 'x'}), 1)
+        self.assertEqual(RetryPolicy.error_history({'errorHistory': 'nie json'}), [])
+
+    def test_backoff_is_capped_full_jitter(self):
+        random.seed(3)
+        for attempt, cap in ((1, 2.0), (2, 4.0), (3, 5.0), (10, 5.0)):
+            delays = [self.policy.backoff(attempt) for _ in range(200)]
+            self.assertTrue(all(0 <= delay <= cap for delay in delays))
+            self.assertGreater(max(delays), cap * 0.8)
+
+    def test_transient_failure_is_delayed_with_next_attempt(self):
+        action, delay = self.policy.handle_failure({'jobId': 'job', 'attempt': '1'}, ConnectionError('sieć'))
+        self.assertEqual(action, 'retry')
+        (payload, due), = self.redis.zsets['jobs:delayed'].items()
+        self.assertAlmostEqual(due, time.time() + delay, delta=1)
+        message = json.loads(payload)
+        self.assertEqual((message['jobId'], message['attempt']), ('job', '2'))
+        self.assertEqual([entry['type'] for entry in json.loads(message['errorHistory'])], ['ConnectionError'])
+
+    def test_permanent_and_exhausted_failures_are_dead_lettered(self):
+        self.assertEqual(self.policy.handle_failure({'jobId': 'a'}, ValueError('zły plik')), ('dead', 0.0))
+        history = json.dumps([{'attempt': 1, 'type': 'TimeoutError'}, {'attempt': 2, 'type': 'TimeoutError'}])
+        self.assertEqual(self.policy.handle_failure({'jobId': 'b', 'attempt': '3', 'errorHistory': history}, TimeoutError())[0], 'dead')
+        dead = self.redis.streams['jobs:dead']
+        self.assertEqual([fields['jobId'] for _, fields in dead], ['a', 'b'])
+        self.assertEqual(len(json.loads(dead[1][1]['errorHistory'])), 3)
+        self.assertNotIn('jobs:delayed', self.redis.zsets)
+
+    def test_replay_dead_letters(self):
+        for job_id in ('a', 'b', 'a', 'c'):
+            self.policy.handle_failure({'jobId': job_id, 'attempt': '3'}, ValueError('x'))
+        self.assertEqual(self.policy.replay_dead_letters(job_id='a', dry_run=True), 2)
+        self.assertEqual(len(self.redis.streams['jobs:dead']), 4)
+
+        self.assertEqual(self.policy.replay_dead_letters(job_id='a'), 2)
+        replayed = [fields for _, fields in self.redis.streams['jobs']]
+        self.assertEqual([fields['jobId'] for fields in replayed], ['a', 'a'])
+        # Nowy licznik prób, ale historia błędów zostaje
+        self.assertTrue(all('attempt' not in fields and fields['errorHistory'] for fields in replayed))
+        self.assertEqual([fields['jobId'] for _, fields in self.redis.streams['jobs:dead']], ['b', 'c'])
+
+        self.assertEqual(self.policy.replay_dead_letters(limit=1, delete=False), 1)
+        self.assertEqual(len(self.redis.streams['jobs:dead']), 2)
+
+    def test_list_dead_letters(self):
+        self.policy.handle_failure({'jobId': 'a'}, KeyError('sceneId'))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            list_dead_letters(self.redis, 10, stream='jobs:dead')
+        entry = json.loads(output.getvalue())
+        self.assertEqual((entry['jobId'], entry['attempts'], entry['lastErrorType']), ('a', 1, 'KeyError'))
+
+@unittest.skipIf(lua_redis() is None, 'fakeredis z obsługą Lua nie jest zainstalowany')
+class TestPromoteDue(unittest.TestCase):
+    def setUp(self):
+        self.redis = lua_redis()
+        self.redis.flushall()
+        self.policy = RetryPolicy(self.redis, 'jobs', backoff_base=0.0)
+
+    def test_due_retries_move_to_the_stream(self):
+        self.policy.handle_failure({'jobId': 'teraz', 'attempt': '1'}, TimeoutError())
+        self.redis.zadd(self.policy.delayed_key, {json.dumps({'jobId': 'później', 'attempt': '2'}): time.time() + 60})
+        self.assertEqual(self.policy.promote_due(), 1)
+        (_, fields), = self.redis.xrange('jobs')
+        self.assertEqual((fields['jobId'], fields['attempt']), ('teraz', '2'))
+        self.assertEqual(self.redis.zrange(self.policy.delayed_key, 0, -1), [json.dumps({'jobId': 'później', 'attempt': '2'})])
+        self.assertEqual(self.policy.promote_due(), 0)
+
+    def test_limit_and_competing_workers(self):
+        for i in range(5):
+            self.redis.zadd(self.policy.delayed_key, {json.dumps({'jobId': f'job{i}'}): time.time() - 1})
+        other = RetryPolicy(self.redis, 'jobs')
+        self.assertEqual(self.policy.promote_due(limit=3) + other.promote_due() + self.policy.promote_due(), 5)
+        self.assertEqual(sorted(fields['jobId'] for _, fields in self.redis.xrange('jobs')), [f'job{i}' for i in range(5)])
+        self.assertEqual(self.redis.zcard(self.policy.delayed_key), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import sys
+import os
+import time
+import signal
+import socket
+import tempfile
+import threading
+
+# Dodaj ścieżkę do katalogu apps/worker-py/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../apps/worker-py/src')))
+
+import metrics
+from supervisor import Supervisor, aggregate_child_metrics, _add_label
+
+class FakeProcess:
+    def __init__(self, pid=1, exitcode=1):
+        self.pid = pid
+        self.exitcode = exitcode
+
+    def join(self, timeout=None):
+        pass
+
+def crash_once(marker):
+    """Pierwsze uruchomienie kończy się błędem, kolejne czeka na SIGTERM."""
+    def target(slot):
+        if not os.path.exists(marker):
+            open(marker, 'w').close()
+            return 3
+        time.sleep(30)
+        return 0
+    return target
+
+def ignore_sigterm(slot):
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    time.sleep(30)
+    return 0
+
+def graceful(slot):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    stop.wait(30)
+    return 0
+
+def unused_port():
+    """Port, na którym nic nie nasłuchuje."""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+class TestSupervisorBackoff(unittest.TestCase):
+    def setUp(self):
+        self.supervisor = Supervisor(lambda slot: 0, 1, backoff_initial=1.0, backoff_max=4.0, stable_after=10.0)
+
+    def crash(self, slot=0, uptime=0.0):
+        self.supervisor.children[slot] = FakeProcess()
+        self.supervisor._started_at[slot] = time.monotonic() - uptime
+        self.supervisor._reap(slot)
+        return self.supervisor._backoff[slot]
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual([self.crash() for _ in range(5)], [1.0, 2.0, 4.0, 4.0, 4.0])
+        self.assertEqual(self.supervisor.restarts.value('0'), 5)
+        self.assertGreater(self.supervisor._restart_at[0], time.monotonic() + 3)
+
+    def test_stable_child_starts_backoff_over(self):
+        self.crash()
+        self.crash()
+        self.assertEqual(self.crash(uptime=20.0), 1.0)
+
+    def test_no_restart_while_shutting_down(self):
+        self.supervisor.shutting_down = True
+        self.supervisor.children[0] = FakeProcess()
+        self.supervisor._started_at[0] = time.monotonic()
+        self.supervisor._reap(0)
+        self.assertEqual((self.supervisor._restart_at, self.supervisor.restarts.value('0')), ({}, 0))
+
+class TestSupervisorRun(unittest.TestCase):
+    def setUp(self):
+        self.handlers = signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT)
+
+    def tearDown(self):
+        signal.signal(signal.SIGTERM, self.handlers[0])
+        signal.signal(signal.SIGINT, self.handlers[1])
+
+    def run_for(self, supervisor, seconds, after_start=None):
+        timer = threading.Timer(seconds, lambda: setattr(supervisor, 'shutting_down', True))
+        timer.start()
+        started = time.monotonic()
+        self.assertEqual(supervisor.run(after_start=after_start), 0)
+        timer.cancel()
+        return time.monotonic() - started
+
+    def test_crashed_child_is_restarted_and_drained(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            supervisor = Supervisor(crash_once(os.path.join(tmp, 'marker')), 1, drain_timeout=5, backoff_initial=0.05)
+            self.run_for(supervisor, 1.0)
+        self.assertEqual(supervisor.restarts.value('0'), 1)
+        # Ponownie uruchomiony proces działał do momentu zatrzymania i dostał SIGTERM
+        self.assertEqual(supervisor.children[0].exitcode, -signal.SIGTERM)
+
+    def test_drain_waits_for_graceful_children(self):
+        supervisor = Supervisor(graceful, 2, drain_timeout=5)
+        self.run_for(supervisor, 0.3)
+        self.assertEqual([process.exitcode for process in supervisor.children.values()], [0, 0])
+        self.assertEqual(supervisor.restarts.value('0'), 0)
+
+    def test_children_are_killed_after_drain_timeout(self):
+        supervisor = Supervisor(ignore_sigterm, 1, drain_timeout=0.3)
+        elapsed = self.run_for(supervisor, 0.3)
+        self.assertEqual(supervisor.children[0].exitcode, -signal.SIGKILL)
+        self.assertLess(elapsed, 5)
+
+    def test_after_start_runs_once_children_are_forked(self):
+        seen = []
+        supervisor = Supervisor(graceful, 2, drain_timeout=5)
+        self.run_for(supervisor, 0.3, after_start=lambda: seen.append(sorted(supervisor.children)))
+        self.assertEqual(seen, [[0, 1]])
+
+class TestAggregateChildMetrics(unittest.TestCase):
+    def test_add_label(self):
+        self.assertEqual(_add_label('jobs_total 3.0', 'slot="1"'), 'jobs_total{slot="1"} 3.0')
+        self.assertEqual(_add_label('jobs_total{outcome="ok"} 3.0', 'slot="1"'), 'jobs_total{slot="1",outcome="ok"} 3.0')
+
+    def test_samples_are_labelled_with_their_slot(self):
+        servers = []
+        for done in (2, 5):
+            counter = metrics.Counter('jobs_total', 'Zadania.', ('outcome',))
+            counter.inc('completed', amount=done)
+            servers.append(metrics.start_metrics_server(0, {}, registry=[counter]))
+        try:
+            ports = {slot: server.server_address[1] for slot, server in enumerate(servers)}
+            ports[2] = unused_port()
+            lines = aggregate_child_metrics(ports, timeout=1.0)
+        finally:
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+        # Jedna para HELP/TYPE dla rodziny, próbki z obu procesów, niedostępny proces pominięty
+        self.assertEqual(lines, [
+            '# HELP jobs_total Zadania.',
+            '# TYPE jobs_total counter',
+            'jobs_total{slot="0",outcome="completed"} 2.0',
+            'jobs_total{slot="1",outcome="completed"} 5.0',
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
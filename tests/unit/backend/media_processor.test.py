@@ -0,0 +1,325 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+# Dodaj ścieżkę do katalogu backend/src, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../backend/src')))
+
+import cv2
+import numpy as np
+
+from media_processor import BatchReport, CacheManager, MediaProcessor, ProcessingConfig, SceneChangeDetector, frame_dhash, hamming_distance
+
+class TestCacheManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.cache = CacheManager(self.cache_dir, ttl=3600, max_bytes=10 * 1024)
+        self.config = ProcessingConfig(use_gpu=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_key_follows_content_not_path(self):
+        original = self.write_file('a.mp4', os.urandom(4096))
+        copy = os.path.join(self.tmp_dir, 'b.mp4')
+        shutil.copyfile(original, copy)
+        self.assertEqual(self.cache.make_key(original, self.config, 'video'), self.cache.make_key(copy, self.config, 'video'))
+
+        # Przekodowany plik pod tą samą ścieżką
+        key = self.cache.make_key(original, self.config, 'video')
+        self.write_file('a.mp4', os.urandom(4096))
+        os.utime(original, ns=(0, 0))
+        self.assertNotEqual(self.cache.make_key(original, self.config, 'video'), key)
+
+    def test_key_depends_on_output_config(self):
+        path = self.write_file('a.jpg', b'obraz')
+        key = self.cache.make_key(path, self.config, 'image')
+        self.assertEqual(self.cache.make_key(path, ProcessingConfig(use_gpu=False, max_workers=1), 'image'), key)
+        self.assertNotEqual(self.cache.make_key(path, ProcessingConfig(use_gpu=False, scene_threshold=10.0), 'image'), key)
+
+    def test_lru_eviction_within_budget(self):
+        payload = {'frame_analyses': [{'brightness': float(i)} for i in range(450)]}
+        self.cache.set('a', payload)
+        self.cache.set('b', payload)
+        self.assertEqual(self.cache.get('a'), payload)  # 'a' jest teraz świeższe niż 'b'
+        self.cache.set('c', payload)
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), payload)
+        stats = self.cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertLessEqual(stats['bytes'], 10 * 1024)
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    def test_index_survives_restart(self):
+        self.cache.set('a', {'wynik': 1})
+        reopened = CacheManager(self.cache_dir, ttl=3600, max_bytes=10 * 1024)
+        self.assertEqual(reopened.get('a'), {'wynik': 1})
+        self.assertEqual([name for name in os.listdir(self.cache_dir) if name.endswith('.tmp')], [])
+
+    def test_reads_save_index_on_close(self):
+        self.cache.set('a', {'wynik': 1})
+        self.cache.set('b', {'wynik': 2})
+        index_path = os.path.join(self.cache_dir, CacheManager.INDEX_FILE)
+        saved = os.stat(index_path).st_mtime_ns
+        self.cache.get('a')
+        self.cache.get('brak')
+        self.assertEqual(os.stat(index_path).st_mtime_ns, saved)
+
+        # Kolejność LRU z odczytów trafia na dysk dopiero w close()
+        self.cache.close()
+        reopened = CacheManager(self.cache_dir, ttl=3600, max_bytes=10 * 1024)
+        self.assertEqual(list(reopened._index), ['b', 'a'])
+
+    def test_columnar_roundtrip_and_lazy_sections(self):
+        result = {
+            'metadata': {'duration': 12.5, 'fps': 25.0},
+            'scene_changes': [0, 125, 250],
+            'frame_analyses': [{'brightness': 10.5, 'stats': {'edges': 3}, 'colors': [1, 2]}, {'brightness': 20.0, 'stats': {'edges': 4}, 'colors': []}],
+            'objects': [[{'type': 'person', 'area': 1200.0}], [], [{'type': 'car', 'area': 5000.0}, {'type': 'person', 'area': 900.0}]],
+            'moods': [{'mood': 'jasny'}, {'mood': 'ciemny'}],
+            'processing_info': {'gpu_enabled': False, 'processing_time': None},
+        }
+        self.cache.max_bytes = 1024 * 1024
+        self.cache.set('wideo', result)
+        self.assertEqual(self.cache.get('wideo'), result)
+        self.assertEqual(self.cache.get('wideo', ['metadata']), {'metadata': result['metadata']})
+
+        cached = self.cache.open('wideo')
+        self.assertIsInstance(cached.column('frame_analyses', 'brightness'), np.memmap)
+        self.assertEqual(cached.column('objects', 'type').tolist(), ['person', 'car', 'person'])
+        self.assertEqual(cached.offsets('objects').tolist(), [0, 1, 1, 3])
+        self.assertNotIn('objects', cached._loaded)
+
+def write_test_video(path, seconds=4, fps=10, size=(160, 90), fourcc='mp4v'):
+    # Dwa ujęcia o różnej jasności z poruszającym się prostokątem
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    for i in range(seconds * fps):
+        frame = np.full((size[1], size[0], 3), 20 if i < seconds * fps // 2 else 200, np.uint8)
+        cv2.rectangle(frame, (10 + i, 20), (60 + i, 70), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+def write_static_video(path, seconds=8, fps=10, size=(160, 90)):
+    # Dwa statyczne ujęcia (cięcie w połowie) z szumem kodeka i kamery
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for i in range(seconds * fps):
+        frame = np.full((size[1], size[0], 3), 60 if i < seconds * fps // 2 else 180, np.uint8)
+        cv2.rectangle(frame, (30, 20), (90, 70), (0, 0, 255), -1)
+        writer.write(np.clip(frame + rng.normal(0, 3, frame.shape), 0, 255).astype(np.uint8))
+    writer.release()
+    return path
+
+class TestFrameHash(unittest.TestCase):
+    def test_hash_ignores_noise_but_not_content(self):
+        rng = np.random.default_rng(1)
+        frame = np.full((360, 640, 3), 90, np.uint8)
+        cv2.rectangle(frame, (100, 80), (300, 280), (255, 255, 255), -1)
+        noisy = np.clip(frame + rng.normal(0, 4, frame.shape), 0, 255).astype(np.uint8)
+        moved = np.roll(frame, 160, axis=1)
+        self.assertLessEqual(hamming_distance(frame_dhash(frame), frame_dhash(noisy)), 2)
+        self.assertGreater(hamming_distance(frame_dhash(frame), frame_dhash(moved)), 8)
+        self.assertEqual(frame_dhash(np.full((90, 160, 3), 20, np.uint8)), 0)
+
+class TestSceneChangeDetector(unittest.TestCase):
+    def test_cuts_found_across_batch_boundaries(self):
+        # Cięcia w klatkach 3 (granica partii) i 7; ruch w obrębie ujęcia nie jest cięciem
+        levels = [20, 20, 20, 220, 220, 220, 220, 90, 90, 90]
+        detector = SceneChangeDetector(threshold=30.0, fps=10, batch_size=3)
+        for i, level in enumerate(levels):
+            frame = np.full((90, 160, 3), level, np.uint8)
+            cv2.rectangle(frame, (i * 5, 10), (i * 5 + 20, 30), (255, 255, 255), -1)
+            detector.add(i, frame)
+        changes = detector.flush()
+        self.assertEqual([change['frame'] for change in changes], [3, 7])
+        self.assertAlmostEqual(changes[0]['timestamp'], 0.3)
+        self.assertGreater(changes[0]['histogram_distance'], 0.5)
+
+class TestAnalysisResolution(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.image = os.path.join(self.tmp_dir, 'kadr.png')
+        img = np.full((900, 1600, 3), 30, np.uint8)
+        cv2.rectangle(img, (400, 200), (1000, 600), (200, 180, 160), -1)
+        cv2.imwrite(self.image, img)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def process(self, max_side):
+        config = ProcessingConfig(use_gpu=False, analysis_max_side=max_side, cache_dir=os.path.join(self.tmp_dir, 'cache'))
+        with MediaProcessor(output_dir=os.path.join(self.tmp_dir, 'out'), config=config) as processor:
+            return processor.process_image(self.image)
+
+    def test_objects_mapped_to_source_coordinates(self):
+        full, small = self.process(0), self.process(400)
+        self.assertEqual(small['stats']['resolution'], {'width': 1600, 'height': 900})
+        self.assertEqual(small['stats']['analysis_resolution'], {'width': 400, 'height': 225})
+        self.assertEqual(len(small['objects']), len(full['objects']))
+        for key, value in full['objects'][0]['position'].items():
+            self.assertAlmostEqual(small['objects'][0]['position'][key], value, delta=8)
+        self.assertAlmostEqual(small['objects'][0]['area'] / full['objects'][0]['area'], 1.0, delta=0.05)
+        # Nastrój liczony z próbki pikseli źródła, więc średnie są przybliżone
+        self.assertEqual(small['mood']['mood'], full['mood']['mood'])
+        self.assertAlmostEqual(small['mood']['brightness'], full['mood']['brightness'], places=2)
+        self.assertAlmostEqual(small['mood']['saturation'], full['mood']['saturation'], places=2)
+
+class TestVideoPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.video = write_test_video(os.path.join(self.tmp_dir, 'klip.mp4'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def processor(self, **options):
+        config = ProcessingConfig(use_gpu=False, max_workers=2, cache_dir=os.path.join(self.tmp_dir, 'cache'), **options)
+        processor = MediaProcessor(output_dir=os.path.join(self.tmp_dir, 'out'), config=config)
+        self.addCleanup(processor.close)
+        return processor
+
+    def test_frames_analyzed_in_memory_and_in_order(self):
+        for shared in (False, True):
+            result = self.processor(shared_memory_frames=shared, frame_buffer_slots=2).process_video_parallel(self.video)
+            self.assertEqual([frame['frame_index'] for frame in result['frame_analyses']], [0, 10, 20, 30])
+            self.assertEqual(len(result['objects']), 4)
+            self.assertEqual(result['moods'][0]['mood'], 'dark')
+            self.assertEqual([change['frame'] for change in result['scene_changes']], [20])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'out', 'frames')))
+
+    def test_sampling_strategies_return_the_same_frames(self):
+        reference = list(self.processor(sampling_strategy='read').iter_sampled_frames(self.video))
+        for strategy in ('grab', 'seek'):
+            frames = list(self.processor(sampling_strategy=strategy).iter_sampled_frames(self.video))
+            self.assertEqual([frame[0] for frame in frames], [frame[0] for frame in reference])
+            for (_, _, expected), (_, _, frame) in zip(reference, frames):
+                np.testing.assert_array_equal(frame, expected)
+
+    @unittest.skipIf(shutil.which('ffmpeg') is None, 'ffmpeg nie jest zainstalowany')
+    def test_ffmpeg_pipe_returns_the_same_frames(self):
+        reference = list(self.processor(sampling_strategy='read').iter_sampled_frames(self.video))
+        frames = list(self.processor(sampling_strategy='ffmpeg').iter_sampled_frames(self.video))
+        self.assertEqual([frame[:2] for frame in frames], [frame[:2] for frame in reference])
+        for (_, _, expected), (_, _, frame) in zip(reference, frames):
+            self.assertEqual(frame.shape, expected.shape)
+            self.assertLess(np.abs(frame.astype(int) - expected).mean(), 2.0)
+        # Detekcja scen na wszystkich klatkach z potoku
+        result = self.processor(decode_backend='ffmpeg').process_video_parallel(self.video)
+        self.assertEqual([frame['frame_index'] for frame in result['frame_analyses']], [0, 10, 20, 30])
+        self.assertEqual([change['frame'] for change in result['scene_changes']], [20])
+
+    def test_unknown_frame_size_avoids_the_ffmpeg_pipe(self):
+        open_capture = cv2.VideoCapture
+
+        class ZeroSizeCapture:
+            # Kontener bez rozdzielczości w nagłówku
+            def __init__(self, path):
+                self.cap = open_capture(path)
+
+            def get(self, prop):
+                return 0 if prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT) else self.cap.get(prop)
+
+            def __getattr__(self, name):
+                return getattr(self.cap, name)
+
+        processor = self.processor(sampling_strategy='ffmpeg', decode_backend='ffmpeg')
+        with mock.patch.object(cv2, 'VideoCapture', ZeroSizeCapture):
+            self.assertEqual(processor.plan_sampling(self.video)['strategy'], 'grab')
+            self.assertEqual(processor.plan_sampling(self.video, decode_all=True)['strategy'], 'read')
+            with self.assertRaises(ValueError):
+                next(processor._iter_frames_ffmpeg(self.video, 10))
+
+    def test_auto_sampling_seeks_only_when_cheaper(self):
+        mjpeg = write_test_video(os.path.join(self.tmp_dir, 'klip.avi'), seconds=12, fourcc='MJPG')
+        self.assertEqual(self.processor(frame_interval=3.0).plan_sampling(mjpeg)['strategy'], 'seek')
+        self.assertEqual(self.processor(frame_interval=3.0).plan_sampling(mjpeg)['keyframe_interval'], 1.0)
+        self.assertEqual(self.processor(frame_interval=0.2).plan_sampling(mjpeg)['strategy'], 'grab')
+
+    def test_duplicate_frames_reuse_last_analysis(self):
+        video = write_static_video(os.path.join(self.tmp_dir, 'statyczny.mp4'))
+        result = self.processor().process_video_parallel(video)
+        frames = [(frame['frame_index'], frame['duplicate'], frame['analyzed_frame']) for frame in result['frame_analyses']]
+        self.assertEqual(frames, [(0, False, 0), (10, True, 0), (20, True, 0), (30, True, 0),
+                                  (40, False, 40), (50, True, 40), (60, True, 40), (70, True, 40)])
+        self.assertEqual(result['objects'][1], result['objects'][0])
+        self.assertEqual(result['moods'][5], result['moods'][4])
+        self.assertEqual(result['frame_analyses'][3]['brightness'], result['frame_analyses'][0]['brightness'])
+        info = result['processing_info']['duplicate_frames']
+        self.assertEqual((info['frames_checked'], info['frames_skipped'], info['skip_rate']), (8, 6, 0.75))
+        self.assertIn('time_saved', info)
+
+        result = self.processor(skip_duplicate_frames=False).process_video_parallel(video)
+        self.assertFalse(any(frame['duplicate'] for frame in result['frame_analyses']))
+        self.assertIsNone(result['processing_info']['duplicate_frames'])
+
+    def test_streaming_can_stop_early(self):
+        for shared in (False, True):
+            results = self.processor(shared_memory_frames=shared, frame_buffer_slots=1).iter_video_results(self.video)
+            self.assertEqual(next(results)['frame_index'], 0)
+            results.close()
+            self.assertNotIn('frame-decoder', [thread.name for thread in threading.enumerate()])
+
+    def test_pools_are_reused_until_closed(self):
+        with self.processor(shared_memory_frames=True, frame_buffer_slots=2) as processor:
+            processor.process_video_parallel(self.video)
+            pool, rings = processor.process_pool, list(processor._idle_rings.values())
+            processor.process_video_parallel(self.video)
+            self.assertIs(processor.process_pool, pool)
+            self.assertEqual(list(processor._idle_rings.values()), rings)
+
+            frames = (frame for _, _, frame in processor.iter_sampled_frames(self.video))
+            self.assertEqual([result['mood']['mood'] for result in processor.process_frames_batch(frames, batch_size=2)],
+                             ['dark', 'dark', 'warm', 'warm'])
+        self.assertEqual(processor._pools, {})
+        self.assertEqual(len(processor._idle_rings), 0)
+
+class TestProcessMany(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.media_dir = os.path.join(self.tmp_dir, 'zdjecia')
+        os.makedirs(os.path.join(self.media_dir, 'dzien1'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_largest_first_with_errors_and_report(self):
+        write_test_video(os.path.join(self.media_dir, 'krotki.mp4'), seconds=2)
+        write_test_video(os.path.join(self.media_dir, 'dzien1', 'dlugi.mp4'), seconds=6)
+        cv2.imwrite(os.path.join(self.media_dir, 'kadr.png'), np.zeros((90, 160, 3), np.uint8))
+        with open(os.path.join(self.media_dir, 'zepsuty.mp4'), 'wb') as f:
+            f.write(b'to nie jest wideo')
+        with open(os.path.join(self.media_dir, 'notatki.txt'), 'w') as f:
+            f.write('pomijane')
+
+        config = ProcessingConfig(use_gpu=False, max_workers=2, file_workers=1, cache_dir=os.path.join(self.tmp_dir, 'cache'))
+        report = BatchReport()
+        with MediaProcessor(output_dir=os.path.join(self.tmp_dir, 'out'), config=config) as processor:
+            events = list(processor.process_many(self.media_dir, report=report))
+
+        self.assertEqual([os.path.basename(event['path']) for event in events], ['dlugi.mp4', 'krotki.mp4', 'kadr.png', 'zepsuty.mp4'])
+        self.assertEqual([event['size'] for event in events], sorted((event['size'] for event in events), reverse=True))
+        self.assertIsNone(events[0]['error'])
+        self.assertEqual(len(events[0]['result']['frame_analyses']), 6)
+        self.assertIn('ValueError', events[-1]['error'])
+        self.assertIsNone(events[-1]['result'])
+
+        summary = report.summary()
+        self.assertEqual((summary['files'], summary['succeeded'], summary['failed'], summary['pending']), (4, 3, 1, 0))
+        self.assertAlmostEqual(summary['media_seconds'], 8.0)
+        self.assertGreater(summary['mb_per_s'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
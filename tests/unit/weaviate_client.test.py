@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+
+# Dodaj katalog główny repozytorium, aby można było importować moduły
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from weaviate_client import InMemoryWeaviate, WeaviateClientFactory, WeaviateUnavailable, get_client_factory
+
+class FlakyConnect:
+    """Łączenie, które zawodzi zadaną liczbę razy."""
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError('weaviate down')
+        return InMemoryWeaviate()
+
+class TestWeaviateClientFactory(unittest.TestCase):
+    def test_connects_lazily_and_reuses_client(self):
+        connect = FlakyConnect(0)
+        factory = WeaviateClientFactory(connect)
+        self.assertEqual(connect.calls, 0)
+        self.assertIs(factory.get(), factory.get())
+        self.assertEqual(connect.calls, 1)
+
+    def test_reconnect_backoff(self):
+        connect = FlakyConnect(2)
+        factory = WeaviateClientFactory(connect, backoff_initial=0.05, backoff_max=0.05)
+        with self.assertRaises(WeaviateUnavailable):
+            factory.get()
+        # W trakcie backoffu nie ma kolejnej próby połączenia
+        with self.assertRaises(WeaviateUnavailable):
+            factory.get()
+        self.assertEqual(connect.calls, 1)
+        factory._retry_at = 0.0
+        with self.assertRaises(WeaviateUnavailable):
+            factory.get()
+        factory._retry_at = 0.0
+        self.assertTrue(factory.get().is_ready())
+        self.assertEqual(connect.calls, 3)
+
+    def test_readiness_is_cached(self):
+        factory = WeaviateClientFactory(FlakyConnect(0), ready_ttl=60)
+        self.assertTrue(factory.is_ready())
+        factory.get().close()
+        self.assertTrue(factory.is_ready())  # Wynik z pamięci podręcznej
+        factory.ready_ttl = 0
+        self.assertFalse(factory.is_ready())
+
+    def test_named_factories_are_shared(self):
+        self.assertIs(get_client_factory('test-shared', connect=InMemoryWeaviate), get_client_factory('test-shared'))
+
+class TestInMemoryWeaviate(unittest.TestCase):
+    def test_insert_query_and_count(self):
+        scenes = InMemoryWeaviate().collections.get('Scene')
+        scenes.data.insert(properties={'sceneId': 's1', 'sceneText': 'kuchnia'}, vector=[1.0, 0.0])
+        scenes.data.insert(properties={'sceneId': 's2', 'sceneText': 'park'}, vector=[0.0, 1.0])
+        result = scenes.query.near_vector(near_vector=[0.9, 0.1], limit=1, return_properties=['sceneId'])
+        self.assertEqual(result.objects[0].properties, {'sceneId': 's1'})
+        self.assertEqual(scenes.aggregate.over_all(total_count=True).total_count, 2)
+        self.assertEqual([obj.properties['sceneId'] for obj in scenes.iterator()], ['s1', 's2'])
+
+if __name__ == '__main__':
+    unittest.main()